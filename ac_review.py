@@ -0,0 +1,33 @@
+import streamlit as st
+from modules.ac_fields import run as run_ac_fields
+
+def main():
+    
+    # CSS injection
+    st.markdown("""
+    <style>
+        [data-testid="stDecoration"], [data-testid="stHeader"], #MainMenu {
+            display: none;
+        }
+        .stApp {
+            margin-top: -75px;
+        }
+    </style>
+    """, unsafe_allow_html=True)
+    
+    # Navigation Header
+    col1, col2 = st.columns([4, 1])
+    with col2:
+        if st.button("← Back to Home"):
+            st.session_state.page = 'home'
+            st.rerun()
+    
+    st.title("Review AC Fields")
+    
+    # Display divider
+    st.divider()
+    
+    run_ac_fields()
+
+if __name__ == "__main__":
+    main()
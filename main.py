@@ -59,6 +59,28 @@ def main():
             """, unsafe_allow_html=True)
         import sku_maintenance
         sku_maintenance.main()
+    elif st.session_state.page == 'ac_review':
+        st.markdown("""
+            <style>
+                /* Hide GitHub icon */
+                [data-testid="stDecoration"] {
+                    display: none;
+                }
+                
+                /* Hide header */
+                [data-testid="stHeader"] {
+                    display: none;
+                }
+                
+                /* Hide menu button */
+                #MainMenu {
+                    visibility: hidden;
+                }
+
+            </style>
+            """, unsafe_allow_html=True)
+        import ac_review
+        ac_review.main()
         
 
 def show_home_page():
@@ -119,7 +141,9 @@ def show_home_page():
             st.rerun()
         
     with cols[2]:
-        st.button("🔍 Review AC Fields (Coming Soon)", disabled=True)
+        if st.button("🔍 Review AC Fields", help="Review attribute completeness of a PIM export"):
+            st.session_state.page = 'ac_review'
+            st.rerun()
 
     
 
@@ -0,0 +1,271 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+from pathlib import Path
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload
+
+# Example rows kept per column and rule in the workbook; counts are always complete
+EXAMPLES_PER_RULE = 100
+
+# Columns compared stripped and lowercased, as everywhere else in the tools ("Simple " == "simple")
+CASE_INSENSITIVE_COLUMNS = {"Product Type"}
+
+SUMMARY_COLUMNS = [
+    "Column", "Status", "Fill Rate %", "Filled", "Empty", "Distinct", "Top Value", "Top Count",
+    "Required Missing", "Allowed Value Violations", "Pattern Violations", "Dependency Violations"
+]
+
+
+def load_ac_rules():
+    """Load attribute-completeness rules"""
+    try:
+        path = Path(__file__).resolve().parent.parent / "constants" / "ac_field_rules.json"
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        st.error("AC field rules not found")
+        return {}
+    except json.JSONDecodeError:
+        st.error("Invalid AC field rules format")
+        return {}
+
+
+def _comparable(series, column):
+    """Values as compared against the rules: stripped and lowercased for case-insensitive columns"""
+    if column in CASE_INSENSITIVE_COLUMNS:
+        return series.astype(object).str.strip().str.lower()
+    return series
+
+
+def _rule_value(value, column):
+    """Rule value in the same form as `_comparable`"""
+    return value.strip().lower() if column in CASE_INSENSITIVE_COLUMNS else value
+
+
+def build_dependency_conditions(df, rules):
+    """Evaluate every dependency's 'when' condition once, shared by all column workers"""
+    conditions = []
+    for dependency in rules.get("dependencies", []):
+        when = dependency.get("when", {})
+        if not all(col in df.columns for col in when):
+            continue
+        mask = np.ones(len(df), dtype=bool)
+        for col, value in when.items():
+            mask &= _comparable(df[col], col).eq(_rule_value(value, col)).to_numpy()
+        conditions.append((dependency, mask))
+    return conditions
+
+
+def _examples(df, key_column, column, mask, rule):
+    """First few violating rows of one rule, in long format"""
+    positions = np.flatnonzero(mask)[:EXAMPLES_PER_RULE]
+    keys = df[key_column].to_numpy()[positions] if key_column in df.columns else positions + 2
+    return pd.DataFrame({
+        "Key": keys,
+        "Column": column,
+        "Value": df[column].to_numpy()[positions],
+        "Rule": rule
+    })
+
+
+def profile_column(df, column, rules, conditions):
+    """Profile and check a single attribute column; safe to run in a worker thread"""
+    series = df[column]
+    empty = (series.isna() | series.astype(str).eq('')).to_numpy()
+    filled = int((~empty).sum())
+    counts = series[~empty].value_counts()
+    key_column = rules.get("key_column", "Material Bank SKU")
+    examples = []
+
+    # Required columns must be filled on every row
+    required_missing = 0
+    if column in rules.get("required_columns", []):
+        required_missing = int(empty.sum())
+        if required_missing:
+            examples.append(_examples(df, key_column, column, empty, "Required value missing"))
+
+    # Allowed values
+    allowed_violations = 0
+    allowed = rules.get("allowed_values", {}).get(column)
+    if allowed:
+        allowed_set = [_rule_value(value, column) for value in allowed]
+        invalid = ~empty & ~_comparable(series, column).isin(allowed_set).to_numpy()
+        allowed_violations = int(invalid.sum())
+        if allowed_violations:
+            examples.append(_examples(df, key_column, column, invalid, f"Not one of: {', '.join(allowed)}"))
+
+    # Patterns
+    pattern_violations = 0
+    pattern = rules.get("patterns", {}).get(column)
+    if pattern:
+        matches = series.astype(str).str.match(pattern["pattern"]).to_numpy(dtype=bool)
+        invalid = ~empty & ~matches
+        pattern_violations = int(invalid.sum())
+        if pattern_violations:
+            examples.append(_examples(df, key_column, column, invalid, f"Expected format: {pattern['example']}"))
+
+    # Cross-field dependencies targeting this column
+    dependency_violations = 0
+    for dependency, condition in conditions:
+        if column in dependency.get("expect", {}):
+            expected = dependency["expect"][column]
+            invalid = condition & _comparable(series, column).ne(_rule_value(expected, column)).to_numpy()
+            rule = f"{dependency['name']}: expected '{expected}'"
+        elif column in dependency.get("require", []):
+            invalid = condition & empty
+            rule = f"{dependency['name']}: value required"
+        else:
+            continue
+        violations = int(invalid.sum())
+        if violations:
+            dependency_violations += violations
+            examples.append(_examples(df, key_column, column, invalid, rule))
+
+    total_violations = required_missing + allowed_violations + pattern_violations + dependency_violations
+    if total_violations:
+        status = "Error"
+    elif filled == 0:
+        status = "Empty"
+    else:
+        status = "OK"
+
+    summary = {
+        "Column": column,
+        "Status": status,
+        "Fill Rate %": round(100 * filled / len(df), 2) if len(df) else 0.0,
+        "Filled": filled,
+        "Empty": len(df) - filled,
+        "Distinct": len(counts),
+        "Top Value": counts.index[0] if len(counts) else "",
+        "Top Count": int(counts.iloc[0]) if len(counts) else 0,
+        "Required Missing": required_missing,
+        "Allowed Value Violations": allowed_violations,
+        "Pattern Violations": pattern_violations,
+        "Dependency Violations": dependency_violations
+    }
+    return summary, examples
+
+
+def write_ac_workbook(summary_df, examples_df):
+    """Write the per-column summary workbook and return its bytes"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        text_format = writer.book.add_format({'num_format': '@'})
+        error_format = writer.book.add_format({'bg_color': '#FFC7CE'})
+
+        for sheet_name, df in [('Column Summary', summary_df), ('Violation Examples', examples_df)]:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            worksheet = writer.sheets[sheet_name]
+            for idx, col in enumerate(df.columns):
+                max_len = max(
+                    df[col].astype(str).str.len().max() if len(df) else 0,
+                    len(str(col))
+                ) + 2
+                worksheet.set_column(idx, idx, min(max_len, 50), text_format)
+            worksheet.autofilter(0, 0, len(df), max(len(df.columns)-1, 0))
+
+        # Highlight failing columns
+        status_idx = summary_df.columns.get_loc("Status")
+        for row, status in enumerate(summary_df["Status"], start=1):
+            if status == "Error":
+                writer.sheets['Column Summary'].write(row, status_idx, status, error_format)
+
+    return output.getvalue()
+
+
+def run():
+    st.header("AC Field Review")
+
+    with st.expander("🛠️ What This Review Does (Click to expand)", expanded=False):
+        st.markdown("""
+
+        ✅ **Fill Rate**
+        _Profiles every attribute column: filled/empty counts, distinct values and the most common value_
+
+        ✅ **Required Fields**
+        _Flags empty values in columns that must always be populated_
+
+        ✅ **Allowed Values & Formats**
+        _Checks controlled-vocabulary fields and patterns such as `Batch Number`_
+
+        ✅ **Cross-Field Dependencies**
+        _e.g. retired SKUs must be hidden, primary children must be active_
+
+        📌 Columns are checked in parallel and results appear as each column finishes.
+        Rules live in `constants/ac_field_rules.json`.
+        """)
+
+    export_file = st.file_uploader("Upload the PIM Export File", type=UPLOAD_TYPES,
+                                   help="Upload the export whose attribute columns should be reviewed")
+    workers = st.slider("Parallel workers", min_value=1, max_value=16, value=min(8, os.cpu_count() or 1))
+
+    if export_file:
+        rules = load_ac_rules()
+        if not rules:
+            return
+
+        try:
+            with st.spinner("Loading file..."):
+                df = read_upload(export_file, dtype=str)
+                normalize_whitespace(df)
+
+            st.subheader("Column Results")
+            progress = st.progress(0.0, text="Reviewing columns...")
+            table = st.empty()
+
+            conditions = build_dependency_conditions(df, rules)
+            columns = df.columns.tolist()
+            summaries, examples = [], []
+            last_render = 0.0
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(profile_column, df, column, rules, conditions) for column in columns]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    summary, column_examples = future.result()
+                    summaries.append(summary)
+                    examples.extend(column_examples)
+
+                    # Stream partial results, throttled so re-rendering stays cheap
+                    now = time.monotonic()
+                    if now - last_render > 0.5 or done == len(columns):
+                        progress.progress(done / len(columns), text=f"Reviewed {done} of {len(columns)} columns")
+                        table.dataframe(pd.DataFrame(summaries, columns=SUMMARY_COLUMNS), height=400,
+                                        use_container_width=True)
+                        last_render = now
+
+            # Final ordering: failing columns first, original column order within each status
+            order = {column: idx for idx, column in enumerate(columns)}
+            summary_df = pd.DataFrame(summaries, columns=SUMMARY_COLUMNS)
+            summary_df = summary_df.sort_values(
+                by=["Status", "Column"],
+                key=lambda s: s.map({"Error": 0, "Empty": 1, "OK": 2}) if s.name == "Status" else s.map(order)
+            ).reset_index(drop=True)
+            table.dataframe(summary_df, height=400, use_container_width=True)
+
+            error_columns = int((summary_df["Status"] == "Error").sum())
+            if error_columns:
+                st.error(f"{error_columns} of {len(summary_df)} columns failed at least one check")
+            else:
+                st.success(f"✅ All {len(summary_df)} columns passed the AC checks")
+
+            examples_df = pd.concat(examples, ignore_index=True) if examples else pd.DataFrame(
+                columns=["Key", "Column", "Value", "Rule"])
+            if not examples_df.empty:
+                with st.expander("View violation examples", expanded=False):
+                    st.dataframe(examples_df, height=300, use_container_width=True)
+                    st.caption(f"Showing up to {EXAMPLES_PER_RULE} examples per column and rule")
+
+            st.download_button(
+                label="Download Column Summary",
+                data=write_ac_workbook(summary_df, examples_df),
+                file_name="ac_field_review.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+        except Exception as e:
+            st.error(f"Processing error: {str(e)}")
@@ -0,0 +1,195 @@
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+import streamlit as st
+import pandas as pd
+import numpy as np
+from modules.loaders import UPLOAD_TYPES, read_upload, upload_stem
+
+# Local working data lives next to the app and is never committed
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+CATALOG_INDEX_DIR = DATA_DIR / "catalog_index"
+
+# Identifiers a new SKU must not share with an existing catalog SKU
+INDEX_IDENTIFIERS = ["Manufacturer Sku", "Manufacturer Sku EU", "Material Bank SKU", "MBID", "Url Key"]
+
+
+def _identifier_text(values):
+    """Identifiers as text; integral floats from inferred dtypes lose their '.0' (1001.0 -> '1001')"""
+    series = pd.Series(values, dtype=object)
+    integral = series.map(lambda value: isinstance(value, float) and value.is_integer()).to_numpy(dtype=bool)
+    if integral.any():
+        series = series.copy()
+        series[integral] = [str(int(value)) for value in series[integral]]
+    return series.fillna('').astype(str)
+
+
+def hash_identifiers(values):
+    """Case- and whitespace-insensitive uint64 hash of every identifier, plus a non-empty mask"""
+    series = _identifier_text(values).str.strip().str.lower()
+    present = series.ne('').to_numpy()
+    return pd.util.hash_array(series.to_numpy(dtype=object), categorize=False), present
+
+
+def _slug(identifier):
+    """File-name-safe form of a column name"""
+    return re.sub(r'[^a-z0-9]+', '_', identifier.lower()).strip('_')
+
+
+def _paths(identifier, index_dir):
+    """Hash and source-code array files of one identifier"""
+    slug = _slug(identifier)
+    return index_dir / f"{slug}.hashes.npy", index_dir / f"{slug}.sources.npy"
+
+
+def load_index_meta(index_dir=CATALOG_INDEX_DIR):
+    """Index metadata: {"sources": {name: {"code", "rows", "refreshed"}}}; empty if no index exists"""
+    try:
+        with open(index_dir / "catalog_index.json") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"sources": {}}
+
+
+def refresh_index(export_df, source, index_dir=CATALOG_INDEX_DIR):
+    """Replace one source export's keys in the index, leaving every other source untouched
+
+    Each identifier is stored as a sorted uint64 hash array plus a parallel array
+    of source codes, so refreshing a brand's export only rewrites its own entries.
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+    meta = load_index_meta(index_dir)
+    sources = meta["sources"]
+    code = sources[source]["code"] if source in sources else max(
+        [entry["code"] for entry in sources.values()], default=-1) + 1
+
+    for identifier in INDEX_IDENTIFIERS:
+        hashes_path, sources_path = _paths(identifier, index_dir)
+        if hashes_path.exists():
+            hashes, codes = np.load(hashes_path), np.load(sources_path)
+            keep = codes != code
+            hashes, codes = hashes[keep], codes[keep]
+        else:
+            hashes, codes = np.array([], dtype=np.uint64), np.array([], dtype=np.int32)
+
+        if identifier in export_df.columns:
+            new_hashes, present = hash_identifiers(export_df[identifier])
+            new_hashes = np.unique(new_hashes[present])
+            hashes = np.concatenate([hashes, new_hashes])
+            codes = np.concatenate([codes, np.full(len(new_hashes), code, dtype=np.int32)])
+
+        order = np.argsort(hashes, kind='stable')
+        np.save(hashes_path, hashes[order])
+        np.save(sources_path, codes[order])
+
+    sources[source] = {
+        "code": code,
+        "rows": len(export_df),
+        "refreshed": datetime.now().strftime("%Y-%m-%d %H:%M")
+    }
+    with open(index_dir / "catalog_index.json", "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def find_collisions(import_df, index_dir=CATALOG_INDEX_DIR):
+    """Import rows whose identifiers already exist in the catalog index, in long format"""
+    meta = load_index_meta(index_dir)
+    source_names = {entry["code"]: name for name, entry in meta["sources"].items()}
+    found = []
+
+    for identifier in INDEX_IDENTIFIERS:
+        hashes_path, sources_path = _paths(identifier, index_dir)
+        if identifier not in import_df.columns or not hashes_path.exists():
+            continue
+
+        # Memory-mapped binary search: no need to read the whole index
+        hashes = np.load(hashes_path, mmap_mode='r')
+        if len(hashes) == 0:
+            continue
+        query, present = hash_identifiers(import_df[identifier])
+        slots = np.minimum(np.searchsorted(hashes, query), len(hashes) - 1)
+        hits = np.flatnonzero(present & (hashes[slots] == query))
+        if len(hits) == 0:
+            continue
+
+        codes = np.load(sources_path, mmap_mode='r')
+        found.append(pd.DataFrame({
+            "Row": hits + 2,  # spreadsheet row, below the header
+            "Identifier": identifier,
+            "Value": import_df[identifier].to_numpy(dtype=object)[hits],
+            "Existing In": [source_names.get(int(c), "unknown") for c in codes[slots[hits]]]
+        }))
+
+    if not found:
+        return pd.DataFrame(columns=["Row", "Identifier", "Value", "Existing In"])
+    return pd.concat(found, ignore_index=True)
+
+
+def render_collision_check(import_df, uploaded_file=None):
+    """Catalog collision section shared by the new-SKU and stealth validators
+
+    The index is built from text-typed exports, so when the upload is given its
+    identifier columns are re-read as text (keeping leading zeros like '00123').
+    """
+    meta = load_index_meta()
+    if not meta["sources"]:
+        st.info("ℹ️ No catalog index built yet; build one under 'Catalog Index' to check for existing SKUs")
+        return
+
+    if uploaded_file is not None:
+        import_df = read_upload(uploaded_file, dtype=str, columns=INDEX_IDENTIFIERS)
+
+    collisions = find_collisions(import_df)
+    if collisions.empty:
+        st.success(f"✅ No identifiers already exist in the catalog index ({len(meta['sources'])} exports indexed)")
+    else:
+        st.error(f"🚨 Found {len(collisions)} identifiers that already exist in the catalog")
+        for identifier, identifier_df in collisions.groupby("Identifier", sort=False):
+            with st.expander(f"Existing {identifier} values ({len(identifier_df)})"):
+                st.dataframe(identifier_df, use_container_width=True, hide_index=True)
+
+
+def run():
+    st.header("Catalog Index")
+
+    with st.expander("📋 **About the Catalog Index (Click to Expand)**", expanded=False):
+        st.markdown(f"""
+        The catalog index lets the SKU validators check whether an import reuses an identifier that
+        already exists in the catalog: {', '.join(f'`{col}`' for col in INDEX_IDENTIFIERS)}.
+
+        - Upload full PIM exports (one per brand or one for the whole catalog)
+        - Re-uploading an export with the same source name replaces only that export's keys
+        - Matching ignores case and surrounding whitespace
+        """)
+
+    export_file = st.file_uploader("Upload PIM Export File", type=UPLOAD_TYPES,
+                                   help="Upload a full PIM export to add to (or refresh in) the index")
+    if export_file:
+        source = st.text_input("Source name", value=upload_stem(export_file.name),
+                               help="Exports with the same source name replace each other")
+        if st.button("Refresh Catalog Index"):
+            try:
+                with st.spinner("Indexing export..."):
+                    export_df = read_upload(export_file, dtype=str, columns=INDEX_IDENTIFIERS)
+                    if not any(col in export_df.columns for col in INDEX_IDENTIFIERS):
+                        st.error(f"Export has none of the indexed columns: {', '.join(INDEX_IDENTIFIERS)}")
+                        return
+                    refresh_index(export_df, source)
+                st.success(f"Indexed {len(export_df)} rows from '{source}'")
+            except Exception as e:
+                st.error(f"Processing error: {str(e)}")
+
+    meta = load_index_meta()
+    if meta["sources"]:
+        st.write("#### Indexed Exports")
+        st.dataframe(
+            pd.DataFrame([
+                {"Source": name, "Rows": entry["rows"], "Refreshed": entry["refreshed"]}
+                for name, entry in meta["sources"].items()
+            ]),
+            use_container_width=True, hide_index=True
+        )
+    else:
+        st.info("The catalog index is empty")
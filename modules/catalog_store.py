@@ -0,0 +1,171 @@
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+import streamlit as st
+import pandas as pd
+from modules.catalog_index import DATA_DIR
+from modules.indexes import NAME_IDENTIFIER
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload, upload_stem
+
+CATALOG_STORE_PATH = DATA_DIR / "catalog_store.sqlite"
+STORE_TABLE = "export"
+
+# Columns that ticket lookups and family expansion filter on
+STORE_INDEX_COLUMNS = ["Material Bank SKU", "Manufacturer Sku", "Manufacturer Sku EU", "Family Id", "Product Name"]
+
+
+def _quote(name):
+    """Quote a column name for SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def refresh_store(export_df, source, path=CATALOG_STORE_PATH):
+    """Replace the stored export and rebuild its lookup indexes
+
+    Rows keep their export position in `_row`, so query results carry the same
+    index labels as a freshly uploaded file would.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    frame = export_df.reset_index(drop=True)
+    frame.insert(0, "_row", range(len(frame)))
+
+    with closing(sqlite3.connect(path)) as con:
+        frame.to_sql(STORE_TABLE, con, if_exists='replace', index=False, chunksize=50000)
+        for col in STORE_INDEX_COLUMNS:
+            if col in frame.columns:
+                con.execute(f"CREATE INDEX {_quote('idx_' + col)} ON {STORE_TABLE} ({_quote(col)})")
+        con.execute("CREATE TABLE IF NOT EXISTS store_meta (source TEXT, rows INTEGER, refreshed TEXT)")
+        con.execute("DELETE FROM store_meta")
+        con.execute("INSERT INTO store_meta VALUES (?, ?, ?)",
+                    (source, len(frame), datetime.now().strftime("%Y-%m-%d %H:%M")))
+        con.commit()
+
+
+def store_info(path=CATALOG_STORE_PATH):
+    """Source, row count and refresh time of the stored export, or None when there is no store"""
+    if not path.exists():
+        return None
+    try:
+        with closing(sqlite3.connect(path)) as con:
+            row = con.execute("SELECT source, rows, refreshed FROM store_meta").fetchone()
+    except sqlite3.Error:
+        return None
+    return dict(zip(["source", "rows", "refreshed"], row)) if row else None
+
+
+def store_columns(path=CATALOG_STORE_PATH):
+    """Export columns held in the store"""
+    with closing(sqlite3.connect(path)) as con:
+        return [row[1] for row in con.execute(f"PRAGMA table_info({STORE_TABLE})")][1:]
+
+
+def query_export(match, columns=None, expand_family=False, include_matches=True, path=CATALOG_STORE_PATH):
+    """Stored export rows where any `match` column holds one of its values
+
+    `match` maps column -> values. With `expand_family`, every row sharing a
+    Family Id with a matched row is returned too; `include_matches=False` then
+    returns the family rows only. Columns that are not stored are skipped, so
+    they surface in the caller's validation like a missing upload column would.
+    """
+    available = store_columns(path)
+    with closing(sqlite3.connect(path)) as con:
+        selected = available if columns is None else [col for col in dict.fromkeys(columns) if col in available]
+
+        # Lookup values go into indexed temp tables instead of huge IN (...) lists
+        conditions = []
+        for i, (col, values) in enumerate((col, values) for col, values in match.items() if col in available):
+            con.execute(f"CREATE TEMP TABLE _keys{i} (value TEXT PRIMARY KEY)")
+            con.executemany(f"INSERT OR IGNORE INTO _keys{i} VALUES (?)", ((str(v),) for v in values))
+            conditions.append(f"{_quote(col)} IN (SELECT value FROM _keys{i})")
+        where = " OR ".join(conditions) or "0"
+
+        if expand_family and "Family Id" in available:
+            family = f'"Family Id" IN (SELECT "Family Id" FROM {STORE_TABLE} WHERE {where})'
+            where = f"({where}) OR {family}" if include_matches else family
+
+        sql = f"SELECT {', '.join(['_row'] + [_quote(col) for col in selected])} FROM {STORE_TABLE} " \
+              f"WHERE {where} ORDER BY _row"
+        df = pd.read_sql_query(sql, con, index_col="_row")
+
+    df.index.name = None
+    # Match the string-preserving behaviour of read_upload(dtype=str)
+    return df.astype(str).where(df.notna())
+
+
+def read_store(columns=None, path=CATALOG_STORE_PATH):
+    """Every stored export row, for lookups that cannot be narrowed to ticket rows"""
+    available = store_columns(path)
+    selected = available if columns is None else [col for col in dict.fromkeys(columns) if col in available]
+    with closing(sqlite3.connect(path)) as con:
+        df = pd.read_sql_query(f"SELECT {', '.join(['_row'] + [_quote(col) for col in selected])} "
+                               f"FROM {STORE_TABLE} ORDER BY _row", con, index_col="_row")
+    df.index.name = None
+    return df.astype(str).where(df.notna())
+
+
+def distinct_values(column, path=CATALOG_STORE_PATH):
+    """Distinct non-empty values of one stored column"""
+    with closing(sqlite3.connect(path)) as con:
+        rows = con.execute(f"SELECT DISTINCT {_quote(column)} FROM {STORE_TABLE} "
+                           f"WHERE {_quote(column)} IS NOT NULL").fetchall()
+    return pd.Index([row[0] for row in rows], dtype=object)
+
+
+def load_ticket_rows(ticket_df, identifier_type, columns=None):
+    """Stored export rows for a ticket: its matches plus their whole families
+
+    Product Name tickets are matched after normalization, so they read the whole stored export.
+    """
+    if identifier_type == NAME_IDENTIFIER:
+        return read_store(columns)
+    values = []
+    if identifier_type in ticket_df.columns:
+        values = ticket_df[identifier_type].dropna().astype(str).str.strip().unique()
+    return query_export({identifier_type: values}, columns=columns, expand_family=True)
+
+
+def export_source_picker(key):
+    """Offer the catalog store as the export source when one exists; True when it is chosen"""
+    info = store_info()
+    if info is None:
+        return False
+    source = st.radio(
+        "Export Source:",
+        ["Upload export", "Catalog store"],
+        index=1,
+        horizontal=True,
+        key=f"{key}_export_source",
+        help=f"Catalog store: '{info['source']}', {info['rows']} rows, refreshed {info['refreshed']}"
+    )
+    return source == "Catalog store"
+
+
+def run():
+    with st.expander("📋 **About the Catalog Store (Click to Expand)**", expanded=False):
+        st.markdown(f"""
+        Load a PIM export into the local catalog store **once**. Visibility, SKU Retirement,
+        Change Primary Child and Filter Records can then read ticket rows and their families from
+        the store with indexed lookups instead of parsing the whole export on every run.
+
+        Indexed columns: {', '.join(f'`{col}`' for col in STORE_INDEX_COLUMNS)}.
+        Refresh the store whenever a newer export is available.
+        """)
+
+    info = store_info()
+    if info:
+        st.info(f"Catalog store holds '{info['source']}' ({info['rows']} rows, refreshed {info['refreshed']})")
+    else:
+        st.info("The catalog store is empty")
+
+    export_file = st.file_uploader("Upload PIM Export File", type=UPLOAD_TYPES,
+                                   help="Upload the export to load into the catalog store")
+    if export_file:
+        source = st.text_input("Source name", value=upload_stem(export_file.name))
+        if st.button("Refresh Catalog Store"):
+            try:
+                with st.spinner("Loading export into the catalog store..."):
+                    export_df = normalize_whitespace(read_upload(export_file, dtype=str))
+                    refresh_store(export_df, source)
+                st.success(f"Stored {len(export_df)} rows from '{source}'")
+            except Exception as e:
+                st.error(f"Processing error: {str(e)}")
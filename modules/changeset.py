@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from io import BytesIO
+
+CHANGE_SET_KEY = "Material Bank SKU"
+
+
+def build_change_set(original_df, result_df, key_column=CHANGE_SET_KEY):
+    """Diff result rows against their original export rows
+
+    `result_df` must keep the export's index labels (every maintenance output
+    is taken from the export by position, so it does). Returns a wide delta
+    frame holding the key plus changed cells only, and a long audit frame with
+    one row per changed cell.
+    """
+    columns = [col for col in result_df.columns if col in original_df.columns and col != key_column]
+    before = original_df.loc[result_df.index, columns].to_numpy(dtype=object)
+    after = result_df[columns].to_numpy(dtype=object)
+    keys = result_df[key_column].to_numpy(dtype=object)
+
+    # A cell changed when the values differ and they are not both missing
+    changed = (before != after) & ~(pd.isna(before) & pd.isna(after))
+    changed_rows = changed.any(axis=1)
+    changed_cols = changed.any(axis=0)
+
+    delta = pd.DataFrame(
+        np.where(changed, after, None)[changed_rows][:, changed_cols],
+        columns=[col for col, keep in zip(columns, changed_cols) if keep]
+    )
+    delta.insert(0, key_column, keys[changed_rows])
+
+    row_idx, col_idx = np.nonzero(changed)
+    audit = pd.DataFrame({
+        key_column: keys[row_idx],
+        "Column": np.asarray(columns, dtype=object)[col_idx] if len(columns) else [],
+        "Old Value": before[row_idx, col_idx],
+        "New Value": after[row_idx, col_idx]
+    })
+    return delta, audit
+
+
+def write_change_set_workbook(delta, audit):
+    """Write the Change Set / Change Audit workbook and return its bytes"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        text_format = writer.book.add_format({'num_format': '@'})
+
+        for sheet_name, df in [('Change Set', delta), ('Change Audit', audit)]:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            worksheet = writer.sheets[sheet_name]
+            for idx, col in enumerate(df.columns):
+                max_len = max(
+                    df[col].astype(str).str.len().max() if len(df) else 0,
+                    len(str(col))
+                ) + 2
+                worksheet.set_column(idx, idx, min(max_len, 30), text_format)
+            worksheet.autofilter(0, 0, len(df), max(len(df.columns)-1, 0))
+
+    return output.getvalue()
@@ -0,0 +1,215 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from io import BytesIO
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload, select_rows
+import warnings
+warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
+
+DIFF_KEY = "Material Bank SKU"
+
+
+def hash_rows(df, columns):
+    """One uint64 hash per row over the given columns; empty and missing cells hash alike"""
+    if not columns:
+        return np.zeros(len(df), dtype=np.uint64)
+    return pd.util.hash_pandas_object(df[columns].fillna(''), index=False).to_numpy()
+
+
+def hash_cells(series):
+    """One uint64 hash per cell of a column"""
+    return pd.util.hash_array(series.fillna('').to_numpy(dtype=object))
+
+
+def keyed_rows(df, key_column):
+    """Row positions of the first occurrence of every non-empty key, and the duplicate count"""
+    keys = df[key_column]
+    present = keys.notna() & keys.ne('')
+    first = present & ~keys.duplicated()
+    return np.flatnonzero(first.to_numpy()), int((present & ~first).sum())
+
+
+def diff_exports(old_df, new_df, key_column=DIFF_KEY):
+    """Compare two exports keyed by SKU using row hashes, then column hashes on changed rows
+
+    Returns a dict with the added and removed rows, a modified summary
+    (key + changed column names), a long-format change list, and the
+    column-level differences.
+    """
+    old_pos, old_duplicates = keyed_rows(old_df, key_column)
+    new_pos, new_duplicates = keyed_rows(new_df, key_column)
+    old_keys = pd.Index(old_df[key_column].to_numpy(dtype=object)[old_pos], dtype=object)
+    new_keys = pd.Index(new_df[key_column].to_numpy(dtype=object)[new_pos], dtype=object)
+
+    # Align SKUs: -1 means the SKU is not in the other export
+    match = old_keys.get_indexer(new_keys)
+    in_both = match >= 0
+    added_pos = new_pos[~in_both]
+    removed_pos = old_pos[new_keys.get_indexer(old_keys) < 0]
+    new_matched = new_pos[in_both]
+    old_matched = old_pos[match[in_both]]
+
+    # Columns present in both exports, in the new export's order
+    old_columns = set(old_df.columns)
+    common = [col for col in new_df.columns if col in old_columns and col != key_column]
+
+    # Stage 1: one hash per row finds modified SKUs without touching cells
+    old_hashes = hash_rows(select_rows(old_df, old_matched), common)
+    new_hashes = hash_rows(select_rows(new_df, new_matched), common)
+    modified = old_hashes != new_hashes
+    old_modified = old_matched[modified]
+    new_modified = new_matched[modified]
+
+    # Stage 2: per-column hashes, only on modified rows, name the changed columns
+    old_subset = select_rows(old_df, old_modified, common)
+    new_subset = select_rows(new_df, new_modified, common)
+    changed = np.column_stack([
+        hash_cells(old_subset[col]) != hash_cells(new_subset[col]) for col in common
+    ]) if common else np.zeros((len(new_modified), 0), dtype=bool)
+
+    modified_keys = new_df[key_column].to_numpy(dtype=object)[new_modified]
+    common_names = np.asarray(common, dtype=object)
+    modified_df = pd.DataFrame({
+        key_column: modified_keys,
+        "Changed Columns": [", ".join(common_names[row]) for row in changed],
+        "Change Count": changed.sum(axis=1)
+    })
+
+    row_idx, col_idx = np.nonzero(changed)
+    changes_df = pd.DataFrame({
+        key_column: modified_keys[row_idx],
+        "Column": common_names[col_idx] if len(common) else [],
+        "Old Value": old_subset.to_numpy(dtype=object)[row_idx, col_idx],
+        "New Value": new_subset.to_numpy(dtype=object)[row_idx, col_idx]
+    })
+
+    column_changes = pd.DataFrame({
+        "Column": common,
+        "Modified SKUs": changed.sum(axis=0)
+    }).query("`Modified SKUs` > 0").sort_values("Modified SKUs", ascending=False)
+
+    return {
+        "added": select_rows(new_df, added_pos),
+        "removed": select_rows(old_df, removed_pos),
+        "modified": modified_df,
+        "changes": changes_df,
+        "column_changes": column_changes,
+        "added_columns": [col for col in new_df.columns if col not in old_columns],
+        "removed_columns": [col for col in old_df.columns if col not in set(new_df.columns)],
+        "unchanged": int((~modified).sum()),
+        "duplicates": old_duplicates + new_duplicates
+    }
+
+
+def write_diff_workbook(diff):
+    """Write the diff sheets into one workbook and return its bytes"""
+    sheets = {
+        'Modified': diff["modified"],
+        'Changes': diff["changes"],
+        'Added': diff["added"],
+        'Removed': diff["removed"],
+        'Column Changes': diff["column_changes"]
+    }
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        text_format = writer.book.add_format({'num_format': '@'})
+
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            worksheet = writer.sheets[sheet_name]
+            for idx, col in enumerate(df.columns):
+                max_len = max(
+                    df[col].astype(str).str.len().max() if len(df) else 0,
+                    len(str(col))
+                ) + 2
+                worksheet.set_column(idx, idx, min(max_len, 50), text_format)
+            worksheet.autofilter(0, 0, len(df), max(len(df.columns)-1, 0))
+
+    return output.getvalue()
+
+
+def run():
+    # Instructions
+    with st.expander("📋 **Diff Instructions**", expanded=False):
+        st.markdown(f"""
+        **How to Use:**
+        1. Upload the older export (e.g. yesterday's)
+        2. Upload the newer export of the same brand
+        3. Review added, removed and modified SKUs and download the report
+
+        SKUs are matched on `{DIFF_KEY}`. Empty and missing cells are treated as equal,
+        and surrounding whitespace is ignored.
+        """)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        old_file = st.file_uploader(
+            "Older Export",
+            type=UPLOAD_TYPES,
+            help="Upload the earlier PIM export"
+        )
+    with col2:
+        new_file = st.file_uploader(
+            "Newer Export",
+            type=UPLOAD_TYPES,
+            help="Upload the later PIM export"
+        )
+
+    if old_file and new_file:
+        try:
+            with st.spinner("Loading exports..."):
+                old_df = normalize_whitespace(read_upload(old_file, dtype=str))
+                new_df = normalize_whitespace(read_upload(new_file, dtype=str))
+
+            errors = []
+            if DIFF_KEY not in old_df.columns:
+                errors.append(f"'{DIFF_KEY}' column missing in Older Export")
+            if DIFF_KEY not in new_df.columns:
+                errors.append(f"'{DIFF_KEY}' column missing in Newer Export")
+
+            if errors:
+                st.error("Validation Errors:")
+                for error in errors:
+                    st.write(f"- {error}")
+                return
+
+            with st.spinner("Comparing exports..."):
+                diff = diff_exports(old_df, new_df)
+
+            # Summary
+            st.markdown("---")
+            metric_cols = st.columns(4)
+            metric_cols[0].metric("Added SKUs", len(diff["added"]))
+            metric_cols[1].metric("Removed SKUs", len(diff["removed"]))
+            metric_cols[2].metric("Modified SKUs", len(diff["modified"]))
+            metric_cols[3].metric("Unchanged SKUs", diff["unchanged"])
+
+            if diff["added_columns"]:
+                st.info(f"Columns only in Newer Export: {', '.join(diff['added_columns'])}")
+            if diff["removed_columns"]:
+                st.info(f"Columns only in Older Export: {', '.join(diff['removed_columns'])}")
+            if diff["duplicates"]:
+                st.warning(f"{diff['duplicates']} duplicate SKU rows were ignored; the first occurrence was compared")
+
+            # Previews
+            for label, key in [("Modified SKUs", "modified"), ("Cell Changes", "changes"),
+                               ("Added SKUs", "added"), ("Removed SKUs", "removed"),
+                               ("Changes per Column", "column_changes")]:
+                if not diff[key].empty:
+                    with st.expander(f"Preview {label}", expanded=key == "modified"):
+                        st.dataframe(diff[key], height=300, use_container_width=True)
+                        st.caption(f"Records: {len(diff[key])}")
+
+            st.success("Comparison complete! Download results:")
+            st.download_button(
+                label="Download Diff Report",
+                data=write_diff_workbook(diff),
+                file_name="export_diff.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+        except Exception as e:
+            st.error(f"Processing error: {str(e)}")
+
+if __name__ == "__main__":
+    run()
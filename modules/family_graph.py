@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from modules.indexes import InvertedIndex
+
+# Columns whose shared values link rows into one family group
+LINK_COLUMNS = ["Family Id", "Import Family Id", "Associated Finishes"]
+
+# Separators between the SKUs listed in Associated Finishes
+FINISH_SEPARATORS = r'\s*[,;|]\s*'
+
+
+def _components(n_nodes, u, v):
+    """Connected-component root of every node, by vectorized hooking and pointer jumping"""
+    parent = np.arange(n_nodes)
+    while len(u):
+        # Hook the larger root of every edge onto the smaller one
+        root_u, root_v = parent[u], parent[v]
+        low = np.minimum(root_u, root_v)
+        np.minimum.at(parent, root_u, low)
+        np.minimum.at(parent, root_v, low)
+
+        # Flatten every tree so each node points straight at its root
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+        if np.array_equal(parent[u], parent[v]):
+            break
+    return parent
+
+
+class FamilyGraph:
+    """Linked family groups of one export, built once and reused by every lookup
+
+    Rows are joined when they share a Family Id or an Import Family Id, or when
+    one lists the other's Material Bank SKU (or Family Id) in Associated
+    Finishes. Finish tokens that name nothing in the export are ignored, so a
+    free-text value never links unrelated families.
+    """
+
+    def __init__(self, export_df):
+        n_rows = len(export_df)
+        all_rows = np.arange(n_rows)
+        rows, nodes = [], []
+
+        def link(row_pos, codes, offset):
+            present = codes >= 0
+            rows.append(row_pos[present])
+            nodes.append(codes[present] + offset)
+
+        # Rows are nodes 0..n-1; every distinct value of a linking column gets a node after them
+        values, offsets = {}, {}
+        n_nodes = n_rows
+        for col in ["Family Id", "Import Family Id", "Material Bank SKU"]:
+            if col in export_df.columns:
+                codes, uniques = pd.factorize(export_df[col].to_numpy(dtype=object))
+                values[col], offsets[col] = pd.Index(uniques, dtype=object), n_nodes
+                n_nodes += len(uniques)
+                # A row's own SKU only matters as a target of Associated Finishes
+                link(all_rows, codes, offsets[col])
+
+        # Associated Finishes tokens join the row to the row owning that SKU or Family Id
+        if "Associated Finishes" in export_df.columns:
+            finishes = pd.Series(export_df["Associated Finishes"].to_numpy(dtype=object), index=all_rows)
+            tokens = finishes.dropna().astype(str).str.split(FINISH_SEPARATORS, regex=True).explode()
+            tokens = tokens[tokens.ne('')]
+            token_rows = tokens.index.to_numpy(dtype=np.intp)
+            token_values = tokens.to_numpy(dtype=object)
+            for col in ["Material Bank SKU", "Family Id"]:
+                if col in values:
+                    link(token_rows, values[col].get_indexer(token_values), offsets[col])
+
+        u = np.concatenate(rows) if rows else np.array([], dtype=np.intp)
+        v = np.concatenate(nodes) if nodes else np.array([], dtype=np.intp)
+        roots = _components(n_nodes, u, v)[:n_rows]
+
+        # Dense group number per row, and a group -> rows index
+        self.group, _ = pd.factorize(roots)
+        self._members = InvertedIndex(self.group)
+
+    def __len__(self):
+        return len(self._members)
+
+    def linked_positions(self, positions):
+        """Sorted row positions of every row linked to any of the given rows"""
+        positions = np.asarray(positions, dtype=np.intp)
+        if len(positions) == 0:
+            return positions
+        return self._members.lookup(self.group[positions])
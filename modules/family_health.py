@@ -0,0 +1,189 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from io import BytesIO
+from modules.catalog_store import export_source_picker, read_store
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload, select_rows
+import warnings
+warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
+
+HEALTH_COLUMNS = ["Material Bank SKU", "Family Id", "Product Type", "Primary Child", "Retired Sku", "Stealth SKU"]
+
+FINDING_COLUMNS = ["Family Id", "Issue", "Members", "Active Members", "Primary Children",
+                   "Active Primary Children", "Configurable Parents", "Primary Child SKUs"]
+
+# Issue name -> description shown in the instructions
+HEALTH_ISSUES = {
+    "No Active Primary Child": "active members exist but none of them is an active, non-stealth primary child",
+    "Multiple Primary Children": "more than one member has Primary Child = Yes",
+    "Retired or Stealth Primary Child": "a member with Primary Child = Yes is retired or stealth",
+    "Missing Configurable Parent": "no configurable row shares the Family Id"
+}
+
+
+def _flag(series, value):
+    """Case- and whitespace-insensitive equality mask of a text column"""
+    return series.fillna('').str.strip().str.lower().eq(value).to_numpy()
+
+
+def scan_families(export_df):
+    """Every unhealthy family of the export, one row per family and issue
+
+    All counts come from a single factorize of Family Id plus bincounts, so the
+    whole catalog is scanned in one pass. Families without any active row are
+    skipped, as are rows without a Family Id.
+    """
+    codes, family_ids = pd.factorize(export_df['Family Id'].to_numpy(dtype=object))
+    in_family = codes >= 0
+    codes = codes[in_family]
+    n_families = len(family_ids)
+
+    configurable = _flag(export_df['Product Type'], 'configurable')[in_family]
+    primary = _flag(export_df['Primary Child'], 'yes')[in_family] & ~configurable
+    active = _flag(export_df['Retired Sku'], 'no')[in_family]
+    stealth = _flag(export_df['Stealth SKU'], 'yes')[in_family]
+
+    def count(mask):
+        return np.bincount(codes, weights=mask, minlength=n_families).astype(np.int64)
+
+    counts = pd.DataFrame({
+        "Family Id": family_ids,
+        "Members": count(~configurable),
+        "Active Members": count(~configurable & active),
+        "Primary Children": count(primary),
+        "Active Primary Children": count(primary & active & ~stealth),
+        "Configurable Parents": count(configurable)
+    })
+    has_active = count(active) > 0
+    inactive_primary = count(primary & (~active | stealth)) > 0
+
+    issues = {
+        "No Active Primary Child": (counts["Active Members"] > 0) & (counts["Active Primary Children"] == 0),
+        "Multiple Primary Children": counts["Primary Children"] > 1,
+        "Retired or Stealth Primary Child": inactive_primary,
+        "Missing Configurable Parent": counts["Configurable Parents"] == 0
+    }
+    findings = pd.concat(
+        [counts[has_active & np.asarray(mask)].assign(Issue=issue) for issue, mask in issues.items()],
+        ignore_index=True
+    )
+
+    # Primary child SKUs of the flagged families only, joined per family after one sort
+    flagged = np.zeros(n_families, dtype=bool)
+    flagged[pd.Index(family_ids).get_indexer(findings["Family Id"])] = True
+    primary_rows = np.flatnonzero(in_family)[primary]
+    primary_codes = codes[primary]
+    keep = flagged[primary_codes]
+    primary_rows, primary_codes = primary_rows[keep], primary_codes[keep]
+    order = np.argsort(primary_codes, kind='stable')
+    primary_codes = primary_codes[order]
+    skus = export_df['Material Bank SKU'].astype(str).to_numpy(dtype=object)[primary_rows[order]]
+    starts = np.flatnonzero(np.r_[True, primary_codes[1:] != primary_codes[:-1]]) if len(order) else order
+    primary_skus = pd.Series(
+        [", ".join(group) for group in np.split(skus, starts[1:])] if len(order) else [],
+        index=pd.Index(family_ids[primary_codes[starts]], dtype=object), dtype=object
+    )
+    findings["Primary Child SKUs"] = findings["Family Id"].map(primary_skus).fillna('')
+
+    return findings[FINDING_COLUMNS]
+
+
+def family_member_rows(export_df, findings):
+    """Export rows of every flagged family, for the members sheet"""
+    family_ids = findings["Family Id"].unique()
+    positions = np.flatnonzero(export_df['Family Id'].isin(family_ids).to_numpy())
+    columns = [col for col in export_df.columns if col in HEALTH_COLUMNS] + \
+              [col for col in export_df.columns if col not in HEALTH_COLUMNS]
+    return select_rows(export_df, positions, columns).sort_values("Family Id", kind='stable')
+
+
+def write_health_workbook(findings, summary, members):
+    """Write the findings, summary and member sheets and return the workbook bytes"""
+    sheets = {
+        'Findings': findings,
+        'Summary': summary,
+        'Family Members': members
+    }
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        text_format = writer.book.add_format({'num_format': '@'})
+
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            worksheet = writer.sheets[sheet_name]
+            for idx, col in enumerate(df.columns):
+                max_len = max(
+                    df[col].astype(str).str.len().max() if len(df) else 0,
+                    len(str(col))
+                ) + 2
+                worksheet.set_column(idx, idx, min(max_len, 50), text_format)
+            worksheet.autofilter(0, 0, len(df), max(len(df.columns)-1, 0))
+
+    return output.getvalue()
+
+
+def run():
+    # Instructions
+    with st.expander("📋 **Family Health Instructions**", expanded=False):
+        issues = "\n".join(f"        - **{issue}:** {description}" for issue, description in HEALTH_ISSUES.items())
+        st.markdown(f"""
+        Upload a full PIM export to list every unhealthy family in one pass.
+
+        **Issues:**
+{issues}
+
+        Families whose rows are all retired are skipped.
+        """)
+
+    use_store = export_source_picker("family_health")
+    export_file = None if use_store else st.file_uploader(
+        "Upload PIM Export File",
+        type=UPLOAD_TYPES,
+        help="Upload a full brand or catalog export from PIM"
+    )
+
+    if use_store or export_file:
+        try:
+            with st.spinner("Loading export..."):
+                if use_store:
+                    export_df = read_store()
+                else:
+                    export_df = normalize_whitespace(read_upload(export_file, dtype=str))
+
+            missing_columns = [col for col in HEALTH_COLUMNS if col not in export_df.columns]
+            if missing_columns:
+                st.error("Validation Errors:")
+                st.write(f"- Missing columns in Export File: {', '.join(missing_columns)}")
+                return
+
+            with st.spinner("Scanning families..."):
+                findings = scan_families(export_df)
+
+            st.markdown("---")
+            if findings.empty:
+                st.success(f"✅ All {export_df['Family Id'].nunique()} families are healthy")
+                return
+
+            summary = findings.groupby("Issue", sort=False).size().rename("Families").reset_index()
+            metric_cols = st.columns(len(HEALTH_ISSUES))
+            for col, issue in zip(metric_cols, HEALTH_ISSUES):
+                col.metric(issue, int(summary.loc[summary["Issue"] == issue, "Families"].sum()))
+
+            st.error(f"🚨 Found {findings['Family Id'].nunique()} unhealthy families "
+                     f"out of {export_df['Family Id'].nunique()}")
+            with st.expander("Preview Findings", expanded=True):
+                st.dataframe(findings, height=400, use_container_width=True, hide_index=True)
+
+            members = family_member_rows(export_df, findings)
+            st.download_button(
+                label="Download Family Health Report",
+                data=write_health_workbook(findings, summary, members),
+                file_name="family_health.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+        except Exception as e:
+            st.error(f"Processing error: {str(e)}")
+
+if __name__ == "__main__":
+    run()
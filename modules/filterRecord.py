@@ -1,23 +1,97 @@
+import re
 import streamlit as st
 import pandas as pd
+import numpy as np
 from io import BytesIO
+from modules.catalog_store import distinct_values, export_source_picker, query_export, read_store, store_columns
+from modules.family_graph import FamilyGraph
+from modules.indexes import InvertedIndex
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload, select_rows
+from modules.uniqueness import warn_output_duplicates
 import warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
 
+# Session cache of the parsed main file and its per-column indexes
+MAIN_FILE_CACHE_KEY = "filter_record_main_file"
+
+
+def load_main_file(main_file):
+    """Parse and clean the main file once per upload; later reruns reuse it and its indexes"""
+    file_key = (main_file.name, main_file.size, getattr(main_file, "file_id", None))
+    cache = st.session_state.get(MAIN_FILE_CACHE_KEY)
+    if cache is None or cache["file"] != file_key:
+        cache = {
+            "file": file_key,
+            "df": normalize_whitespace(read_upload(main_file, dtype=str)),
+            "indexes": {}
+        }
+        st.session_state[MAIN_FILE_CACHE_KEY] = cache
+    return cache
+
+
+def is_pattern(value):
+    """Whether a filter value is a wildcard (`*`, `?`) or `/regex/` pattern rather than an exact value"""
+    return (len(value) > 2 and value.startswith('/') and value.endswith('/')) or any(c in value for c in "*?")
+
+
+def compile_matcher(patterns):
+    """Compile a column's pattern values into one matcher evaluated in a single vectorized pass
+
+    Plain prefix wildcards (`Batch 104-*`) become one tuple `startswith`; every
+    other wildcard (anchored) and `/regex/` (matched anywhere) is joined into one
+    alternation regex. Raises re.error for an invalid regex.
+    """
+    prefixes, regexes = [], []
+    for pattern in patterns:
+        if len(pattern) > 2 and pattern.startswith('/') and pattern.endswith('/'):
+            regexes.append(pattern[1:-1])
+        elif pattern.endswith('*') and not any(c in pattern[:-1] for c in "*?"):
+            prefixes.append(pattern[:-1])
+        else:
+            wildcard = "".join(".*" if c == '*' else "." if c == '?' else re.escape(c) for c in pattern)
+            regexes.append(f"^{wildcard}\\Z")
+    combined = re.compile("|".join(f"(?:{regex})" for regex in regexes), re.DOTALL) if regexes else None
+    prefixes = tuple(prefixes)
+
+    def match(values):
+        # Python regex semantics, whatever string backend the values use
+        text = pd.Series(values, dtype=object).fillna('')
+        result = np.zeros(len(text), dtype=bool)
+        if prefixes:
+            result |= text.str.startswith(prefixes).to_numpy(dtype=bool)
+        if combined is not None:
+            result |= text.str.contains(combined).to_numpy(dtype=bool)
+        return result
+
+    return match
+
+
+def column_index(cache, column):
+    """Value -> row positions index of one main-file column, built on first use"""
+    if column not in cache["indexes"]:
+        cache["indexes"][column] = InvertedIndex(cache["df"][column])
+    return cache["indexes"][column]
+
+
 def run():
     
     # Instructions
     with st.expander("📋 **Filtering Instructions**", expanded=False):
         st.markdown("""
         **How to Use:**
-        1. Upload your main export file (Excel/CSV)
+        1. Upload your main export file (Excel/CSV, gzipped CSV, zip or Parquet)
         2. Upload your filter file containing identifier columns
         3. Select filtering mode (SKU or Family)
         4. Download filtered results with original raw data
 
+        **Patterns (Filter by SKU, when enabled):**
+        - `*` matches any characters and `?` one character, e.g. `Batch 104-*`
+        - `/regex/` matches a regular expression anywhere in the value, e.g. `/Harbor Collection/`
+
         **Modes:**
         - **Filter by SKU:** Matches records directly from filter values
         - **Filter by Family:** Finds all family members of filtered SKUs
+        - **Expand linked families:** Also follows Import Family Id and Associated Finishes links between families
         """)
 
     # Add filter mode selection
@@ -28,48 +102,66 @@ def run():
         horizontal=True
     )
 
-    # File upload section
+    use_patterns = filter_mode == "Filter by SKU" and st.checkbox(
+        "Allow wildcard and regex filter values",
+        help="Treat values containing * or ?, or wrapped in /.../, as patterns instead of exact values"
+    )
+    expand_linked = filter_mode == "Filter by Family" and st.checkbox(
+        "Expand linked families",
+        help="Also include families linked through Import Family Id or Associated Finishes"
+    )
+
+    # File upload section; the main file is optional when the catalog store is used
+    use_store = export_source_picker("filter")
     col1, col2 = st.columns(2)
     with col1:
-        main_file = st.file_uploader(
+        main_file = None if use_store else st.file_uploader(
             "Main Data File",
-            type=["xlsx", "csv"],
+            type=UPLOAD_TYPES,
             help="Upload file containing all records"
         )
     with col2:
         filter_file = st.file_uploader(
             "Filter File",
-            type=["xlsx", "csv"],
+            type=UPLOAD_TYPES,
             help="Upload file with identifier columns to filter by"
         )
 
-    if main_file and filter_file:
+    if (use_store or main_file) and filter_file:
         try:
             # Read files with string preservation
-            def read_file_with_strings(file):
-                if file.name.endswith('.xlsx'):
-                    return pd.read_excel(file, dtype=str)
-                return pd.read_csv(file, dtype=str)
-
-            main_df = read_file_with_strings(main_file)
-            filter_df = read_file_with_strings(filter_file)
+            filter_df = read_upload(filter_file, dtype=str)
 
-            # Clean data while preserving types
-            def clean_string_series(series):
-                return series.str.strip() if series.dtype == 'object' else series
-
-            main_df = main_df.apply(clean_string_series)
-            filter_df = filter_df.apply(clean_string_series)
+            # Strip whitespace once; the filters below reuse the cleaned columns
+            normalize_whitespace(filter_df)
+            if use_store:
+                # Rows are fetched from the store once the filter values are known
+                main_columns = store_columns()
+            else:
+                main_cache = load_main_file(main_file)
+                main_df = main_cache["df"]
+                main_columns = main_df.columns
 
             # Validate columns based on mode
             errors = []
             if filter_mode == "Filter by SKU":
                 filter_columns = filter_df.columns.tolist()
-                missing_columns = [col for col in filter_columns if col not in main_df.columns]
+                missing_columns = [col for col in filter_columns if col not in main_columns]
                 if missing_columns:
                     errors.append(f"Missing columns in main file: {', '.join(missing_columns)}")
+
+                # Compile every column's patterns up front so invalid ones are reported together
+                matchers = {}
+                if use_patterns:
+                    for col in filter_columns:
+                        patterns = [v for v in filter_df[col].dropna().unique() if is_pattern(v)]
+                        if patterns:
+                            try:
+                                matchers[col] = compile_matcher(patterns)
+                            except re.error as e:
+                                errors.append(f"Invalid regex in '{col}': {e}")
             else:
-                if 'Family Id' not in main_df.columns:
+                if 'Family Id' not in main_columns:
                     errors.append("'Family Id' column missing in main file")
                 
                 # Let user select identifier column for family lookup
@@ -79,7 +171,7 @@ def run():
                     help="Select column containing identifiers to find family members"
                 )
                 
-                if identifier_column not in main_df.columns:
+                if identifier_column not in main_columns:
                     errors.append(f"'{identifier_column}' column missing in main file")
 
             if errors:
@@ -93,30 +185,55 @@ def run():
                 # Original SKU filtering logic
                 filter_values = {}
                 for col in filter_df.columns:
-                    clean_values = filter_df[col].dropna().astype(str).str.strip().unique()
+                    clean_values = filter_df[col].dropna().unique()
                     if clean_values.any():
                         filter_values[col] = set(clean_values)
+                    if col in matchers:
+                        filter_values[col] = {v for v in filter_values[col] if not is_pattern(v)}
 
-                mask = pd.Series(False, index=main_df.index)
-                for col, values in filter_values.items():
-                    main_df[col] = main_df[col].astype(str).str.strip()
-                    mask |= main_df[col].isin(values)
-                
-                filtered_df = main_df[mask].copy()
+                # Patterns are matched against each column's distinct values, then looked up exactly
+                for col, matcher in matchers.items():
+                    keys = distinct_values(col) if use_store else column_index(main_cache, col).keys
+                    filter_values[col] |= set(keys[matcher(keys)])
+
+                if use_store:
+                    filtered_df = query_export(filter_values)
+                else:
+                    # Union of index lookups: cost follows the filter size, not the file size
+                    positions = [column_index(main_cache, col).lookup(list(values))
+                                 for col, values in filter_values.items()]
+                    positions = np.unique(np.concatenate(positions)) if positions else np.array([], dtype=np.intp)
+                    filtered_df = select_rows(main_df, positions)
 
             else:  # Filter by Family
                 # Get unique identifiers from filter file
-                filter_ids = filter_df[identifier_column].dropna().astype(str).str.strip().unique()
-                
-                # Find matching family IDs in main data
-                family_mask = main_df[identifier_column].astype(str).str.strip().isin(filter_ids)
-                family_ids = main_df[family_mask]['Family Id'].astype(str).str.strip().unique()
-                
-                # Filter by family IDs
-                filtered_df = main_df[main_df['Family Id'].astype(str).str.strip().isin(family_ids)].copy()
+                filter_ids = filter_df[identifier_column].dropna().unique()
+
+                if expand_linked:
+                    # Linked groups are built once per main file and reused across reruns
+                    if use_store:
+                        main_df = read_store()
+                        family_graph = FamilyGraph(main_df)
+                    else:
+                        if "family_graph" not in main_cache:
+                            main_cache["family_graph"] = FamilyGraph(main_df)
+                        family_graph = main_cache["family_graph"]
+                    match_pos = np.flatnonzero(main_df[identifier_column].isin(filter_ids).to_numpy())
+                    filtered_df = select_rows(main_df, family_graph.linked_positions(match_pos))
+                elif use_store:
+                    filtered_df = query_export({identifier_column: filter_ids},
+                                               expand_family=True, include_matches=False)
+                else:
+                    # Find matching family IDs in main data
+                    family_mask = main_df[identifier_column].isin(filter_ids)
+                    family_ids = main_df.loc[family_mask, 'Family Id'].dropna().unique()
+
+                    # Filter by family IDs
+                    filtered_df = main_df[main_df['Family Id'].isin(family_ids)]
 
             # Show statistics
             st.success(f"Found {len(filtered_df)} matching records")
+            warn_output_duplicates(filtered_df, "Filtered Records")
 
             # Preview
             with st.expander("Preview Filtered Data", expanded=False):
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+
+class InvertedIndex:
+    """Value -> row positions index over one column, built once per file
+
+    Rows are grouped by value with a single factorize + stable argsort, so a
+    lookup costs time proportional to the number of values looked up and the
+    rows they hit, not the size of the file. Missing values are not indexed.
+    """
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        present = codes >= 0
+        counts = np.bincount(codes[present], minlength=len(uniques))
+
+        self.keys = pd.Index(uniques, dtype=object)
+        self._order = np.argsort(codes, kind='stable')[np.count_nonzero(~present):]
+        self._starts = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, values):
+        """Sorted row positions of every row whose value is in `values`"""
+        codes = self.keys.get_indexer(pd.unique(np.asarray(values, dtype=object)))
+        codes = codes[codes >= 0]
+        if len(codes) == 0:
+            return np.array([], dtype=np.intp)
+
+        # Expand each matched value's [start, end) slice without a Python loop
+        starts = self._starts[codes]
+        lengths = self._starts[codes + 1] - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        positions = self._order[offsets + np.arange(lengths.sum())]
+        return np.sort(positions)
+
+
+def normalize_names(values):
+    """Unicode-normalized (NFKC), case-folded, whitespace-collapsed names; empty names become NaN"""
+    names = (pd.Series(np.asarray(values, dtype=object), dtype=object).fillna('').astype(str)
+             .str.normalize('NFKC').str.casefold().str.replace(r'\s+', ' ', regex=True).str.strip())
+    return names.astype(object).where(names.ne(''))
+
+
+class NameIndex(InvertedIndex):
+    """Normalized name -> row positions index, for names typed with different casing or spacing
+
+    Ticket values ending in `*` are prefix lookups over the sorted normalized names.
+    """
+
+    def __init__(self, names):
+        super().__init__(normalize_names(names))
+        self._sorted_keys = np.sort(self.keys.to_numpy(dtype=object))
+
+    def lookup(self, names):
+        """Sorted row positions of every row whose normalized name is in `names`"""
+        return super().lookup(normalize_names(names).dropna())
+
+    def lookup_prefix(self, prefixes):
+        """Sorted row positions of every row whose normalized name starts with one of `prefixes`"""
+        keys = []
+        for prefix in normalize_names(prefixes).dropna():
+            start = np.searchsorted(self._sorted_keys, prefix, side='left')
+            end = np.searchsorted(self._sorted_keys, prefix + '\U0010ffff', side='left')
+            keys.append(self._sorted_keys[start:end])
+        return super().lookup(np.concatenate(keys)) if keys else np.array([], dtype=np.intp)
+
+    def match(self, names):
+        """Sorted row positions for ticket names: exact normalized names plus `*` prefixes"""
+        names = pd.Series(np.asarray(names, dtype=object), dtype=object).dropna().astype(str).str.strip()
+        is_prefix = names.str.endswith('*').to_numpy(dtype=bool)
+        return np.union1d(self.lookup(names[~is_prefix]), self.lookup_prefix(names[is_prefix].str[:-1]))
+
+
+# Ticket identifier matched through a NameIndex instead of exact equality
+NAME_IDENTIFIER = "Product Name"
+
+
+def identifier_positions(values, identifiers, identifier_type, name_index=None):
+    """Sorted row positions whose identifier matches a ticket value
+
+    Product Name tickets go through a NameIndex (built here unless one is
+    passed); every other identifier matches exactly.
+    """
+    if identifier_type == NAME_IDENTIFIER:
+        if name_index is None:
+            name_index = NameIndex(values)
+        return name_index.match(identifiers)
+    return np.flatnonzero(pd.Series(np.asarray(values, dtype=object)).isin(identifiers).to_numpy())
+
+
+def unmatched_identifiers(values, identifiers, identifier_type, positions):
+    """Ticket values that matched none of the rows at `positions`
+
+    Checked per ticket value, since one Product Name (or `*` prefix) can match
+    several spellings in the export.
+    """
+    identifiers = pd.Series(np.asarray(identifiers, dtype=object), dtype=object).dropna()
+    matched = pd.Series(np.asarray(values, dtype=object)[positions], dtype=object)
+    if identifier_type != NAME_IDENTIFIER:
+        return identifiers[~identifiers.isin(matched)].to_numpy()
+
+    matched_names = np.sort(normalize_names(matched).dropna().unique().astype(object))
+    text = identifiers.astype(str).str.strip()
+    is_prefix = text.str.endswith('*').to_numpy(dtype=bool)
+    names = normalize_names(text.where(~is_prefix, text.str[:-1])).to_numpy(dtype=object)
+    found = np.zeros(len(names), dtype=bool)
+    for i, name in enumerate(names):
+        if pd.isna(name):
+            continue
+        start = np.searchsorted(matched_names, name, side='left')
+        if start < len(matched_names):
+            found[i] = matched_names[start].startswith(name) if is_prefix[i] else matched_names[start] == name
+    return identifiers[~found].to_numpy()
@@ -0,0 +1,168 @@
+import io
+import zipfile
+from io import BytesIO
+import numpy as np
+import pandas as pd
+
+# Extensions accepted by every uploader; any '.gz' upload is read as a gzip-compressed CSV export
+UPLOAD_TYPES = ["xlsx", "csv", "gz", "zip", "parquet"]
+
+# File types that may be stored inside a '.zip' upload
+ZIP_MEMBER_TYPES = (".csv", ".xlsx", ".parquet")
+
+# Upload suffixes stripped to get a file's base name, longest first
+UPLOAD_SUFFIXES = (".csv.gz", ".csv", ".xlsx", ".zip", ".parquet", ".gz")
+
+
+class _MemoryReader(io.RawIOBase):
+    """Seekable read-only stream over a memoryview, without copying it"""
+
+    def __init__(self, buffer):
+        self._buffer = buffer.cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        size = min(len(b), len(self._buffer) - self._pos)
+        b[:size] = self._buffer[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._buffer) + offset
+        self._pos = max(self._pos, 0)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def upload_buffer(file):
+    """Return the upload's underlying bytes as a memoryview (no copy)"""
+    if hasattr(file, "getbuffer"):
+        return file.getbuffer()
+    return memoryview(file.getvalue())
+
+
+def open_upload(file):
+    """Open an independent binary stream over the upload's buffer
+
+    Every call gets its own cursor, so several readers can parse the same
+    upload without seeking each other or duplicating its bytes.
+    """
+    return io.BufferedReader(_MemoryReader(upload_buffer(file)))
+
+
+def normalize_whitespace(df):
+    """Strip surrounding whitespace from every string column, once, in place"""
+    for col in df.columns:
+        if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].str.strip()
+    return df
+
+
+def upload_stem(file_name):
+    """File name without its upload suffix; other dots (e.g. 'MB-1.2.csv') are kept"""
+    name = file_name.replace('\\', '/').rsplit('/', 1)[-1]
+    for suffix in UPLOAD_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def select_rows(df, positions, columns=None):
+    """Materialize the given row positions (and columns) in a single take"""
+    positions = np.asarray(positions, dtype=np.intp)
+    if columns is None:
+        return df.iloc[positions]
+    return df.iloc[positions, df.columns.get_indexer(columns)]
+
+
+def _column_filter(columns):
+    """Build a usecols callable that keeps only the requested columns"""
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return lambda col: col in wanted
+
+
+def _read_csv(source, dtype, columns, compression=None):
+    return pd.read_csv(source, dtype=dtype, usecols=_column_filter(columns), compression=compression)
+
+
+def _read_excel(source, dtype, columns):
+    return pd.read_excel(source, dtype=dtype, usecols=_column_filter(columns))
+
+
+def _read_parquet(source, dtype, columns):
+    """Read only the requested columns from a Parquet file"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if isinstance(source, memoryview):
+        # Zero-copy: Arrow reads straight from the upload buffer
+        source = pa.BufferReader(pa.py_buffer(source))
+    parquet_file = pq.ParquetFile(source)
+    if columns is not None:
+        # Project onto the columns that exist so missing ones surface in validation
+        available = set(parquet_file.schema_arrow.names)
+        columns = [col for col in dict.fromkeys(columns) if col in available]
+    df = parquet_file.read(columns=columns).to_pandas()
+
+    if dtype is str:
+        # Match the string-preserving behaviour of the CSV/Excel readers
+        df = df.astype(str).where(df.notna())
+    return df
+
+
+def _read_zip(file, dtype, columns):
+    """Read the first CSV/XLSX/Parquet member of a zip archive"""
+    with zipfile.ZipFile(open_upload(file)) as archive:
+        members = [
+            name for name in archive.namelist()
+            if name.lower().endswith(ZIP_MEMBER_TYPES) and not name.startswith("__MACOSX/")
+        ]
+        if not members:
+            raise ValueError("Zip archive does not contain a .csv, .xlsx or .parquet file")
+
+        member = members[0]
+        with archive.open(member) as stream:
+            if member.lower().endswith(".csv"):
+                # CSV is decompressed and parsed in a single streaming pass
+                return _read_csv(stream, dtype, columns)
+            # Excel and Parquet readers need random access to the member
+            content = BytesIO(stream.read())
+        if member.lower().endswith(".xlsx"):
+            return _read_excel(content, dtype, columns)
+        return _read_parquet(content, dtype, columns)
+
+
+def read_upload(file, dtype=None, columns=None):
+    """Read an uploaded xlsx/csv/csv.gz (or .gz)/zip/parquet file into a DataFrame
+
+    Parsing reads directly from the upload's buffer. `columns` optionally
+    limits parsing to the named columns; columns that are not in the file are
+    skipped so callers can still report them as missing.
+    """
+    name = file.name.lower()
+    if name.endswith(".xlsx"):
+        return _read_excel(open_upload(file), dtype, columns)
+    if name.endswith(".csv"):
+        return _read_csv(open_upload(file), dtype, columns)
+    if name.endswith(".gz"):
+        return _read_csv(open_upload(file), dtype, columns, compression="gzip")
+    if name.endswith(".zip"):
+        return _read_zip(file, dtype, columns)
+    if name.endswith(".parquet"):
+        return _read_parquet(upload_buffer(file), dtype, columns)
+    raise ValueError("Unsupported file type. Please upload .xlsx, .csv, .csv.gz, .gz, .zip or .parquet")
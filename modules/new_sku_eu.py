@@ -1,6 +1,10 @@
 import streamlit as st
-import pandas as pd
-from io import BytesIO
+from modules.catalog_index import render_collision_check
+from modules.loaders import UPLOAD_TYPES, read_upload
+from modules.preview import clear_preview, preview_checks, preview_option
+from modules.reference_data import load_reference_data, render_reference_check
+from modules.revalidation import ViolationDisplay, file_fingerprint, render_recheck_summary, revalidate, select_violations
+from modules.uniqueness import render_uniqueness_check
 
 def run():
     st.header("EU SKU Validation")
@@ -42,6 +46,10 @@ def run():
     "Country Of Manufacturer", "Commodity Description", "HS Code", "Sample Type"
     ]
     
+    # Fields checked against the reference tables in constants/reference_data.json
+    REFERENCE_FIELDS = ["Taxonomy Node", "Attribute Set Code", "US Hierarchy Category V2", "Primary Color Family",
+                        "Color Saturation", "Sample Type", "HS Code"]
+
     FIELD_PATTERNS = {
         "Batch Number": {
             "pattern": r'^Batch \d{3}(?:-\d{2})?$',  
@@ -62,101 +70,17 @@ def run():
             for attr in missing_attributes:
                 st.write(f"- {attr}")   
                 
-    def check_non_empty_fields(df, fields_to_check):
-        """Check for empty values in specified fields and alert the user."""
-        errors = {}
-        for field in fields_to_check:
-            if field in df.columns:
-                # Check for NaN or empty strings
-                empty_mask = df[field].isna() | (df[field].astype(str).str.strip() == '')
-                empty_rows = df[empty_mask]
-                if not empty_rows.empty:
-                    errors[field] = empty_rows
-        
-        if errors:
-            st.warning("⚠️ Empty values detected in required fields!")
-            for field, empty_df in errors.items():
-                with st.expander(f"Empty values in '{field}'"):
-                    st.write(f"Number of empty entries: {len(empty_df)}")
-                    if "Manufacturer Sku EU" in df.columns:
-                        st.dataframe(empty_df[["Manufacturer Sku EU", field]])
-                    else:
-                        st.dataframe(empty_df[field])
-        
-            
-    def validate_field_patterns(df):
-        """Validate field values against required patterns"""
-        errors = {}
-        for field, config in FIELD_PATTERNS.items():
-            if field in df.columns:
-                # Convert to string and strip whitespace for validation
-                cleaned_series = df[field].astype(str).str.strip()
-                
-                # Create mask for invalid entries
-                invalid_mask = ~cleaned_series.str.match(config["pattern"])
-                invalid_entries = df[invalid_mask]
-                
-                if not invalid_entries.empty:
-                    errors[field] = {
-                        "invalid": invalid_entries,
-                        "example": config["example"]
-                    }
-        return errors
-
-                
-    def check_expected_values(df, expected_values):
-        """Validate field values match expected requirements"""
-        errors = {}
-        for field, expected in expected_values.items():
-            if field in df.columns:
-                # Find mismatches (case-sensitive comparison)
-                mismatches = df[df[field].astype(str) != expected]
-                if not mismatches.empty:
-                    errors[field] = {
-                        'expected': expected,
-                        'invalid_entries': mismatches[["Manufacturer Sku EU",field]]
-                    }
-        return errors
-
     def load_file(uploaded_file):
         """Load uploaded file into DataFrame"""
         try:
-            if uploaded_file.name.endswith('.xlsx'):
-                return pd.read_excel(uploaded_file, engine='openpyxl')
-            elif uploaded_file.name.endswith('.csv'):
-                return pd.read_csv(uploaded_file)
-            else:
-                st.error("Unsupported file type. Please upload .xlsx or .csv")
-                return None
+            return read_upload(uploaded_file)
         except Exception as e:
             st.error(f"Error loading file: {e}")
             return None
         
-    def check_primary_child_column(df):
-        """Check for empty values in Primary Child column and alert the user."""
-        if "Primary Child" in df.columns and "Material Bank SKU" in df.columns:
-            empty_primary_child = df[df["Primary Child"].isna()]
-
-            if not empty_primary_child.empty:
-                st.warning("⚠️ Empty values detected in 'Primary Child' column!")
-                st.write("To maintain uniformity, consider adding 'No' for non-primary child SKUs.")
-
-                # Convert 'Material Bank SKU' to string to prevent number formatting issues
-                empty_primary_child = df[df["Primary Child"].isna()].copy()
-                empty_primary_child["Material Bank SKU"] = empty_primary_child["Material Bank SKU"].astype(str)
-                
-                st.dataframe(empty_primary_child[["Material Bank SKU", "Primary Child"]])
-                
-            
-        
-
-    def review_field_values(main_df, sku_df, match_field, necessary_fields):
-        """EU-specific field comparison without CatalogItemID logic"""
+    def review_field_values(main_df, sku_df, match_field, violations, display):
+        """EU-specific SKU comparison and field mismatches without CatalogItemID logic"""
         try:
-            # Convert matching field
-            main_df[match_field] = main_df[match_field].astype(str)
-            sku_df[match_field] = sku_df[match_field].astype(str)
-
             # SKU comparisons
             main_skus = set(main_df[match_field])
             sku_skus = set(sku_df[match_field])
@@ -174,34 +98,19 @@ def run():
                     st.warning("Extra SKUs in the Import file:")
                     st.write(list(extra_in_main))
 
-            # Merge dataframes
-            merged_df = pd.merge(main_df, sku_df, 
-                               on=match_field, 
-                               suffixes=("_ImportFile", "_SkuList"))
-
-            # Mismatch detection 
-            mismatches = []
-            for field in necessary_fields:
-                col_main = f"{field}_ImportFile"
-                col_sku = f"{field}_SkuList"
-                
-                if col_main in merged_df.columns and col_sku in merged_df.columns:
-                    mismatch = merged_df[merged_df[col_main] != merged_df[col_sku]]
-                    if not mismatch.empty:
-                        mismatches.append((
-                            field, 
-                            mismatch[[match_field, col_main, col_sku]]
-                        ))
-
-            # Display results
-            if not mismatches:
+            # Field mismatches come from the (incrementally maintained) violation table
+            mismatches = select_violations(violations, "Field Mismatch")
+            if mismatches.empty:
                 st.success("All necessary fields match between files!")
             else:
                 st.error("Field mismatches detected:")
-                for field, mismatch_df in mismatches:
-                    with st.expander(f"Mismatches in {field}"): 
-                        st.write(f"Comparison between Import File and SKU List for {field}")
-                        st.dataframe(mismatch_df)
+                for field in NECESSARY_FIELDS:
+                    mismatch_df = select_violations(mismatches, "Field Mismatch", field)
+                    if not mismatch_df.empty:
+                        with st.expander(f"Mismatches in {field}"):
+                            st.write(f"Comparison between Import File and SKU List for {field}")
+                            display.show(mismatch_df, ["Key", "Value", "Expected"],
+                                         [match_field, f"{field}_ImportFile", f"{field}_SkuList"], f"Field Mismatch: {field}")
 
         except Exception as e:
             st.error(f"Comparison error: {str(e)}")
@@ -267,6 +176,9 @@ def run():
         
         ✅ **Primary Child Check**: 
         _Flags missing values in the `Primary Child` column and suggests corrections_
+        
+        ✅ **Reference Data**:
+        _Checks taxonomy, attribute set, category and color values (and taxonomy/attribute set pairs) against the reference tables in `constants/reference_data.json`_
 
         📌 Use this tool to quickly identify discrepancies and ensure data accuracy before importing SKUs.
         """)
@@ -274,8 +186,9 @@ def run():
         st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
     
     # File uploaders
-    main_file = st.file_uploader("Upload EU Import File", type=["xlsx", "csv"])
-    sku_file = st.file_uploader("Upload EU SKU List", type=["xlsx", "csv"])
+    main_file = st.file_uploader("Upload EU Import File", type=UPLOAD_TYPES)
+    sku_file = st.file_uploader("Upload EU SKU List", type=UPLOAD_TYPES)
+    quick_preview = preview_option("preview_eu")
 
     if main_file and sku_file:
         st.subheader("Validation Results")
@@ -286,38 +199,102 @@ def run():
             sku_df = load_file(sku_file)
 
         if main_df is not None and sku_df is not None:
+            match_field = "Manufacturer Sku EU"
+
             # 1. Attribute check
             st.write("### Required Attributes Check")
             check_attributes_in_excel(main_df, REQUIRED_ATTRIBUTES)
 
+            errors = []
+            if match_field not in main_df.columns:
+                errors.append(f"'{match_field}' column missing in Import File")
+            if match_field not in sku_df.columns:
+                errors.append(f"'{match_field}' column missing in SKU List File")
+            if errors:
+                st.error("Validation Errors:")
+                for error in errors:
+                    st.write(f"- {error}")
+                return
+
+            # Re-uploads in this session only re-check rows whose content changed
+            reference = load_reference_data()
+            rules = {
+                "expected_values": EXPECTED_VALUES,
+                "non_empty_fields": NON_EMPTY_FIELDS,
+                "field_patterns": FIELD_PATTERNS,
+                "necessary_fields": NECESSARY_FIELDS,
+                "reference_data": reference,
+                "reference_fields": REFERENCE_FIELDS
+            }
+            main_df[match_field] = main_df[match_field].astype(str)
+            sku_df[match_field] = sku_df[match_field].astype(str)
+            context = (file_fingerprint(sku_file), tuple(main_df.columns), reference["version"])
+
+            # Large imports show sampled results first; the full run replaces them
+            preview = preview_checks(main_df, match_field, rules, sku_df, quick_preview)
+            with st.spinner("Validating..."):
+                result = revalidate(main_df, sku_df, match_field, rules, "revalidation_eu", context)
+            clear_preview(preview)
+            violations = result["violations"]
+            render_recheck_summary(result)
+
+            # Violation tables are capped per rule; "Load all" fetches the rest for this upload
+            display = ViolationDisplay("violation_display_eu", (context, file_fingerprint(main_file)))
+
             # 2. Field comparison
             st.write("### Field Value Comparison")
-            review_field_values(main_df, sku_df, "Manufacturer Sku EU", NECESSARY_FIELDS)
+            review_field_values(main_df, sku_df, match_field, violations, display)
             
             # 3. Expected Values Check (NEW)
             st.write("### Expected Values Validation")
-            value_errors = check_expected_values(main_df, EXPECTED_VALUES)
+            value_errors = select_violations(violations, "Expected Value")
             
-            if not value_errors:
+            if value_errors.empty:
                 st.success("✅ All expected values match requirements")
             else:
-                st.error(f"Found {len(value_errors)} fields with invalid values")
-                for field, details in value_errors.items():
-                    with st.expander(f"Invalid {field} values", expanded=False):
-                        st.write(f"Expected Value: {details['expected']}")
-                        st.dataframe(details['invalid_entries'])
+                st.error(f"Found {value_errors['Field'].nunique()} fields with invalid values")
+                for field, expected in EXPECTED_VALUES.items():
+                    invalid_entries = select_violations(value_errors, "Expected Value", field)
+                    if not invalid_entries.empty:
+                        with st.expander(f"Invalid {field} values", expanded=False):
+                            st.write(f"Expected Value: {expected}")
+                            display.show(invalid_entries, ["Key", "Value"], [match_field, field], f"Expected Value: {field}")
                         
             # 4. Check for required fields non-emptiness           
-            check_non_empty_fields(main_df, NON_EMPTY_FIELDS)
+            empty_values = select_violations(violations, "Empty Value")
+            if not empty_values.empty:
+                st.warning("⚠️ Empty values detected in required fields!")
+                for field in NON_EMPTY_FIELDS:
+                    empty_df = select_violations(empty_values, "Empty Value", field)
+                    if not empty_df.empty:
+                        with st.expander(f"Empty values in '{field}'"):
+                            st.write(f"Number of empty entries: {len(empty_df)}")
+                            display.show(empty_df, ["Key", "Value"], [match_field, field], f"Empty Value: {field}")
             
             #Check Batch number format
-            pattern_errors = validate_field_patterns(main_df)
-            if pattern_errors:
-                for field, details in pattern_errors.items():
-                    st.error(f"Invalid format in '{field}'. Expected format: {details['example']}")
+            for field, config in FIELD_PATTERNS.items():
+                invalid = select_violations(violations, "Invalid Format", field)
+                if not invalid.empty:
+                    st.error(f"Invalid format in '{field}'. Expected format: {config['example']}")
                     with st.expander(f"View invalid {field} entries"):
-                        st.dataframe(details["invalid"][["Manufacturer Sku EU", field]])
+                        display.show(invalid, ["Key", "Value"], [match_field, field], f"Invalid Format: {field}")
                         
-            # 5. Check for empty 'Primary Child' values
-            # st.write("### Primary Child Column Check")
-            check_primary_child_column(main_df)
\ No newline at end of file
+            # 5. Reference data check
+            st.write("### Reference Data Check")
+            render_reference_check(violations, match_field, reference, REFERENCE_FIELDS, display)
+
+            # 6. Catalog collision check
+            st.write("### Catalog Collision Check")
+            render_collision_check(main_df, main_file)
+
+            # 7. In-file uniqueness check
+            st.write("### Duplicate Key Check")
+            render_uniqueness_check(main_df)
+
+            # 8. Check for empty 'Primary Child' values
+            empty_primary_child = select_violations(violations, "Primary Child Empty")
+            if not empty_primary_child.empty:
+                st.warning("⚠️ Empty values detected in 'Primary Child' column!")
+                st.write("To maintain uniformity, consider adding 'No' for non-primary child SKUs.")
+                display.show(empty_primary_child, ["Material Bank SKU", "Value"], ["Material Bank SKU", "Primary Child"],
+                             "Primary Child Empty")
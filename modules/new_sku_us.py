@@ -1,8 +1,11 @@
 import streamlit as st
-import pandas as pd
-from io import BytesIO
-import json
-from pathlib import Path
+from modules.catalog_index import render_collision_check
+from modules.loaders import UPLOAD_TYPES, read_upload
+from modules.preview import clear_preview, preview_checks, preview_option
+from modules.reference_data import load_reference_data, render_reference_check
+from modules.revalidation import ViolationDisplay, file_fingerprint, render_recheck_summary, revalidate, select_violations
+from modules.state_permissions import load_state_permissions, requires_state_permission
+from modules.uniqueness import render_uniqueness_check
 
 """ Code structure:
 
@@ -12,7 +15,10 @@ File Loading**: The `load_file` function reads Excel or CSV files.
 
 Attribute Check**: `check_attributes_in_excel` verifies if all required columns are present.
 
-Field Comparison**: `review_field_values` merges dataframes, checks for mismatches, and handles configurable products appropriately.
+Field Comparison**: `review_field_values` compares SKU sets and shows field mismatches from the violation table.
+
+Incremental Re-validation**: `revalidate` (modules/revalidation.py) runs the row-level and SKU-list checks, re-checking
+only rows whose content changed since the previous upload in this session, and reports resolved/introduced violations.
 
 Handling Configurable Products**: The logic skips CatalogItemID validation for configurable products by filtering those rows during comparison. """
 
@@ -53,6 +59,10 @@ def run():
     "Item Type", "Description", "Color Variety", "Color Saturation", "Primary Color Family", "Sample Type"
     ]
     
+    # Fields checked against the reference tables in constants/reference_data.json
+    REFERENCE_FIELDS = ["Taxonomy Node", "Attribute Set Code", "US Hierarchy Category V2", "Primary Color Family",
+                        "Color Saturation", "Sample Type"]
+
     FIELD_PATTERNS = {
         "Batch Number": {
             "pattern": r'^Batch \d{3}(?:-\d{2})?$',
@@ -72,98 +82,19 @@ def run():
             for attr in missing_attributes:
                 st.write(f"- {attr}")
                 
-    def check_non_empty_fields(df, fields_to_check):
-        """Check for empty values in specified fields and alert the user."""
-        errors = {}
-        for field in fields_to_check:
-            if field in df.columns:
-                # Check for NaN or empty strings
-                empty_mask = df[field].isna() | (df[field].astype(str).str.strip() == '')
-                empty_rows = df[empty_mask]
-                if not empty_rows.empty:
-                    errors[field] = empty_rows
-        
-        if errors:
-            st.warning("⚠️ Empty values detected in required fields!")
-            for field, empty_df in errors.items():
-                with st.expander(f"Empty values in '{field}'"):
-                    st.write(f"Number of empty entries: {len(empty_df)}")
-                    if "Manufacturer Sku" in df.columns:
-                        st.dataframe(empty_df[["Manufacturer Sku", field]])
-                    else:
-                        st.dataframe(empty_df[field])
-        
-            
-    def validate_field_patterns(df):
-        """Validate field values against required patterns"""
-        errors = {}
-        for field, config in FIELD_PATTERNS.items():
-            if field in df.columns:
-                # Convert to string and strip whitespace for validation
-                cleaned_series = df[field].astype(str).str.strip()
-                
-                # Create mask for invalid entries
-                invalid_mask = ~cleaned_series.str.match(config["pattern"])
-                invalid_entries = df[invalid_mask]
-                
-                if not invalid_entries.empty:
-                    errors[field] = {
-                        "invalid": invalid_entries,
-                        "example": config["example"]
-                    }
-        return errors
-
-                
-    def check_expected_values(df, expected_values):
-        """Validate field values match expected requirements"""
-        errors = {}
-        for field, expected in expected_values.items():
-            if field in df.columns:
-                # Find mismatches (case-sensitive comparison)
-                mismatches = df[df[field].astype(str) != expected]
-                if not mismatches.empty:
-                    errors[field] = {
-                        'expected': expected,
-                        'invalid_entries': mismatches[["Manufacturer Sku",field]]
-                    }
-        return errors
-
     def load_file(uploaded_file):
         """Load uploaded file into DataFrame"""
         try:
-            if uploaded_file.name.endswith('.xlsx'):
-                return pd.read_excel(uploaded_file, engine='openpyxl')
-            elif uploaded_file.name.endswith('.csv'):
-                return pd.read_csv(uploaded_file)
-            else:
-                st.error("Unsupported file type. Please upload .xlsx or .csv")
-                return None
+            return read_upload(uploaded_file)
         except Exception as e:
             st.error(f"Error loading file: {e}")
             return None
         
     
 
-    def review_field_values(main_df, sku_df, match_field, necessary_fields):
-        """Compare values between Import file and SKU list"""
+    def review_field_values(main_df, sku_df, match_field, violations, display):
+        """Compare SKUs between Import file and SKU list and show field mismatches"""
         try:
-            # Convert matching field to string type
-            main_df[match_field] = main_df[match_field].astype(str)
-            sku_df[match_field] = sku_df[match_field].astype(str)
-
-            
-            # # Identify configurable rows but keep CatalogItemID in necessary_fields
-            # configurable_mask = None
-            # if 'Product Type' in main_df.columns:
-            #  configurable_mask = main_df['Product Type'].str.lower() == 'configurable'
-            # Store configurable status before merge
-            main_df = main_df.copy()
-            if 'Product Type' in main_df.columns:
-             main_df['_is_configurable'] = main_df['Product Type'].str.lower() == 'configurable'
-            else:
-             main_df['_is_configurable'] = False
-
-
             # SKU comparisons
             main_skus = set(main_df[match_field])
             sku_skus = set(sku_df[match_field])
@@ -181,118 +112,23 @@ def run():
                     st.warning("Extra SKUs in the Import file:")
                     st.write(list(extra_in_main))
 
-            # Merge dataframes
-            merged_df = pd.merge(main_df, sku_df, on=match_field, suffixes=("_ImportFile", "_SkuList"))
-            
-            # Force string type for CatalogItemID comparison
-            if 'CatalogItemID_ImportFile' in merged_df.columns:
-             merged_df['CatalogItemID_ImportFile'] = merged_df['CatalogItemID_ImportFile'].astype(str)
-            if 'CatalogItemID_SkuList' in merged_df.columns:
-             merged_df['CatalogItemID_SkuList'] = merged_df['CatalogItemID_SkuList'].astype(str)
-
-            mismatches = []
-            for field in necessary_fields:
-             col_main = f"{field}_ImportFile"
-             col_sku = f"{field}_SkuList"
-            
-             if col_main in merged_df.columns and col_sku in merged_df.columns:
-                 # Handle CatalogItemID specially for configurable products
-                # if field == 'CatalogItemID' and configurable_mask is not None:
-                #     # Only validate NON-configurable rows for CatalogItemID
-                #     temp_df = merged_df[~configurable_mask.reindex(merged_df.index, fill_value=False)]
-                # else:
-                #     temp_df = merged_df
-                if field == 'CatalogItemID':
-                    temp_df = merged_df[~merged_df['_is_configurable']]
-                else:
-                    temp_df = merged_df
-                
-                # Find mismatches
-                mismatch = temp_df[temp_df[col_main] != temp_df[col_sku]]
-                
-                # mismatch = merged_df[merged_df[col_main] != merged_df[col_sku]]
-                if not mismatch.empty:
-                    # Store field-specific columns
-                    mismatches.append((
-                        field, 
-                        mismatch[[match_field, col_main, col_sku]]
-                    ))
-
-            # Display results
-            if not mismatches:
-             st.success("All necessary fields match between files!")
+            # Field mismatches come from the (incrementally maintained) violation table;
+            # CatalogItemID is not compared for configurable products
+            mismatches = select_violations(violations, "Field Mismatch")
+            if mismatches.empty:
+                st.success("All necessary fields match between files!")
             else:
-             st.error("Field mismatches detected:")
-             for field, mismatch_df in mismatches:
-                with st.expander(f"Mismatches in {field}"): 
-                    st.write(f"Comparison between Import File and SKU List for {field}")
-                    st.dataframe(mismatch_df)
+                st.error("Field mismatches detected:")
+                for field in NECESSARY_FIELDS:
+                    mismatch_df = select_violations(mismatches, "Field Mismatch", field)
+                    if not mismatch_df.empty:
+                        with st.expander(f"Mismatches in {field}"):
+                            st.write(f"Comparison between Import File and SKU List for {field}")
+                            display.show(mismatch_df, ["Key", "Value", "Expected"],
+                                         [match_field, f"{field}_ImportFile", f"{field}_SkuList"], f"Field Mismatch: {field}")
 
         except Exception as e:
             st.error(f"Comparison error: {str(e)}")
-            
-    def check_primary_child_column(df):
-        """Check for empty values in Primary Child column and alert the user."""
-        if "Primary Child" in df.columns and "Material Bank SKU" in df.columns:
-            empty_primary_child = df[df["Primary Child"].isna()]
-
-            if not empty_primary_child.empty:
-                st.warning("⚠️ Empty values detected in 'Primary Child' column!")
-                st.write("To maintain uniformity, consider adding 'No' for non-primary child SKUs.")
-
-                # Convert 'Material Bank SKU' to string to prevent number formatting issues
-                empty_primary_child = df[df["Primary Child"].isna()].copy()
-                empty_primary_child["Material Bank SKU"] = empty_primary_child["Material Bank SKU"].astype(str)
-                
-                st.dataframe(empty_primary_child[["Material Bank SKU", "Primary Child"]])
-                
-            
-                
-
-    def load_state_permission_brands():
-        """Load state permission required manufacturers"""
-        try:
-            path = Path(__file__).resolve().parent.parent / "constants" / "state_permission_brands.json"
-            with open(path) as f:
-                return json.load(f)
-        except FileNotFoundError:
-            st.error("State permission brand list not found")
-            st.error("Constants folder structure: " + str(Path(__file__).resolve()))
-            return []
-        except json.JSONDecodeError:
-            st.error("Invalid state permission brand list format")
-            return []
-
-    def validate_state_permissions(df, required_brands):
-        """Check state permission requirements"""
-        alerts = []
-        
-        # Check if manufacturer column exists
-        if "Manufacturer" not in df.columns:
-            return alerts
-        
-        # Find matching manufacturers
-        state_brand_mask = df["Manufacturer"].isin(required_brands)
-        state_brands = df[state_brand_mask]
-        
-        if not state_brands.empty:
-            # Check if State Permission column exists
-            if "State Permission" not in df.columns:
-                alerts.append({
-                    "type": "missing_column",
-                    "brands": state_brands["Manufacturer"].unique().tolist()
-                })
-            else:
-                # Check for empty values
-                invalid = state_brands[state_brands["State Permission"].isna() | 
-                                    (state_brands["State Permission"] == "")]
-                if not invalid.empty:
-                    alerts.append({
-                        "type": "missing_values",
-                        "data": invalid[["Material Bank SKU", "Manufacturer", "State Permission"]]
-                    })
-        
-        return alerts
 
 
     # Streamlit UI Components
@@ -361,8 +197,11 @@ def run():
         ✅ **Primary Child Check**: 
         _Flags missing values in the `Primary Child` column and suggests corrections_
         
+        ✅ **Reference Data**:
+        _Checks taxonomy, attribute set, category and color values (and taxonomy/attribute set pairs) against the reference tables in `constants/reference_data.json`_
+        
         ✅ **State Permissions**:
-        _Ensure brands with state permissions have the "State Permission" field added and populated in the import file_
+        _Ensure brands with state permissions have the "State Permission" field added and populated with states the brand is allowed in (`constants/state_permission_brands.json`)_
 
         📌 Use this tool to quickly identify discrepancies and ensure data accuracy before importing SKUs.
         """)
@@ -371,8 +210,9 @@ def run():
     
     
     # File uploaders
-    main_file = st.file_uploader("Upload the Import File (Excel/CSV)", type=["xlsx", "csv"])
-    sku_file = st.file_uploader("Upload the SKU List File (Excel/CSV)", type=["xlsx", "csv"])
+    main_file = st.file_uploader("Upload the Import File (Excel/CSV)", type=UPLOAD_TYPES)
+    sku_file = st.file_uploader("Upload the SKU List File (Excel/CSV)", type=UPLOAD_TYPES)
+    quick_preview = preview_option("preview_us")
 
     if main_file and sku_file:
         st.subheader("Validation Results")
@@ -383,66 +223,143 @@ def run():
             sku_df = load_file(sku_file)
 
         if main_df is not None and sku_df is not None:
+            match_field = "Manufacturer Sku"
+
             # 1. Attribute check
             st.write("#### Required Attributes Check")
             check_attributes_in_excel(main_df, REQUIRED_ATTRIBUTES)
 
+            errors = []
+            if match_field not in main_df.columns:
+                errors.append(f"'{match_field}' column missing in Import File")
+            if match_field not in sku_df.columns:
+                errors.append(f"'{match_field}' column missing in SKU List File")
+            if errors:
+                st.error("Validation Errors:")
+                for error in errors:
+                    st.write(f"- {error}")
+                return
+
+            # Re-uploads in this session only re-check rows whose content changed
+            state_permissions = load_state_permissions()
+            reference = load_reference_data()
+            rules = {
+                "expected_values": EXPECTED_VALUES,
+                "non_empty_fields": NON_EMPTY_FIELDS,
+                "field_patterns": FIELD_PATTERNS,
+                "necessary_fields": NECESSARY_FIELDS,
+                "string_compare_fields": ["CatalogItemID"],
+                "skip_configurable_fields": ["CatalogItemID"],
+                "state_permissions": state_permissions,
+                "reference_data": reference,
+                "reference_fields": REFERENCE_FIELDS
+            }
+            main_df[match_field] = main_df[match_field].astype(str)
+            sku_df[match_field] = sku_df[match_field].astype(str)
+            context = (file_fingerprint(sku_file), tuple(main_df.columns), state_permissions["version"], reference["version"])
+
+            # Large imports show sampled results first; the full run replaces them
+            preview = preview_checks(main_df, match_field, rules, sku_df, quick_preview)
+            with st.spinner("Validating..."):
+                result = revalidate(main_df, sku_df, match_field, rules, "revalidation_us", context)
+            clear_preview(preview)
+            violations = result["violations"]
+            render_recheck_summary(result)
+
+            # Violation tables are capped per rule; "Load all" fetches the rest for this upload
+            display = ViolationDisplay("violation_display_us", (context, file_fingerprint(main_file)))
+
             # 2. Field comparison
             st.write("#### Field Value Comparison")
-            review_field_values(main_df, sku_df, "Manufacturer Sku", NECESSARY_FIELDS)
+            review_field_values(main_df, sku_df, match_field, violations, display)
             
             # 3. Expected Values Check (NEW)
             st.write("#### Expected Values Validation")
-            value_errors = check_expected_values(main_df, EXPECTED_VALUES)
+            value_errors = select_violations(violations, "Expected Value")
             
-            if not value_errors:
+            if value_errors.empty:
                 st.success("✅ All expected values match requirements")
             else:
-                st.error(f"Found {len(value_errors)} fields with invalid values")
-                for field, details in value_errors.items():
-                    with st.expander(f"Invalid {field} values", expanded=False):
-                        st.write(f"Expected Value: {details['expected']}")
-                        st.dataframe(details['invalid_entries'])
+                st.error(f"Found {value_errors['Field'].nunique()} fields with invalid values")
+                for field, expected in EXPECTED_VALUES.items():
+                    invalid_entries = select_violations(value_errors, "Expected Value", field)
+                    if not invalid_entries.empty:
+                        with st.expander(f"Invalid {field} values", expanded=False):
+                            st.write(f"Expected Value: {expected}")
+                            display.show(invalid_entries, ["Key", "Value"], [match_field, field], f"Expected Value: {field}")
             
             # 4. Check for required fields non-emptiness           
-            check_non_empty_fields(main_df, NON_EMPTY_FIELDS)
+            empty_values = select_violations(violations, "Empty Value")
+            if not empty_values.empty:
+                st.warning("⚠️ Empty values detected in required fields!")
+                for field in NON_EMPTY_FIELDS:
+                    empty_df = select_violations(empty_values, "Empty Value", field)
+                    if not empty_df.empty:
+                        with st.expander(f"Empty values in '{field}'"):
+                            st.write(f"Number of empty entries: {len(empty_df)}")
+                            display.show(empty_df, ["Key", "Value"], [match_field, field], f"Empty Value: {field}")
             
             #Check Batch number format
-            pattern_errors = validate_field_patterns(main_df)
-            if pattern_errors:
-                for field, details in pattern_errors.items():
-                    st.error(f"Invalid format in '{field}'. Expected format: {details['example']}")
+            for field, config in FIELD_PATTERNS.items():
+                invalid = select_violations(violations, "Invalid Format", field)
+                if not invalid.empty:
+                    st.error(f"Invalid format in '{field}'. Expected format: {config['example']}")
                     with st.expander(f"View invalid {field} entries"):
-                        st.dataframe(details["invalid"][["Manufacturer Sku", field]])
+                        display.show(invalid, ["Key", "Value"], [match_field, field], f"Invalid Format: {field}")
             
-            # 5. Check for empty 'Primary Child' values
-            # st.write("#### Primary Child Column Check")
-            check_primary_child_column(main_df)
+            # 5. Reference data check
+            st.write("#### Reference Data Check")
+            render_reference_check(violations, match_field, reference, REFERENCE_FIELDS, display)
+
+            # 6. Check for empty 'Primary Child' values
+            empty_primary_child = select_violations(violations, "Primary Child Empty")
+            if not empty_primary_child.empty:
+                st.warning("⚠️ Empty values detected in 'Primary Child' column!")
+                st.write("To maintain uniformity, consider adding 'No' for non-primary child SKUs.")
+                display.show(empty_primary_child, ["Material Bank SKU", "Value"], ["Material Bank SKU", "Primary Child"],
+                             "Primary Child Empty")
             
-            # 6. State Permission validation
+            # 7. Catalog collision check
+            st.write("#### Catalog Collision Check")
+            render_collision_check(main_df, main_file)
+
+            # 8. In-file uniqueness check
+            st.write("#### Duplicate Key Check")
+            render_uniqueness_check(main_df)
+
+            # 9. State Permission validation
             st.write("#### State Permission Check")
             try:
-                state_brands = load_state_permission_brands()
                 # First check if Manufacturer column exists
                 if "Manufacturer" in main_df.columns:
-                   has_state_brands = main_df["Manufacturer"].isin(state_brands).any()
-                   if has_state_brands:
-                        permission_alerts = validate_state_permissions(main_df, state_brands)
+                   state_brand_mask = requires_state_permission(main_df["Manufacturer"], state_permissions)
+                   if state_brand_mask.any():
+                        missing_permissions = select_violations(violations, "State Permission Missing")
+                        invalid_permissions = select_violations(violations, "State Permission Invalid")
 
                         # Display results
-                        if permission_alerts:
-                         st.warning("⚠️ State Permission Requirements")
-                         for alert in permission_alerts:
-                            if alert["type"] == "missing_column":
-                                st.error(f"Missing 'State Permission' column for the brand {(alert['brands'])} which has state permissions. Ensure the column is added and populated in the import file.")
-                            elif alert["type"] == "missing_values":
-                                st.error(f"Found {len(alert['data'])} records with missing State Permissions")
+                        if "State Permission" not in main_df.columns:
+                            st.warning("⚠️ State Permission Requirements")
+                            brands = main_df.loc[state_brand_mask, "Manufacturer"].unique().tolist()
+                            st.error(f"Missing 'State Permission' column for the brand {brands} which has state permissions. Ensure the column is added and populated in the import file.")
+                        elif not missing_permissions.empty or not invalid_permissions.empty:
+                            st.warning("⚠️ State Permission Requirements")
+                            if not missing_permissions.empty:
+                                st.error(f"Found {len(missing_permissions)} records with missing State Permissions")
                                 with st.expander("View records needing updates"):
-                                    st.dataframe(alert["data"])
+                                    display.show(missing_permissions, ["Material Bank SKU", "Key", "Value"],
+                                                 ["Material Bank SKU", match_field, "State Permission"],
+                                                 "State Permission Missing")
+                            if not invalid_permissions.empty:
+                                st.error(f"Found {len(invalid_permissions)} records with states the brand is not permitted in")
+                                with st.expander("View records with invalid states"):
+                                    display.show(invalid_permissions, ["Material Bank SKU", "Key", "Value", "Expected"],
+                                                 ["Material Bank SKU", match_field, "Invalid States", "Allowed States"],
+                                                 "State Permission Invalid")
                         else:
                          st.success("✅ State permission requirements met for the brand")
                    else:
                      st.success("✅ This Brand doesn't have State Permissions. No further actions needed")         
                     
             except Exception as e:
-               st.error(f"State permission validation error: {str(e)}")
\ No newline at end of file
+               st.error(f"State permission validation error: {str(e)}")
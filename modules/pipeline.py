@@ -0,0 +1,264 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from io import BytesIO
+from modules.changeset import build_change_set, write_change_set_workbook
+from modules.indexes import InvertedIndex, identifier_positions
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload, select_rows
+from modules.primarychild import COLUMNS_CONFIG, find_family_members
+from modules.retirement import RETIRE_COLUMNS, retire_rows
+from modules.visibility import REGION_CONFIG, apply_visibility_rules, select_visibility_rows
+from modules.uniqueness import warn_output_duplicates
+import warnings
+warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
+
+IDENTIFIER_OPTIONS = ["Material Bank SKU", "Manufacturer Sku", "Manufacturer Sku EU", "Product Name"]
+
+
+def pipeline_columns(region):
+    """Every export column read or written by the pipeline steps"""
+    return list(dict.fromkeys(
+        RETIRE_COLUMNS[region]["retire_columns"] +
+        RETIRE_COLUMNS[region]["reassign_columns"] +
+        COLUMNS_CONFIG[region]["columns"] +
+        REGION_CONFIG[region]["filter_columns"] +
+        ["Family Id", "Primary Child", "Retired Sku", "Stealth SKU"]
+    ))
+
+
+def apply_updates(dataset, positions, updates, snapshots=None):
+    """Write a step's output columns back into the shared dataset
+
+    When `snapshots` is a list, the touched rows are saved to it first so the
+    net change against the original export can be diffed afterwards.
+    """
+    if snapshots is not None:
+        snapshots.append(select_rows(dataset, positions))
+    col_idx = dataset.columns.get_indexer(updates.columns)
+    dataset.iloc[positions, col_idx] = updates.to_numpy()
+
+
+def ticket_positions(dataset, ticket_df, identifier_type):
+    """Row positions of the dataset rows named in a ticket"""
+    ticket_identifiers = ticket_df[identifier_type].dropna().unique()
+    return identifier_positions(dataset[identifier_type], ticket_identifiers, identifier_type)
+
+
+def run_retirement_step(dataset, family_index, ticket_df, identifier_type, region, initials, snapshots=None):
+    """Retire ticket SKUs and apply the changes to the dataset; also returns the retired row positions"""
+    base_pos = ticket_positions(dataset, ticket_df, identifier_type)
+
+    # Reassignment candidates come from the pre-retirement state, like the standalone tool
+    primary_pos = base_pos[dataset['Primary Child'].to_numpy()[base_pos] == 'Yes']
+    reassign = pd.DataFrame()
+    if len(primary_pos):
+        family_pos = family_index.lookup(dataset['Family Id'].to_numpy()[primary_pos])
+        family_pos = family_pos[dataset['Retired Sku'].iloc[family_pos].str.lower().eq('no').to_numpy()]
+        reassign = select_rows(dataset, family_pos, RETIRE_COLUMNS[region]["reassign_columns"])
+
+    final_results = retire_rows(dataset, base_pos, region, f"Ticket X, Retired - {initials}")
+    apply_updates(dataset, base_pos, final_results, snapshots)
+    return final_results, reassign, primary_pos, base_pos
+
+
+def run_primarychild_step(dataset, family_index, base_pos, region):
+    """Active family members of every touched family, read from the current dataset"""
+    family_pos = find_family_members(dataset, base_pos, family_index)
+    return select_rows(dataset, family_pos, COLUMNS_CONFIG[region]["columns"])
+
+
+def run_visibility_step(dataset, family_index, ticket_df, identifier_type, region, snapshots=None,
+                        retired_pos=None):
+    """Make ticket SKUs and their configurable parents visible and apply the changes
+
+    Rows retired earlier in the same run are left out, so a retired SKU is never
+    made visible again; returns the results and how many rows were skipped.
+    """
+    ticket_identifiers = ticket_df[identifier_type].dropna().unique()
+    positions = select_visibility_rows(dataset, ticket_identifiers, identifier_type, family_index)
+    skipped = 0
+    if retired_pos is not None and len(retired_pos):
+        kept = np.setdiff1d(positions, retired_pos)
+        skipped, positions = len(positions) - len(kept), kept
+    final_results = apply_visibility_rules(dataset, positions, [region])[region]
+    apply_updates(dataset, positions, final_results, snapshots)
+    return final_results, skipped
+
+
+def write_pipeline_workbook(sheets):
+    """Write every step's output into one workbook and return its bytes"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        text_format = writer.book.add_format({'num_format': '@'})
+        highlight_format = writer.book.add_format({'num_format': '@', 'bg_color': '#FFC7CE'})
+
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            worksheet = writer.sheets[sheet_name]
+            for idx, col in enumerate(df.columns):
+                max_len = max(
+                    df[col].astype(str).str.len().max() if len(df) else 0,
+                    len(str(col))
+                ) + 2
+                worksheet.set_column(idx, idx, min(max_len, 30), text_format)
+            worksheet.autofilter(0, 0, len(df), len(df.columns)-1)
+
+            # Highlight primary children, as the standalone reports do
+            if 'Primary Child' in df.columns:
+                pc_col_idx = df.columns.get_loc('Primary Child')
+                for row in np.flatnonzero(df['Primary Child'].eq('Yes').to_numpy()) + 1:
+                    worksheet.write(row, pc_col_idx, 'Yes', highlight_format)
+
+    return output.getvalue()
+
+
+def run():
+    with st.expander("📋 **How the Pipeline Works (Click to Expand)**", expanded=False):
+        st.markdown("""
+        Upload the PIM export **once** and a ticket for each step you need. Steps run in order over
+        the same in-memory data, each one seeing the previous step's changes:
+
+        1. **Retirement** retires the ticket SKUs
+        2. **Primary Child** lists active family members for the change-request SKUs *and* for
+           every family that just lost its primary child to retirement
+        3. **Visibility** makes the ticket SKUs and their configurable parents visible
+
+        Leave a step's ticket empty to skip it. All outputs come back in one workbook.
+        """)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        region = st.radio(
+            "Select Region:",
+            ["US", "EU"],
+            index=0,
+            horizontal=True
+        )
+    with col2:
+        initials = st.selectbox(
+            "Select Your Initials:",
+            options=["AL", "FH", "JL", "LL", "TO"],
+            index=1  # Default to FH
+        )
+
+    st.write("#### File Uploads")
+    export_file = st.file_uploader("Upload PIM Export File", type=UPLOAD_TYPES,
+                                 help="Upload the brand export file from PIM")
+    include_change_set = st.checkbox(
+        "Also export a change set (changed cells only)",
+        help="Adds a PIM-import-ready file with the net changes of all steps: the SKU plus only the cells that change"
+    )
+
+    steps = {}
+    step_cols = st.columns(3)
+    for col, (step, label) in zip(step_cols, [
+        ("retirement", "1. Retirement Ticket"),
+        ("primarychild", "2. Primary Child Ticket"),
+        ("visibility", "3. Visibility Ticket")
+    ]):
+        with col:
+            ticket_file = st.file_uploader(label, type=UPLOAD_TYPES, key=f"pipeline_{step}_ticket")
+            identifier_type = st.selectbox("Identifier:", options=IDENTIFIER_OPTIONS, index=0,
+                                           key=f"pipeline_{step}_identifier")
+            if ticket_file:
+                steps[step] = (ticket_file, identifier_type)
+
+    if export_file and steps:
+        try:
+            required_columns = pipeline_columns(region)
+            identifiers = [identifier for _, identifier in steps.values()]
+
+            # Parse and clean the export exactly once
+            with st.spinner("Loading export..."):
+                dataset = read_upload(export_file, dtype=str, columns=required_columns + identifiers)
+                normalize_whitespace(dataset)
+
+            tickets = {}
+            errors = []
+            missing_columns = [col for col in required_columns if col not in dataset.columns]
+            if missing_columns:
+                errors.append(f"Missing columns in Export File: {', '.join(missing_columns)}")
+            for step, (ticket_file, identifier_type) in steps.items():
+                ticket_df = normalize_whitespace(read_upload(ticket_file, dtype=str))
+                if identifier_type not in dataset.columns:
+                    errors.append(f"'{identifier_type}' column missing in Export File")
+                if identifier_type not in ticket_df.columns:
+                    errors.append(f"'{identifier_type}' column missing in {ticket_file.name}")
+                tickets[step] = (ticket_df, identifier_type)
+
+            if errors:
+                st.error("Validation Errors:")
+                for error in dict.fromkeys(errors):
+                    st.write(f"- {error}")
+                return
+
+            # Index the export once; Family Id never changes between steps
+            family_index = InvertedIndex(dataset['Family Id'])
+            sheets = {}
+            summary = []
+            snapshots = [] if include_change_set else None
+
+            with st.spinner("Running pipeline..."):
+                retired_primary_pos = retired_pos = np.array([], dtype=np.intp)
+                if "retirement" in tickets:
+                    ticket_df, identifier_type = tickets["retirement"]
+                    final_results, reassign, retired_primary_pos, retired_pos = run_retirement_step(
+                        dataset, family_index, ticket_df, identifier_type, region, initials, snapshots
+                    )
+                    sheets['Retirement'] = final_results
+                    if not reassign.empty:
+                        sheets['ReassignPrimaryChild'] = reassign
+                    summary.append({"Step": "Retirement", "Records": len(final_results)})
+
+                if "primarychild" in tickets or len(retired_primary_pos):
+                    base_pos = retired_primary_pos
+                    if "primarychild" in tickets:
+                        ticket_df, identifier_type = tickets["primarychild"]
+                        base_pos = np.union1d(base_pos, ticket_positions(dataset, ticket_df, identifier_type))
+                    family_members = run_primarychild_step(dataset, family_index, base_pos, region)
+                    sheets['Family_Members'] = family_members
+                    summary.append({"Step": "Primary Child", "Records": len(family_members)})
+
+                if "visibility" in tickets:
+                    ticket_df, identifier_type = tickets["visibility"]
+                    final_results, skipped = run_visibility_step(
+                        dataset, family_index, ticket_df, identifier_type, region, snapshots, retired_pos
+                    )
+                    if skipped:
+                        st.warning(f"{skipped} Visibility rows were also retired in this run and were left out "
+                                   "of the Visibility step")
+                    sheets['Visibility'] = final_results
+                    summary.append({"Step": "Visibility", "Records": len(final_results)})
+
+            st.markdown("---")
+            st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+            for sheet_name, df in sheets.items():
+                with st.expander(f"Preview {sheet_name}", expanded=False):
+                    st.dataframe(df, height=300, use_container_width=True)
+                    st.caption(f"Records: {len(df)}")
+
+            for sheet_name, df in sheets.items():
+                warn_output_duplicates(df, sheet_name)
+            st.success("Pipeline complete! Download results:")
+            st.download_button(
+                label="Download Pipeline Report",
+                data=write_pipeline_workbook(sheets),
+                file_name=f"sku_maintenance_pipeline_{region}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+            if include_change_set and snapshots:
+                # First snapshot of each row is its original export state
+                baseline = pd.concat(snapshots)
+                baseline = baseline[~baseline.index.duplicated(keep='first')]
+                delta, audit = build_change_set(baseline, dataset.loc[baseline.index])
+                st.download_button(
+                    label="Download Change Set",
+                    data=write_change_set_workbook(delta, audit),
+                    file_name=f"sku_maintenance_pipeline_{region}_changeset.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+                st.caption(f"Change set: {len(delta)} SKUs, {len(audit)} changed cells")
+
+        except Exception as e:
+            st.error(f"Processing error: {str(e)}")
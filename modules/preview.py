@@ -0,0 +1,92 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from modules.revalidation import check_rows, row_ids
+
+# Rows sampled for a quick preview; smaller uploads always get the full run only
+PREVIEW_ROWS = 2000
+
+# Columns the preview sample is stratified on, when present
+PREVIEW_STRATA = ["Manufacturer", "Product Type"]
+
+
+def stratified_positions(df, strata=PREVIEW_STRATA, rows=PREVIEW_ROWS, seed=0):
+    """Sorted row positions of a stratified random sample of about `rows` rows
+
+    Each stratum (distinct combination of the `strata` columns present) gets a
+    share proportional to its size and at least one row, so a small brand or
+    product type that is entirely wrong still shows up. Same file, same sample.
+    """
+    n = len(df)
+    if n <= rows:
+        return np.arange(n)
+    columns = [col for col in strata if col in df.columns]
+    codes = np.zeros(n, dtype=np.int64)
+    for col in columns:
+        col_codes, uniques = pd.factorize(df[col].to_numpy(dtype=object), use_na_sentinel=False)
+        codes, _ = pd.factorize(codes * len(uniques) + col_codes)
+    sizes = np.bincount(codes)
+    quota = np.maximum(np.floor(sizes * rows / n), 1).astype(np.int64)
+
+    # Random rank of every row inside its stratum, then keep the ranks under the quota
+    order = np.random.default_rng(seed).permutation(n)
+    order = order[np.argsort(codes[order], kind='stable')]
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    rank = np.arange(n) - np.repeat(starts, sizes)
+    keep = order[rank < np.repeat(quota, sizes)]
+    return np.sort(keep)
+
+
+def preview_option(key):
+    """Quick preview toggle shared by the long-running tools"""
+    return st.checkbox(
+        "Quick preview",
+        value=True,
+        key=key,
+        help=f"Large files first show partial results from a stratified sample of about {PREVIEW_ROWS} rows "
+             "while the full run continues; the full results replace the preview when done"
+    )
+
+
+def show_preview(df, render, enabled, strata=PREVIEW_STRATA, rows=PREVIEW_ROWS):
+    """Render `render(sample_df)` as partial results and return the placeholder holding them
+
+    Returns None when the preview is off or the file is small enough to run in
+    full straight away. Pass the placeholder to `clear_preview` once the full
+    results are ready.
+    """
+    if not enabled or len(df) <= rows:
+        return None
+    positions = stratified_positions(df, strata, rows)
+    placeholder = st.empty()
+    with placeholder.container():
+        st.info(f"⏳ **Partial results** from a stratified sample of {len(positions)} of {len(df)} rows. "
+                "The full run is in progress and will replace this preview.")
+        render(df.iloc[positions])
+    return placeholder
+
+
+def clear_preview(placeholder):
+    """Drop the partial results once the full run has finished"""
+    if placeholder is not None:
+        placeholder.empty()
+
+
+def render_violation_preview(violations, sample_rows):
+    """Violation counts per check and field on the sample, with the share of sampled rows affected"""
+    if violations.empty:
+        st.success(f"✅ No violations in the {sample_rows} sampled rows")
+        return
+    summary = violations.groupby(["Check", "Field"], sort=False).size().rename("Sampled Violations").reset_index()
+    summary["Share of Sample"] = (summary["Sampled Violations"] / sample_rows).map("{:.1%}".format)
+    summary = summary.sort_values("Sampled Violations", ascending=False, kind='stable')
+    st.warning(f"⚠️ {len(violations)} violations in the sample across {len(summary)} checks")
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+
+
+def preview_checks(df, key_column, rules, sku_df, enabled):
+    """Run the validator checks on a sample of the import and show them as partial results"""
+    def render(sample):
+        violations = check_rows(sample, row_ids(sample, key_column), key_column, rules, sku_df)
+        render_violation_preview(violations, len(sample))
+    return show_preview(df, render, enabled)
@@ -1,47 +1,110 @@
 import streamlit as st
 import pandas as pd
 from io import BytesIO
+import numpy as np
+from modules.catalog_store import export_source_picker, load_ticket_rows
+from modules.indexes import identifier_positions
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload, select_rows
+from modules.uniqueness import warn_output_duplicates
 import warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
 
-def run():
-    # Region configuration
-    COLUMNS_CONFIG = {
-        "US": {
-            "columns": [
-                "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku",
-                "Product Type", "Product Name", "Color Name", "Color Number",
-                "Configurable Color", "Primary Child", "Available Sizes", "Available Finishes","Available Thicknesses",  "Image Url", "Url Key",
-                "Color Variety", "Color Saturation", "Primary Color Family"
-            ]
-        },
-        "EU": {
-            "columns": [
-                "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku EU",
-                "Product Type", "Product Name", "Color Name", "Color Number",
-                "Configurable Color", "Primary Child", "Available Sizes", "Available Finishes","Available Thicknesses", "Image Url", "Url Key",
-                "Color Variety", "Color Saturation", "Primary Color Family"
-            ]
-        }
+# Region configuration
+COLUMNS_CONFIG = {
+    "US": {
+        "columns": [
+            "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku",
+            "Product Type", "Product Name", "Color Name", "Color Number",
+            "Configurable Color", "Primary Child", "Available Sizes", "Available Finishes","Available Thicknesses",  "Image Url", "Url Key",
+            "Color Variety", "Color Saturation", "Primary Color Family"
+        ]
+    },
+    "EU": {
+        "columns": [
+            "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku EU",
+            "Product Type", "Product Name", "Color Name", "Color Number",
+            "Configurable Color", "Primary Child", "Available Sizes", "Available Finishes","Available Thicknesses", "Image Url", "Url Key",
+            "Color Variety", "Color Saturation", "Primary Color Family"
+        ]
     }
+}
+
+
+def find_family_members(export_df, base_pos, family_index=None):
+    """Row positions of active, non-stealth members of every family touched by the ticket"""
+    family_ids = pd.unique(export_df['Family Id'].to_numpy()[base_pos])
+    if family_index is not None:
+        # Prebuilt Family Id index: only the touched families are visited
+        family_pos = family_index.lookup(family_ids)
+        active = (
+            export_df['Retired Sku'].iloc[family_pos].str.lower().eq('no') &
+            export_df['Stealth SKU'].iloc[family_pos].str.lower().eq('no')
+        ).to_numpy()
+        return family_pos[active]
+    return np.flatnonzero((
+        export_df['Family Id'].isin(family_ids) &
+        export_df['Retired Sku'].str.lower().eq('no') &
+        export_df['Stealth SKU'].str.lower().eq('no')
+    ).to_numpy())
+
+
+def write_family_workbook(result_df):
+    """Write the Family_Members workbook and return its bytes"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        result_df.to_excel(writer, sheet_name='Family_Members', index=False)
+
+        # Create formats
+        workbook = writer.book
+        text_format = workbook.add_format({'num_format': '@'})
+        highlight_format = workbook.add_format({
+            'num_format': '@',
+            'bg_color': '#FFC7CE'
+        })
+
+        # Format worksheet
+        sheet = writer.sheets['Family_Members']
+        pc_col_idx = result_df.columns.get_loc('Primary Child')
+
+        # Set text format for all columns
+        for idx, col in enumerate(result_df.columns):
+            max_len = max(
+                result_df[col].astype(str).str.len().max(),
+                len(str(col))
+            ) + 2
+            sheet.set_column(idx, idx, min(max_len, 30), text_format)
+
+        # Apply highlights
+        for row in range(1, len(result_df) + 1):
+            if result_df.iloc[row-1]['Primary Child'] == 'Yes':
+                sheet.write(row, pc_col_idx, 'Yes', highlight_format)
+
+        sheet.autofilter(0, 0, len(result_df), len(result_df.columns)-1)
+
+    return output.getvalue()
+
 
+def run():
     # UI Components
     region = st.radio(
         "Select Region:",
-        ["US", "EU"],
+        ["US", "EU", "Both"],
         index=0,
-        horizontal=True
+        horizontal=True,
+        help="'Both' loads the export once and produces the US and EU outputs together"
     )
+    regions = ["US", "EU"] if region == "Both" else [region]
 
     # File Upload Section
     st.write("#### File Uploads")
-    export_file = st.file_uploader("Upload PIM Export File", type=["xlsx", "csv"], 
+    use_store = export_source_picker("primarychild")
+    export_file = None if use_store else st.file_uploader("Upload PIM Export File", type=UPLOAD_TYPES, 
                                  help="Upload the brand export file from PIM")
-    ticket_file = st.file_uploader("Upload Change Request File", type=["xlsx", "csv"], 
+    ticket_file = st.file_uploader("Upload Change Request File", type=UPLOAD_TYPES, 
                                  help="Upload the file with SKUs needing primary child changes")
 
     identifier_options = ["Material Bank SKU", "Manufacturer Sku", "Product Name"]
-    if region == "EU":
+    if "EU" in regions:
         identifier_options.insert(2, "Manufacturer Sku EU")
 
     identifier_type = st.selectbox(
@@ -51,30 +114,24 @@ def run():
         help="Select the primary identifier for filtering SKUs"
     )
 
-    if export_file and ticket_file:
+    if (use_store or export_file) and ticket_file:
         try:
-            # Modified data loading with string preservation
-            def read_file_with_strings(file):
-                """Read file while preserving number-like strings"""
-                if file.name.endswith('.xlsx'):
-                    return pd.read_excel(file, dtype=str)
-                else:
-                    return pd.read_csv(file, dtype=str)
-
-            # Load data as strings
-            export_df = read_file_with_strings(export_file)
-            ticket_df = read_file_with_strings(ticket_file)
-
-            # Clean data while preserving types
-            def clean_string_series(series):
-                """Clean values while maintaining data type"""
-                return series.str.strip() if series.dtype == 'object' else series
-
-            export_df = export_df.apply(clean_string_series)
-            ticket_df = ticket_df.apply(clean_string_series)
+            required_columns = list(dict.fromkeys(
+                [col for r in regions for col in COLUMNS_CONFIG[r]["columns"]] + ["Retired Sku", "Stealth SKU"]
+            ))
+
+            # Load data as strings, parsing only the columns the report uses
+            ticket_df = normalize_whitespace(read_upload(ticket_file, dtype=str))
+            if use_store:
+                # Indexed lookup of the ticket rows and their families
+                export_df = load_ticket_rows(ticket_df, identifier_type, required_columns + [identifier_type])
+            else:
+                export_df = read_upload(export_file, dtype=str, columns=required_columns + [identifier_type])
+
+                # Strip whitespace once; every later step reuses the cleaned columns
+                normalize_whitespace(export_df)
 
             # Validation checks
-            required_columns = COLUMNS_CONFIG[region]["columns"] + ["Retired Sku", "Stealth SKU"]
             errors = []
             
             # Check required columns in export file
@@ -95,76 +152,44 @@ def run():
                 return
 
             # Process data with preserved string types
-            ticket_identifiers = ticket_df[identifier_type].str.strip().unique()
-            export_df[identifier_type] = export_df[identifier_type].str.strip()
+            ticket_identifiers = ticket_df[identifier_type].unique()
             
-            # Get base matches from ticket
-            base_matches = export_df[export_df[identifier_type].isin(ticket_identifiers)]
+            # Get base matches from ticket as row positions
+            base_pos = identifier_positions(export_df[identifier_type], ticket_identifiers, identifier_type)
             
-            if base_matches.empty:
+            if len(base_pos) == 0:
                 st.warning("No matching records found between ticket file and export file")
                 return
 
-            # Get family members
-            family_ids = base_matches['Family Id'].str.strip().unique()
-            family_members = export_df[
-                (export_df['Family Id'].str.strip().isin(family_ids)) &
-                (export_df['Retired Sku'].str.strip().str.lower() == 'no') &
-                (export_df['Stealth SKU'].str.strip().str.lower() == 'no')
-            ]
-
-            # Filter and select columns
-            result_df = family_members[COLUMNS_CONFIG[region]["columns"]].copy()
+            # Get family members once for every selected region
+            family_pos = find_family_members(export_df, base_pos)
 
-            # Preview with highlighting
             st.markdown("---")
-            with st.expander("Preview Family Members", expanded=True):
-                styled_df = result_df.style.map(
-                    lambda x: 'background-color: #FFC7CE' if x == 'Yes' else '', 
-                    subset=['Primary Child']
+            for current_region in regions:
+                # Filter and select columns
+                result_df = select_rows(export_df, family_pos, COLUMNS_CONFIG[current_region]["columns"])
+
+                # Preview with highlighting
+                with st.expander(f"Preview Family Members ({current_region})", expanded=len(regions) == 1):
+                    styled_df = result_df.style.map(
+                        lambda x: 'background-color: #FFC7CE' if x == 'Yes' else '', 
+                        subset=['Primary Child']
+                    )
+                    st.dataframe(styled_df, height=400, use_container_width=True)
+                    st.caption(f"Total Active Family Members: {len(result_df)}")
+
+                # Excel Export with text preservation
+                workbook = write_family_workbook(result_df)
+
+                warn_output_duplicates(result_df, f"Family Members ({current_region})")
+                st.success(f"Processing complete! Download {current_region} family members list:")
+                st.download_button(
+                    label=f"Download Report ({current_region})",
+                    data=workbook,
+                    file_name=f"primary_child_candidates_{current_region}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    key=f"primarychild_download_{current_region}"
                 )
-                st.dataframe(styled_df, height=400, use_container_width=True)
-                st.caption(f"Total Active Family Members: {len(result_df)}")
-
-            # Excel Export with text preservation
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                result_df.to_excel(writer, sheet_name='Family_Members', index=False)
-                
-                # Create formats
-                workbook = writer.book
-                text_format = workbook.add_format({'num_format': '@'})
-                highlight_format = workbook.add_format({
-                    'num_format': '@',
-                    'bg_color': '#FFC7CE'
-                })
-                
-                # Format worksheet
-                sheet = writer.sheets['Family_Members']
-                pc_col_idx = result_df.columns.get_loc('Primary Child')
-                
-                # Set text format for all columns
-                for idx, col in enumerate(result_df.columns):
-                    max_len = max(
-                        result_df[col].astype(str).str.len().max(),
-                        len(str(col))
-                    ) + 2
-                    sheet.set_column(idx, idx, min(max_len, 30), text_format)
-                
-                # Apply highlights
-                for row in range(1, len(result_df) + 1):
-                    if result_df.iloc[row-1]['Primary Child'] == 'Yes':
-                        sheet.write(row, pc_col_idx, 'Yes', highlight_format)
-                
-                sheet.autofilter(0, 0, len(result_df), len(result_df.columns)-1)
-
-            st.success("Processing complete! Download family members list:")
-            st.download_button(
-                label="Download Report",
-                data=output.getvalue(),
-                file_name=f"primary_child_candidates_{region}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
 
         except Exception as e:
             st.error(f"Processing error: {str(e)}")
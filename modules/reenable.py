@@ -0,0 +1,222 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import xlsxwriter
+from io import BytesIO
+from modules.changeset import build_change_set, write_change_set_workbook
+from modules.indexes import InvertedIndex, identifier_positions, unmatched_identifiers
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload, select_rows
+from modules.retirement import RETIRE_COLUMNS
+from modules.uniqueness import warn_output_duplicates
+import warnings
+warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
+
+# Re-enable writes the same columns that retirement changes
+REENABLE_COLUMNS = {
+    region: {
+        "columns": config["retire_columns"],
+        "visibility_col": config["visibility_col"],
+        "hide_col": config["hide_col"]
+    }
+    for region, config in RETIRE_COLUMNS.items()
+}
+
+# Rows written per chunk when streaming the workbook
+EXPORT_CHUNK_ROWS = 10000
+
+
+def reenable_rows(export_df, positions, region, admin_notes):
+    """Build Final Results rows with the re-enable field updates applied"""
+    config = REENABLE_COLUMNS[region]
+    final_results = select_rows(export_df, positions, config["columns"])
+
+    product_type_clean = final_results['Product Type'].str.lower().to_numpy()
+    stealth = final_results['Stealth SKU'].str.lower().eq('yes').to_numpy()
+    mask_configurable = product_type_clean == 'configurable'
+    mask_simple = (product_type_clean == 'simple') & ~stealth
+
+    # Inverse of retirement: flip the flag and restore visibility per Product Type
+    final_results['Retired Sku'] = 'No'
+    final_results[config["hide_col"]] = np.where(stealth, 'Yes', 'No')
+    final_results.loc[mask_configurable, config["visibility_col"]] = "Catalog, Search"
+    final_results.loc[mask_simple, config["visibility_col"]] = "Catalog"
+    final_results.loc[stealth, config["visibility_col"]] = "Not Visible Individually"
+    final_results['Admin Notes'] = admin_notes
+    return final_results
+
+
+def select_reenable_rows(export_df, family_index, ticket_identifiers, identifier_type):
+    """Row positions of ticket matches plus the configurable parents of their families"""
+    match_pos = identifier_positions(export_df[identifier_type], ticket_identifiers, identifier_type)
+
+    family_pos = family_index.lookup(export_df['Family Id'].to_numpy()[match_pos])
+    product_type = export_df['Product Type'].to_numpy()[family_pos]
+    parent_pos = family_pos[pd.Series(product_type).str.lower().eq('configurable').to_numpy()]
+
+    return match_pos, np.union1d(match_pos, parent_pos)
+
+
+def write_streaming_workbook(sheets):
+    """Write {sheet name: DataFrame} row by row in constant-memory mode and return the bytes"""
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    text_format = workbook.add_format({'num_format': '@'})
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+
+    for sheet_name, df in sheets.items():
+        worksheet = workbook.add_worksheet(sheet_name)
+
+        # Column widths and formats must be set before any row is flushed
+        for idx, col in enumerate(df.columns):
+            max_len = max(df[col].astype(str).str.len().max() if len(df) else 0, len(str(col))) + 2
+            worksheet.set_column(idx, idx, min(max_len, 30), text_format)
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+            values = chunk.to_numpy(dtype=object)
+            values[pd.isna(values)] = ''
+            for offset, row in enumerate(values, start=start + 1):
+                worksheet.write_row(offset, 0, row)
+
+        worksheet.autofilter(0, 0, len(df), len(df.columns)-1)
+
+    workbook.close()
+    return output.getvalue()
+
+
+def run():
+    # UI Components
+    col1, col2 = st.columns(2)
+    with col1:
+        region = st.radio(
+            "Select Region:",
+            ["US", "EU"],
+            index=0,
+            horizontal=True
+        )
+    with col2:
+        initials = st.selectbox(
+            "Select Your Initials:",
+            options=["AL", "FH", "JL", "LL", "TO"],
+            index=1  # Default to FH
+        )
+
+    # File Upload Section
+    st.write("#### File Uploads")
+    with st.expander("📋 **Upload Instructions (Click to Expand)**", expanded=False):
+        st.markdown("""
+        ### What Re-enabling Does:
+
+        - Sets `Retired Sku` to **No**
+        - Restores visibility per `Product Type` (configurable: *Catalog, Search*, simple: *Catalog*)
+        - Sets `Hide From Product View` to **No**
+        - Re-includes the configurable parents of every re-enabled family
+
+        Stealth SKUs are re-enabled but stay *Not Visible Individually*.
+
+        ⚠️ **Important:** Ensure the primary identifier field matches exactly in both files
+        """)
+
+    export_file = st.file_uploader("Upload PIM Export File", type=UPLOAD_TYPES,
+                                 help="Upload the brand export file from PIM")
+    ticket_file = st.file_uploader("Upload Re-enable Ticket File", type=UPLOAD_TYPES,
+                                 help="Upload the file with SKUs to be re-enabled")
+
+    identifier_type = st.selectbox(
+        "Select Primary Identifier:",
+        options=["Material Bank SKU", "Manufacturer Sku", "Manufacturer Sku EU", "Product Name"],
+        index=0,
+        help="Select the primary identifier for filtering SKUs"
+    )
+
+    include_change_set = st.checkbox(
+        "Also export a change set (changed cells only)",
+        help="Adds a PIM-import-ready file with the SKU plus only the cells that change, and a long-format audit sheet"
+    )
+
+    if export_file and ticket_file:
+        try:
+            required_columns = REENABLE_COLUMNS[region]["columns"]
+
+            # Load data as strings, parsing only the columns the report uses
+            export_df = read_upload(export_file, dtype=str, columns=required_columns + [identifier_type])
+            ticket_df = read_upload(ticket_file, dtype=str)
+
+            # Strip whitespace once; every later step reuses the cleaned columns
+            normalize_whitespace(export_df)
+            normalize_whitespace(ticket_df)
+
+            # Validation checks
+            errors = []
+            missing_columns = [col for col in required_columns if col not in export_df.columns]
+            if missing_columns:
+                errors.append(f"Missing columns in Export File: {', '.join(missing_columns)}")
+            if identifier_type not in export_df.columns:
+                errors.append(f"'{identifier_type}' column missing in Export File")
+            if identifier_type not in ticket_df.columns:
+                errors.append(f"'{identifier_type}' column missing in Ticket File")
+
+            if errors:
+                st.error("Validation Errors:")
+                for error in errors:
+                    st.write(f"- {error}")
+                return
+
+            with st.spinner("Re-enabling SKUs..."):
+                # Family index is built once per export and serves every ticket SKU
+                family_index = InvertedIndex(export_df['Family Id'])
+                ticket_identifiers = ticket_df[identifier_type].dropna().unique()
+                match_pos, positions = select_reenable_rows(
+                    export_df, family_index, ticket_identifiers, identifier_type
+                )
+
+                if len(match_pos) == 0:
+                    st.warning("No matching records found between ticket file and export file")
+                    return
+
+                final_results = reenable_rows(
+                    export_df, positions, region, f"Ticket X, Re-enabled - {initials}"
+                )
+
+            # Preview
+            st.markdown("---")
+            with st.expander("Preview Final Results", expanded=True):
+                st.dataframe(final_results, height=300, use_container_width=True)
+                st.caption(
+                    f"Re-enabled SKUs: {len(match_pos)} | "
+                    f"Configurable Parents Added: {len(positions) - len(match_pos)}"
+                )
+
+            unmatched = unmatched_identifiers(export_df[identifier_type], ticket_identifiers, identifier_type, match_pos)
+            if len(unmatched):
+                st.warning(f"{len(unmatched)} ticket identifiers were not found in the export file")
+
+            # Streamed Excel export
+            warn_output_duplicates(final_results, "Final Results")
+            with st.spinner("Writing report..."):
+                workbook = write_streaming_workbook({'Final_Results': final_results})
+
+            st.success("Processing complete! Download results:")
+            st.download_button(
+                label="Download Report",
+                data=workbook,
+                file_name=f"sku_reenable_{region}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+            if include_change_set:
+                delta, audit = build_change_set(export_df, final_results)
+                st.download_button(
+                    label="Download Change Set",
+                    data=write_change_set_workbook(delta, audit),
+                    file_name=f"sku_reenable_{region}_changeset.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+                st.caption(f"Change set: {len(delta)} SKUs, {len(audit)} changed cells")
+
+        except Exception as e:
+            st.error(f"Processing error: {str(e)}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+import streamlit as st
+import pandas as pd
+
+REFERENCE_DATA_PATH = Path(__file__).resolve().parent.parent / "constants" / "reference_data.json"
+
+# Parsed tables, reused until the reference file changes on disk
+_LOADED = {}
+
+
+def _clean(series):
+    """Stripped text of a column, with missing values as empty strings"""
+    return series.astype(object).fillna('').astype(str).str.strip()
+
+
+def load_reference_data(path=REFERENCE_DATA_PATH):
+    """Reference tables as hashed lookups, loaded once per version of the file
+
+    Returns {"values": {field: Index}, "pairs": {(left, right): MultiIndex},
+    "version": mtime}. Empty tables are left out, so their checks are skipped.
+    """
+    try:
+        version = path.stat().st_mtime
+    except FileNotFoundError:
+        return {"values": {}, "pairs": {}, "version": None}
+    if _LOADED.get("path") == path and _LOADED.get("version") == version:
+        return _LOADED["tables"]
+
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except json.JSONDecodeError:
+        st.error("Invalid reference data format")
+        return {"values": {}, "pairs": {}, "version": None}
+
+    values = {
+        field: pd.Index(_clean(pd.Series(allowed, dtype=object)).unique(), dtype=object)
+        for field, allowed in raw.get("values", {}).items() if allowed
+    }
+    pairs = {}
+    for table in raw.get("pairs", []):
+        if table.get("values"):
+            frame = pd.DataFrame(table["values"], columns=table["columns"], dtype=object).apply(_clean)
+            pairs[tuple(table["columns"])] = pd.MultiIndex.from_frame(frame.drop_duplicates())
+
+    tables = {"values": values, "pairs": pairs, "version": version}
+    _LOADED.update(path=path, version=version, tables=tables)
+    return tables
+
+
+def unknown_values(series, allowed):
+    """Mask of filled cells whose value is not in the allowed Index"""
+    values = _clean(series)
+    return (values.ne('') & (allowed.get_indexer(values) < 0)).to_numpy()
+
+
+def unknown_pairs(left, right, allowed):
+    """Mask of rows with both cells filled whose value pair is not in the allowed MultiIndex"""
+    left_values, right_values = _clean(left), _clean(right)
+    lookup = pd.MultiIndex.from_arrays([left_values.to_numpy(), right_values.to_numpy()])
+    return (left_values.ne('') & right_values.ne('') & (allowed.get_indexer(lookup) < 0)).to_numpy()
+
+
+def render_reference_check(violations, match_field, reference, fields, display):
+    """Reference data section shared by the new-SKU validators"""
+    checked = [field for field in fields if field in reference["values"]]
+    checked += [f"{left} → {right}" for left, right in reference["pairs"] if left in fields and right in fields]
+    skipped = [field for field in fields if field not in reference["values"]]
+    if skipped:
+        st.info(f"ℹ️ No reference data loaded for {', '.join(skipped)}; these fields were not checked")
+    if not checked:
+        return
+
+    invalid = violations[violations["Check"].isin(["Unknown Reference Value", "Unknown Reference Pair"])]
+    if invalid.empty:
+        st.success(f"✅ All values match the reference data ({', '.join(checked)})")
+        return
+
+    st.error(f"Found {len(invalid)} values missing from the reference data")
+    for field, field_df in invalid.groupby("Field", sort=False):
+        with st.expander(f"Unknown {field} values ({len(field_df)})"):
+            display.show(field_df, ["Key", "Value"], [match_field, field], f"Unknown Reference: {field}")
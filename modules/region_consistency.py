@@ -0,0 +1,212 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from io import BytesIO
+from modules.export_diff import hash_cells, keyed_rows
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload
+from modules.preview import clear_preview, preview_option, show_preview
+import warnings
+warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
+
+REGION_KEY = "Material Bank SKU"
+
+# Field label -> (US export column, EU export column)
+REGION_FIELD_PAIRS = {
+    "Visibility": ("Visibility", "Visibility EU"),
+    "Hide From Product View": ("Hide From Product View", "Hide From Product View EU"),
+    "Manufacturer Sku": ("Manufacturer Sku", "Manufacturer Sku EU")
+}
+
+# Attributes shared by both regions, compared under the same column name
+SHARED_FIELDS = ["Product Name", "Product Type", "Family Id", "Primary Child", "Color Name", "Color Number",
+                 "Configurable Color", "Primary Color Family", "Retired Sku", "Stealth SKU", "Enable Product"]
+
+DIVERGENCE_COLUMNS = [REGION_KEY, "Field", "US Column", "EU Column", "US Value", "EU Value"]
+
+
+def compare_regions(us_df, eu_df, field_pairs):
+    """Per-field divergences between the US and EU rows of the same SKU
+
+    SKUs are hash-joined on REGION_KEY (first occurrence wins) and each field
+    pair is compared as two aligned cell-hash arrays, so no wide merged frame is
+    built. Empty and missing cells compare equal. Returns a dict with the
+    long-format divergences, per-field counts, SKUs only in one export, the
+    skipped fields and the duplicate count.
+    """
+    us_pos, us_duplicates = keyed_rows(us_df, REGION_KEY)
+    eu_pos, eu_duplicates = keyed_rows(eu_df, REGION_KEY)
+    us_keys = pd.Index(us_df[REGION_KEY].to_numpy(dtype=object)[us_pos], dtype=object)
+    eu_keys = pd.Index(eu_df[REGION_KEY].to_numpy(dtype=object)[eu_pos], dtype=object)
+
+    # Align SKUs: -1 means the SKU is not in the other export
+    match = eu_keys.get_indexer(us_keys)
+    in_both = match >= 0
+    us_matched = us_pos[in_both]
+    eu_matched = eu_pos[match[in_both]]
+    matched_keys = us_keys.to_numpy()[in_both]
+
+    found, counts, skipped = [], [], []
+    for field, (us_col, eu_col) in field_pairs.items():
+        if us_col not in us_df.columns or eu_col not in eu_df.columns:
+            skipped.append(field)
+            continue
+        us_values = us_df[us_col].iloc[us_matched]
+        eu_values = eu_df[eu_col].iloc[eu_matched]
+        differs = np.flatnonzero(hash_cells(us_values) != hash_cells(eu_values))
+        counts.append({"Field": field, "US Column": us_col, "EU Column": eu_col, "Divergent SKUs": len(differs)})
+        if len(differs):
+            found.append(pd.DataFrame({
+                REGION_KEY: matched_keys[differs],
+                "Field": field,
+                "US Column": us_col,
+                "EU Column": eu_col,
+                "US Value": us_values.to_numpy(dtype=object)[differs],
+                "EU Value": eu_values.to_numpy(dtype=object)[differs]
+            }))
+
+    divergences = pd.concat(found, ignore_index=True) if found else pd.DataFrame(columns=DIVERGENCE_COLUMNS)
+    field_counts = pd.DataFrame(counts, columns=["Field", "US Column", "EU Column", "Divergent SKUs"])
+    return {
+        "divergences": divergences,
+        "field_counts": field_counts.sort_values("Divergent SKUs", ascending=False, kind='stable'),
+        "us_only": pd.DataFrame({REGION_KEY: us_keys.to_numpy()[~in_both]}),
+        "eu_only": pd.DataFrame({REGION_KEY: eu_keys.to_numpy()[us_keys.get_indexer(eu_keys) < 0]}),
+        "matched": int(in_both.sum()),
+        "skipped": skipped,
+        "duplicates": us_duplicates + eu_duplicates
+    }
+
+
+def write_consistency_workbook(result):
+    """Write the consistency sheets into one workbook and return its bytes"""
+    sheets = {
+        'Divergences': result["divergences"],
+        'Field Counts': result["field_counts"],
+        'Only in US': result["us_only"],
+        'Only in EU': result["eu_only"]
+    }
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        text_format = writer.book.add_format({'num_format': '@'})
+
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            worksheet = writer.sheets[sheet_name]
+            for idx, col in enumerate(df.columns):
+                max_len = max(
+                    df[col].astype(str).str.len().max() if len(df) else 0,
+                    len(str(col))
+                ) + 2
+                worksheet.set_column(idx, idx, min(max_len, 50), text_format)
+            worksheet.autofilter(0, 0, len(df), max(len(df.columns)-1, 0))
+
+    return output.getvalue()
+
+
+def run():
+    # Instructions
+    with st.expander("📋 **Region Consistency Instructions**", expanded=False):
+        st.markdown(f"""
+        **How to Use:**
+        1. Upload the US export and the EU export
+        2. Pick the fields to compare
+        3. Review the SKUs whose US and EU values differ and download the report
+
+        SKUs are matched on `{REGION_KEY}`. Region-specific fields are compared across their
+        US and EU columns (e.g. `Visibility` vs `Visibility EU`); shared attributes are compared
+        under the same column name. Empty and missing cells are treated as equal.
+        """)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        us_file = st.file_uploader(
+            "US Export",
+            type=UPLOAD_TYPES,
+            help="Upload the US PIM export"
+        )
+    with col2:
+        eu_file = st.file_uploader(
+            "EU Export",
+            type=UPLOAD_TYPES,
+            help="Upload the EU PIM export"
+        )
+
+    field_options = list(REGION_FIELD_PAIRS) + SHARED_FIELDS
+    fields = st.multiselect(
+        "Fields to Compare:",
+        options=field_options,
+        default=field_options,
+        help="Fields missing from either export are skipped"
+    )
+    quick_preview = preview_option("preview_region_consistency")
+
+    if us_file and eu_file:
+        try:
+            field_pairs = {field: REGION_FIELD_PAIRS.get(field, (field, field)) for field in fields}
+
+            # Parse only the key and the compared columns
+            with st.spinner("Loading exports..."):
+                us_df = normalize_whitespace(read_upload(
+                    us_file, dtype=str, columns=[REGION_KEY] + [us_col for us_col, _ in field_pairs.values()]))
+                eu_df = normalize_whitespace(read_upload(
+                    eu_file, dtype=str, columns=[REGION_KEY] + [eu_col for _, eu_col in field_pairs.values()]))
+
+            errors = []
+            if REGION_KEY not in us_df.columns:
+                errors.append(f"'{REGION_KEY}' column missing in US Export")
+            if REGION_KEY not in eu_df.columns:
+                errors.append(f"'{REGION_KEY}' column missing in EU Export")
+            if not fields:
+                errors.append("Select at least one field to compare")
+
+            if errors:
+                st.error("Validation Errors:")
+                for error in errors:
+                    st.write(f"- {error}")
+                return
+
+            # Sampled US SKUs against the full EU export first; the full comparison replaces them
+            def render_sample(us_sample):
+                sample = compare_regions(us_sample, eu_df, field_pairs)
+                st.write(f"Divergent fields for {sample['matched']} sampled SKUs found in both exports:")
+                st.dataframe(sample["field_counts"], use_container_width=True, hide_index=True)
+
+            preview = show_preview(us_df, render_sample, quick_preview)
+            with st.spinner("Comparing regions..."):
+                result = compare_regions(us_df, eu_df, field_pairs)
+            clear_preview(preview)
+
+            # Summary
+            st.markdown("---")
+            metric_cols = st.columns(4)
+            metric_cols[0].metric("SKUs in Both", result["matched"])
+            metric_cols[1].metric("Divergent SKUs", result["divergences"][REGION_KEY].nunique())
+            metric_cols[2].metric("Only in US", len(result["us_only"]))
+            metric_cols[3].metric("Only in EU", len(result["eu_only"]))
+
+            if result["skipped"]:
+                st.info(f"Skipped fields missing from an export: {', '.join(result['skipped'])}")
+            if result["duplicates"]:
+                st.warning(f"{result['duplicates']} duplicate SKU rows were ignored; the first occurrence was compared")
+
+            # Previews
+            for label, key in [("Divergences", "divergences"), ("Divergences per Field", "field_counts"),
+                               ("SKUs Only in US", "us_only"), ("SKUs Only in EU", "eu_only")]:
+                if not result[key].empty:
+                    with st.expander(f"Preview {label}", expanded=key == "divergences"):
+                        st.dataframe(result[key], height=300, use_container_width=True, hide_index=True)
+                        st.caption(f"Records: {len(result[key])}")
+
+            st.success("Comparison complete! Download results:")
+            st.download_button(
+                label="Download Consistency Report",
+                data=write_consistency_workbook(result),
+                file_name="region_consistency.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+        except Exception as e:
+            st.error(f"Processing error: {str(e)}")
+
+if __name__ == "__main__":
+    run()
@@ -1,48 +1,337 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from modules.catalog_store import export_source_picker, load_ticket_rows, read_store
+from modules.changeset import build_change_set, write_change_set_workbook
+from modules.family_graph import LINK_COLUMNS, FamilyGraph
+from modules.indexes import NAME_IDENTIFIER, identifier_positions, normalize_names
+from modules.loaders import UPLOAD_TYPES, normalize_whitespace, read_upload, select_rows, upload_stem
+from modules.uniqueness import warn_output_duplicates
 import warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
 
-def run():
-    # Region configuration
-    RETIRE_COLUMNS = {
-        "US": {
-            "retire_columns": [
-                "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku",
-                "Product Type", "Product Name", "Primary Child", "Url Key",
-                "Stealth SKU", "Retired Sku", "Admin Notes", "Inventory Disposition",
-                "Visibility", "Hide From Product View"
-            ],
-            "reassign_columns": [
-                "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku",
-                "Product Type", "Product Name", "Color Name", "Color Number",
-                "Configurable Color", "Primary Child", "Image Url", "Url Key", "Primary Color Family",
-                "Color Variety", "Color Saturation", "Retired Sku", "Admin Notes",
-                "Inventory Disposition", "Visibility", "Hide From Product View"
-            ],
-            "visibility_col": "Visibility",
-            "hide_col": "Hide From Product View"
-        },
-        "EU": {
-            "retire_columns": [
-                "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku EU",
-                "Product Type", "Product Name", "Primary Child", "Url Key",
-                "Stealth SKU", "Retired Sku", "Admin Notes", "Inventory Disposition",
-                "Visibility EU", "Hide From Product View EU"
-            ],
-            "reassign_columns": [
-                "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku EU",
-                "Product Type", "Product Name", "Color Name", "Color Number",
-                "Configurable Color", "Primary Child", "Image Url", "Url Key", "Primary Color Family",
-                "Color Variety", "Color Saturation", "Retired Sku", "Admin Notes",
-                "Inventory Disposition", "Visibility EU", "Hide From Product View EU"
-            ],
-            "visibility_col": "Visibility EU",
-            "hide_col": "Hide From Product View EU"
+# Region configuration
+RETIRE_COLUMNS = {
+    "US": {
+        "retire_columns": [
+            "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku",
+            "Product Type", "Product Name", "Primary Child", "Url Key",
+            "Stealth SKU", "Retired Sku", "Admin Notes", "Inventory Disposition",
+            "Visibility", "Hide From Product View"
+        ],
+        "reassign_columns": [
+            "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku",
+            "Product Type", "Product Name", "Color Name", "Color Number",
+            "Configurable Color", "Primary Child", "Image Url", "Url Key", "Primary Color Family",
+            "Color Variety", "Color Saturation", "Retired Sku", "Admin Notes",
+            "Inventory Disposition", "Visibility", "Hide From Product View"
+        ],
+        "visibility_col": "Visibility",
+        "hide_col": "Hide From Product View"
+    },
+    "EU": {
+        "retire_columns": [
+            "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku EU",
+            "Product Type", "Product Name", "Primary Child", "Url Key",
+            "Stealth SKU", "Retired Sku", "Admin Notes", "Inventory Disposition",
+            "Visibility EU", "Hide From Product View EU"
+        ],
+        "reassign_columns": [
+            "Channels", "Material Bank SKU", "Family Id", "Manufacturer Sku EU",
+            "Product Type", "Product Name", "Color Name", "Color Number",
+            "Configurable Color", "Primary Child", "Image Url", "Url Key", "Primary Color Family",
+            "Color Variety", "Color Saturation", "Retired Sku", "Admin Notes",
+            "Inventory Disposition", "Visibility EU", "Hide From Product View EU"
+        ],
+        "visibility_col": "Visibility EU",
+        "hide_col": "Hide From Product View EU"
+    }
+}
+
+# Optional column in batch ticket files; falls back to the ticket file name
+TICKET_COLUMN = "Ticket Number"
+
+# Primary child proposal rules: rule name -> column that must be filled; applied in the selected order
+PROPOSAL_RULES = {
+    "Has Image Url": "Image Url",
+    "Has Color Name": "Color Name",
+    "Has Color Number": "Color Number",
+    "Has Configurable Color": "Configurable Color"
+}
+
+PROPOSAL_COLUMNS = ["Family Id", "Retiring Primary Child", "Proposed Primary Child", "Matched Rules",
+                    "Eligible Candidates"]
+
+
+def retire_rows(export_df, positions, region, admin_notes):
+    """Build Final Results rows with the retirement field updates applied"""
+    final_results = select_rows(export_df, positions, RETIRE_COLUMNS[region]["retire_columns"])
+    final_results['Retired Sku'] = 'Yes'
+    final_results[RETIRE_COLUMNS[region]["visibility_col"]] = 'Not Visible Individually'
+    final_results[RETIRE_COLUMNS[region]["hide_col"]] = 'Yes'
+    final_results['Admin Notes'] = admin_notes
+    return final_results
+
+
+def propose_primary_children(export_df, retired_pos, rules):
+    """Proposed new primary child for every family losing one, ranked in a single sort
+
+    Candidates are active, non-stealth, non-configurable members that are not
+    being retired. They are ranked by the given PROPOSAL_RULES names in order,
+    then by lowest Material Bank SKU; families without a candidate get no proposal.
+    """
+    retired_pos = np.asarray(retired_pos, dtype=np.intp)
+    family_values = export_df['Family Id'].to_numpy(dtype=object)
+    skus = export_df['Material Bank SKU'].to_numpy(dtype=object)
+    primary_pos = retired_pos[export_df['Primary Child'].to_numpy()[retired_pos] == 'Yes']
+    primary_pos = primary_pos[pd.notna(family_values[primary_pos])]
+    if len(primary_pos) == 0:
+        return pd.DataFrame(columns=PROPOSAL_COLUMNS)
+
+    # Retiring primary children per family
+    retiring = pd.DataFrame({"Family Id": family_values[primary_pos], "SKU": skus[primary_pos]})
+    retiring = retiring.groupby("Family Id", sort=False)["SKU"].agg(", ".join).rename("Retiring Primary Child")
+
+    # Eligible members of the affected families
+    family_pos = np.flatnonzero(export_df['Family Id'].isin(retiring.index).to_numpy())
+    is_retiring = np.zeros(len(export_df), dtype=bool)
+    is_retiring[retired_pos] = True
+    eligible = (
+        export_df['Retired Sku'].iloc[family_pos].str.lower().eq('no').to_numpy() &
+        export_df['Stealth SKU'].iloc[family_pos].str.lower().eq('no').to_numpy() &
+        ~export_df['Product Type'].iloc[family_pos].str.lower().eq('configurable').to_numpy() &
+        ~is_retiring[family_pos]
+    )
+    candidate_pos = family_pos[eligible]
+
+    ranking = pd.DataFrame({"Family Id": family_values[candidate_pos], "Proposed Primary Child": skus[candidate_pos]})
+    matched_rules = pd.Series('', index=ranking.index, dtype=object)
+    for rule in rules:
+        values = export_df[PROPOSAL_RULES[rule]].iloc[candidate_pos]
+        ranking[rule] = (values.notna() & values.str.strip().ne('')).to_numpy()
+        matched_rules = matched_rules + np.where(ranking[rule], f"{rule}, ", "")
+    ranking["Matched Rules"] = matched_rules.str.rstrip(", ")
+    # Numeric SKUs compare as numbers ("9" before "10"); non-numeric ones follow, as text
+    ranking["_sku_number"] = pd.to_numeric(ranking["Proposed Primary Child"], errors='coerce')
+
+    # Best candidate per family: one sort, then the first row of each family
+    best = ranking.sort_values(
+        list(rules) + ["_sku_number", "Proposed Primary Child"],
+        ascending=[False] * len(rules) + [True, True],
+        na_position='last',
+        kind='stable'
+    ).drop_duplicates("Family Id")
+
+    proposals = retiring.reset_index().merge(
+        best[["Family Id", "Proposed Primary Child", "Matched Rules"]], on="Family Id", how="left")
+    proposals["Eligible Candidates"] = proposals["Family Id"].map(
+        ranking["Family Id"].value_counts()).fillna(0).astype(int)
+    proposals["Proposed Primary Child"] = proposals["Proposed Primary Child"].fillna("No eligible candidate")
+    proposals["Matched Rules"] = proposals["Matched Rules"].fillna("")
+    return proposals[PROPOSAL_COLUMNS]
+
+
+def write_retirement_workbook(final_results, family_skus_filtered, ticket_skus, proposals=None):
+    """Write the Final_Results / ReassignPrimaryChild (/ ProposedPrimaryChild) workbook and return its bytes"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        # Create formats
+        workbook = writer.book
+        text_format = workbook.add_format({'num_format': '@'})
+        red_format = workbook.add_format({'num_format': '@', 'bg_color': '#FFC7CE'})
+
+        # Final Results sheet
+        final_results.to_excel(writer, sheet_name='Final_Results', index=False)
+        final_sheet = writer.sheets['Final_Results']
+        pc_col_idx = final_results.columns.get_loc('Primary Child')
+
+        # Only create reassignment sheet if needed
+        if not family_skus_filtered.empty:
+            green_format = workbook.add_format({'num_format': '@', 'bg_color': '#90EE90'})
+            family_skus_filtered.to_excel(writer, sheet_name='ReassignPrimaryChild', index=False)
+            reassign_sheet = writer.sheets['ReassignPrimaryChild']
+            sku_col_idx = family_skus_filtered.columns.get_loc('Material Bank SKU')
+
+        # Format columns and apply highlighting
+        for sheet, df in [(final_sheet, final_results)]:
+            for idx, col in enumerate(df.columns):
+                max_len = max(df[col].str.len().max(), len(col)) + 2
+                sheet.set_column(idx, idx, min(max_len, 30), text_format)
+            sheet.autofilter(0, 0, len(df), len(df.columns)-1)
+
+        # Apply highlights to final results
+        for row in range(1, len(final_results)+1):
+            if final_results.iloc[row-1]['Primary Child'] == 'Yes':
+                final_sheet.write(row, pc_col_idx, 'Yes', red_format)
+
+        # Apply highlights to reassignment sheet if exists
+        if not family_skus_filtered.empty:
+            for row in range(1, len(family_skus_filtered)+1):
+                current_sku = family_skus_filtered.iloc[row-1]['Material Bank SKU']
+                if current_sku in ticket_skus:
+                    reassign_sheet.write(row, sku_col_idx, current_sku, green_format)
+            # Format reassignment sheet columns
+            for idx, col in enumerate(family_skus_filtered.columns):
+                max_len = max(family_skus_filtered[col].str.len().max(), len(col)) + 2
+                reassign_sheet.set_column(idx, idx, min(max_len, 30), text_format)
+            reassign_sheet.autofilter(0, 0, len(family_skus_filtered), len(family_skus_filtered.columns)-1)
+
+        # Proposed primary children, one row per affected family
+        if proposals is not None and not proposals.empty:
+            proposals.to_excel(writer, sheet_name='ProposedPrimaryChild', index=False)
+            proposal_sheet = writer.sheets['ProposedPrimaryChild']
+            for idx, col in enumerate(proposals.columns):
+                max_len = max(proposals[col].astype(str).str.len().max(), len(col)) + 2
+                proposal_sheet.set_column(idx, idx, min(max_len, 40), text_format)
+            proposal_sheet.autofilter(0, 0, len(proposals), len(proposals.columns)-1)
+
+    return output.getvalue()
+
+
+def load_batch_tickets(ticket_files, identifier_type):
+    """Stack every ticket file into one (identifier, ticket number) frame"""
+    frames = []
+    for file in ticket_files:
+        ticket_df = normalize_whitespace(read_upload(file, dtype=str))
+        if identifier_type not in ticket_df.columns:
+            raise ValueError(f"'{identifier_type}' column missing in Ticket File {file.name}")
+
+        # Ticket number comes from the ticket column when present, else the file name
+        file_ticket = upload_stem(file.name).strip()
+        if TICKET_COLUMN in ticket_df.columns:
+            ticket_numbers = ticket_df[TICKET_COLUMN].fillna(file_ticket).replace('', file_ticket)
+        else:
+            ticket_numbers = file_ticket
+
+        frames.append(pd.DataFrame({
+            identifier_type: ticket_df[identifier_type],
+            TICKET_COLUMN: ticket_numbers
+        }))
+
+    tickets = pd.concat(frames, ignore_index=True)
+    tickets = tickets.dropna(subset=[identifier_type])
+    return tickets.drop_duplicates(ignore_index=True)
+
+
+def build_batch_results(export_df, tickets, identifier_type, region, initials, family_graph=None,
+                        proposal_rules=None):
+    """Match all tickets against the export in one pass and split results per ticket
+
+    With a `family_graph`, reassignment candidates come from the whole linked
+    family group of each retired primary child. With `proposal_rules`, every
+    affected family also gets a proposed new primary child.
+    """
+    # Pair every ticket identifier with its export row positions; names match after normalization
+    ticket_keys, export_values = tickets[identifier_type], export_df[identifier_type]
+    if identifier_type == NAME_IDENTIFIER:
+        ticket_keys, export_values = normalize_names(ticket_keys), normalize_names(export_values)
+    export_keys = pd.DataFrame({
+        '_key': export_values.to_numpy(),
+        '_row': np.arange(len(export_df))
+    })
+    matched = tickets.assign(_key=ticket_keys.to_numpy()).dropna(subset=['_key'])
+    matched = matched.merge(export_keys, on='_key', how='inner')
+
+    # Final Results for every ticket at once
+    matched_pos = matched['_row'].to_numpy()
+    final_results = retire_rows(export_df, matched_pos, region, "")
+    final_results['Admin Notes'] = (
+        "Ticket " + matched[TICKET_COLUMN] + f", Retired - {initials}"
+    ).to_numpy()
+    final_tickets = matched[TICKET_COLUMN].to_numpy()
+
+    # ReassignPrimaryChild candidates: active members of families losing a primary child
+    candidates = pd.DataFrame()
+    candidate_tickets = np.array([], dtype=object)
+    proposals = pd.DataFrame(columns=PROPOSAL_COLUMNS)
+    proposal_tickets = np.array([], dtype=object)
+    # Families are keyed by linked group when expanding, else by Family Id
+    family_id_values = export_df['Family Id'].to_numpy() if family_graph is None else family_graph.group
+    primary_mask = export_df['Primary Child'].to_numpy()[matched_pos] == 'Yes'
+    ticket_families = pd.DataFrame({
+        TICKET_COLUMN: matched[TICKET_COLUMN].to_numpy()[primary_mask],
+        'Family Id': family_id_values[matched_pos[primary_mask]]
+    }).drop_duplicates()
+
+    active_pos = np.flatnonzero(export_df['Retired Sku'].str.lower().eq('no').to_numpy())
+    active_families = pd.DataFrame({
+        'Family Id': family_id_values[active_pos],
+        '_row': active_pos
+    })
+    family_pairs = ticket_families.merge(active_families, on='Family Id', how='inner')
+    candidates = select_rows(export_df, family_pairs['_row'], RETIRE_COLUMNS[region]["reassign_columns"])
+    candidate_tickets = family_pairs[TICKET_COLUMN].to_numpy()
+
+    if proposal_rules is not None:
+        # Proposals for all tickets' families in one pass, then paired back to their tickets
+        proposals = propose_primary_children(export_df, matched_pos, proposal_rules)
+        primary_pos = matched_pos[primary_mask]
+        proposal_pairs = pd.DataFrame({
+            TICKET_COLUMN: matched[TICKET_COLUMN].to_numpy()[primary_mask],
+            'Family Id': export_df['Family Id'].to_numpy(dtype=object)[primary_pos]
+        }).drop_duplicates().merge(proposals.reset_index(names='_proposal'), on='Family Id', how='inner')
+        proposals = proposals.iloc[proposal_pairs['_proposal'].to_numpy()]
+        proposal_tickets = proposal_pairs[TICKET_COLUMN].to_numpy()
+
+    # Split by ticket using positional group indices
+    final_groups = pd.Series(final_tickets).groupby(final_tickets).indices
+    candidate_groups = pd.Series(candidate_tickets).groupby(candidate_tickets).indices
+    proposal_groups = pd.Series(proposal_tickets).groupby(proposal_tickets).indices
+    ticket_skus = tickets.groupby(TICKET_COLUMN)[identifier_type].agg(set)
+
+    results = {}
+    for ticket in ticket_skus.index:
+        final_pos = final_groups.get(ticket, [])
+        candidate_pos = candidate_groups.get(ticket, [])
+        results[ticket] = {
+            "final_results": final_results.iloc[final_pos],
+            "reassign": candidates.iloc[candidate_pos] if len(candidate_pos) else pd.DataFrame(),
+            "proposals": proposals.iloc[proposal_groups.get(ticket, [])],
+            "ticket_skus": ticket_skus[ticket],
+            "retired_skus": set(final_results['Material Bank SKU'].iloc[final_pos])
         }
+    return results
+
+
+def write_ticket_files(result, region, ticket, export_df=None):
+    """Write one ticket's workbook (and optional change set) as {file name: bytes}"""
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', str(ticket)).strip('_') or "ticket"
+    files = {
+        f"sku_retirement_{region}_{name}.xlsx": write_retirement_workbook(
+            result["final_results"], result["reassign"], result["retired_skus"], result["proposals"]
+        )
     }
+    if export_df is not None:
+        delta, audit = build_change_set(export_df, result["final_results"])
+        files[f"sku_retirement_{region}_{name}_changeset.xlsx"] = write_change_set_workbook(delta, audit)
+    return files
+
+
+def write_batch_zip(results, region, export_df=None, max_workers=4):
+    """Write one workbook per ticket in parallel and bundle them into a zip
 
+    Passing `export_df` adds a change-set workbook per ticket.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(write_ticket_files, result, region, ticket, export_df)
+            for ticket, result in results.items()
+        ]
+        ticket_files = [future.result() for future in futures]
+
+    output = BytesIO()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for files in ticket_files:
+            for file_name, content in files.items():
+                archive.writestr(file_name, content)
+    return output.getvalue()
+
+
+def run():
     # UI Components
     col1, col2 = st.columns(2)
     with col1:
@@ -58,23 +347,41 @@ def run():
             options=["AL", "FH", "JL", "LL", "TO"],
             index=1  # Default to FH
         )
-    
+
+    processing_mode = st.radio(
+        "Select Processing Mode:",
+        ["Single Ticket", "Batch Tickets"],
+        index=0,
+        horizontal=True,
+        help="Batch mode retires many tickets against one export load"
+    )
+
     # File Upload Section
     st.write("#### File Uploads")
     with st.expander("📋 **Upload Instructions (Click to Expand)**", expanded=False):
         st.markdown("""
         ### Essential Checks Before Uploading:
-        
+
         ⚠️ **Important:** Field Name Consistency
-        
+
         Ensure the primary identifier field matches exactly in both files
+
+        **Batch Tickets:** upload one file per ticket (the file name is used as the ticket number),
+        or a single file with a `Ticket Number` column.
         """)
 
-    export_file = st.file_uploader("Upload PIM Export File", type=["xlsx", "csv"], 
+    use_store = export_source_picker("retirement")
+    export_file = None if use_store else st.file_uploader("Upload PIM Export File", type=UPLOAD_TYPES,
                                  help="Upload the brand export file from PIM")
-    ticket_file = st.file_uploader("Upload Retirement Ticket File", type=["xlsx", "csv"], 
-                                 help="Upload the file with SKUs to be retired")
-    
+    if processing_mode == "Batch Tickets":
+        ticket_files = st.file_uploader("Upload Retirement Ticket Files", type=UPLOAD_TYPES,
+                                      accept_multiple_files=True,
+                                      help="Upload one file per ticket, or one file with a 'Ticket Number' column")
+    else:
+        ticket_file = st.file_uploader("Upload Retirement Ticket File", type=UPLOAD_TYPES,
+                                     help="Upload the file with SKUs to be retired")
+        ticket_files = [ticket_file] if ticket_file else []
+
     identifier_type = st.selectbox(
         "Select Primary Identifier:",
         options=["Material Bank SKU", "Manufacturer Sku", "Manufacturer Sku EU", "Product Name"],
@@ -82,43 +389,65 @@ def run():
         help="Select the primary identifier for filtering SKUs"
     )
 
-    if export_file and ticket_file:
-        try:
-            # Modified data loading with string preservation
-            def read_file_with_strings(file):
-                """Read file while preserving number-like strings"""
-                if file.name.endswith('.xlsx'):
-                    return pd.read_excel(file, dtype=str)
-                else:
-                    return pd.read_csv(file, dtype=str)
-
-            # Load data as strings
-            export_df = read_file_with_strings(export_file)
-            ticket_df = read_file_with_strings(ticket_file)
-
-            # Clean data while preserving types
-            def clean_string_series(series):
-                """Clean values while maintaining data type"""
-                return series.str.strip() if series.dtype == 'object' else series
-
-            export_df = export_df.apply(clean_string_series)
-            ticket_df = ticket_df.apply(clean_string_series)
+    include_change_set = st.checkbox(
+        "Also export a change set (changed cells only)",
+        help="Adds a PIM-import-ready file with the SKU plus only the cells that change, and a long-format audit sheet"
+    )
 
-            # Validation checks
+    expand_linked = st.checkbox(
+        "Expand linked families",
+        help="Draw reassignment candidates from families linked through Import Family Id or Associated Finishes"
+    )
+
+    proposal_rules = None
+    if st.checkbox("Propose new primary children",
+                   help="Rank the remaining active, non-stealth members of every family losing its primary child"):
+        proposal_rules = st.multiselect(
+            "Proposal ranking rules (in priority order):",
+            options=list(PROPOSAL_RULES),
+            default=list(PROPOSAL_RULES),
+            help="Candidates are ranked by these rules in the order selected, then by lowest Material Bank SKU"
+        )
+
+    if (use_store or export_file) and ticket_files:
+        try:
             required_columns = list(set(
                 RETIRE_COLUMNS[region]["retire_columns"] +
                 RETIRE_COLUMNS[region]["reassign_columns"] +
                 ["Family Id", "Primary Child"]
             ))
-            
+
+            # Tickets are read first so the catalog store can look up just their rows
+            if processing_mode == "Batch Tickets":
+                ticket_df = load_batch_tickets(ticket_files, identifier_type)
+            else:
+                ticket_df = normalize_whitespace(read_upload(ticket_files[0], dtype=str))
+
+            # Linking columns are optional; the graph uses whichever the export has
+            read_columns = required_columns + [identifier_type] + (LINK_COLUMNS if expand_linked else [])
+            if use_store and expand_linked:
+                # Linked families can reach anywhere in the catalog, so the whole export is needed
+                export_df = read_store(read_columns)
+            elif use_store:
+                export_df = load_ticket_rows(ticket_df, identifier_type, read_columns)
+            else:
+                # Load data as strings, parsing only the columns the reports use
+                export_df = read_upload(export_file, dtype=str, columns=read_columns)
+
+                # Strip whitespace once; every later step reuses the cleaned columns
+                normalize_whitespace(export_df)
+
+            # Validation checks
+
             missing_columns = [col for col in required_columns if col not in export_df.columns]
             errors = []
             if missing_columns:
                 errors.append(f"Missing columns in Export File: {', '.join(missing_columns)}")
             if identifier_type not in export_df.columns:
                 errors.append(f"'{identifier_type}' column missing in Export File")
-            if identifier_type not in ticket_df.columns:
-                errors.append(f"'{identifier_type}' column missing in Ticket File")
+            if processing_mode == "Single Ticket":
+                if identifier_type not in ticket_df.columns:
+                    errors.append(f"'{identifier_type}' column missing in Ticket File")
             if not initials:
                 errors.append("Please select your initials")
 
@@ -128,105 +457,132 @@ def run():
                     st.write(f"- {error}")
                 return
 
+            family_graph = FamilyGraph(export_df) if expand_linked else None
+
+            if processing_mode == "Batch Tickets":
+                run_batch(export_df, ticket_df, identifier_type, region, initials, include_change_set, family_graph,
+                          proposal_rules)
+                return
+
             # Process data with preserved string types
-            ticket_identifiers = ticket_df[identifier_type].str.strip().unique()
-            export_df[identifier_type] = export_df[identifier_type].str.strip()
-            
-            # Get base matches
-            base_matches = export_df[export_df[identifier_type].isin(ticket_identifiers)].copy()
-            final_results = base_matches[RETIRE_COLUMNS[region]["retire_columns"]].copy()
-            
-            # Update Final Results fields
-            final_results['Retired Sku'] = 'Yes'
-            final_results[RETIRE_COLUMNS[region]["visibility_col"]] = 'Not Visible Individually'
-            final_results[RETIRE_COLUMNS[region]["hide_col"]] = 'Yes'
-            final_results['Admin Notes'] = f"Ticket X, Retired - {initials}"
-
-            # Only run reassignment logic if identifier is NOT Product Name
+            ticket_identifiers = ticket_df[identifier_type].unique()
+
+            # Get base matches as row positions; Product Names match ignoring case and spacing
+            base_pos = identifier_positions(export_df[identifier_type], ticket_identifiers, identifier_type)
+            retired_skus = set(export_df['Material Bank SKU'].iloc[base_pos])
+            final_results = retire_rows(export_df, base_pos, region, f"Ticket X, Retired - {initials}")
+
+            # ReassignPrimaryChild logic, for every identifier type
             family_skus_filtered = pd.DataFrame()
-            if identifier_type != "Product Name":
-                # ReassignPrimaryChild logic
-                primary_yes = base_matches[base_matches['Primary Child'] == 'Yes'].copy()
-                family_ids = primary_yes['Family Id'].str.strip().unique()
-                family_skus = export_df[export_df['Family Id'].str.strip().isin(family_ids)].copy()
-                family_skus = family_skus[family_skus['Retired Sku'].str.strip().str.lower() == 'no']
-                family_skus_filtered = family_skus[RETIRE_COLUMNS[region]["reassign_columns"]].copy()
+            proposals = None
+            primary_pos = base_pos[export_df['Primary Child'].to_numpy()[base_pos] == 'Yes']
+            if family_graph is not None:
+                linked_pos = family_graph.linked_positions(primary_pos)
+                family_pos = linked_pos[export_df['Retired Sku'].iloc[linked_pos].str.lower().eq('no').to_numpy()]
+            else:
+                family_ids = pd.unique(export_df['Family Id'].to_numpy()[primary_pos])
+                family_pos = np.flatnonzero((
+                    export_df['Family Id'].isin(family_ids) &
+                    export_df['Retired Sku'].str.lower().eq('no')
+                ).to_numpy())
+            family_skus_filtered = select_rows(export_df, family_pos, RETIRE_COLUMNS[region]["reassign_columns"])
+            if proposal_rules is not None:
+                proposals = propose_primary_children(export_df, base_pos, proposal_rules)
 
             # Preview with highlighting
             st.markdown("---")
             with st.expander("Preview Final Results", expanded=True):
                 styled_final = final_results.style.map(
-                    lambda x: 'background-color: red' if x == 'Yes' else '', 
+                    lambda x: 'background-color: red' if x == 'Yes' else '',
                     subset=['Primary Child']
                 )
                 st.dataframe(styled_final, height=300, use_container_width=True)
                 st.caption(f"Primary Records: {len(final_results)}")
 
             # Only show reassignment preview if needed
-            if identifier_type != "Product Name" and not family_skus_filtered.empty:
+            if not family_skus_filtered.empty:
                 with st.expander("Preview Reassignment Candidates", expanded=False):
-                    ticket_skus = set(ticket_identifiers)
                     styled_reassign = family_skus_filtered.style.map(
-                        lambda x: 'background-color: #90EE90' if str(x) in ticket_skus else '',
+                        lambda x: 'background-color: #90EE90' if str(x) in retired_skus else '',
                         subset=['Material Bank SKU']
                     )
                     st.dataframe(styled_reassign, height=300, use_container_width=True)
                     st.caption(f"Active Family Members: {len(family_skus_filtered)}")
 
+            if proposals is not None and not proposals.empty:
+                with st.expander("Preview Proposed Primary Children", expanded=True):
+                    st.dataframe(proposals, height=300, use_container_width=True, hide_index=True)
+                    st.caption(f"Families: {len(proposals)} | Without a candidate: "
+                               f"{int((proposals['Eligible Candidates'] == 0).sum())}")
+
             # Excel Export with text preservation
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                # Create formats
-                workbook = writer.book
-                text_format = workbook.add_format({'num_format': '@'})
-                red_format = workbook.add_format({'num_format': '@', 'bg_color': '#FFC7CE'})
-                
-                # Final Results sheet
-                final_results.to_excel(writer, sheet_name='Final_Results', index=False)
-                final_sheet = writer.sheets['Final_Results']
-                pc_col_idx = final_results.columns.get_loc('Primary Child')
-                
-                # Only create reassignment sheet if needed
-                if identifier_type != "Product Name" and not family_skus_filtered.empty:
-                    green_format = workbook.add_format({'num_format': '@', 'bg_color': '#90EE90'})
-                    family_skus_filtered.to_excel(writer, sheet_name='ReassignPrimaryChild', index=False)
-                    reassign_sheet = writer.sheets['ReassignPrimaryChild']
-                    sku_col_idx = family_skus_filtered.columns.get_loc('Material Bank SKU')
-
-                # Format columns and apply highlighting
-                for sheet, df in [(final_sheet, final_results)]:
-                    for idx, col in enumerate(df.columns):
-                        max_len = max(df[col].str.len().max(), len(col)) + 2
-                        sheet.set_column(idx, idx, min(max_len, 30), text_format)
-                    sheet.autofilter(0, 0, len(df), len(df.columns)-1)
-
-                # Apply highlights to final results
-                for row in range(1, len(final_results)+1):
-                    if final_results.iloc[row-1]['Primary Child'] == 'Yes':
-                        final_sheet.write(row, pc_col_idx, 'Yes', red_format)
-
-                # Apply highlights to reassignment sheet if exists
-                if identifier_type != "Product Name" and not family_skus_filtered.empty:
-                    for row in range(1, len(family_skus_filtered)+1):
-                        current_sku = family_skus_filtered.iloc[row-1]['Material Bank SKU']
-                        if current_sku in ticket_identifiers:
-                            reassign_sheet.write(row, sku_col_idx, current_sku, green_format)
-                    # Format reassignment sheet columns
-                    for idx, col in enumerate(family_skus_filtered.columns):
-                        max_len = max(family_skus_filtered[col].str.len().max(), len(col)) + 2
-                        reassign_sheet.set_column(idx, idx, min(max_len, 30), text_format)
-                    reassign_sheet.autofilter(0, 0, len(family_skus_filtered), len(family_skus_filtered.columns)-1)
+            warn_output_duplicates(final_results, "Final Results")
+            workbook = write_retirement_workbook(final_results, family_skus_filtered, retired_skus, proposals)
 
             st.success("Processing complete! Download results:")
             st.download_button(
                 label="Download Report",
-                data=output.getvalue(),
+                data=workbook,
                 file_name=f"sku_retirement_{region}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
 
+            if include_change_set:
+                delta, audit = build_change_set(export_df, final_results)
+                st.download_button(
+                    label="Download Change Set",
+                    data=write_change_set_workbook(delta, audit),
+                    file_name=f"sku_retirement_{region}_changeset.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+                st.caption(f"Change set: {len(delta)} SKUs, {len(audit)} changed cells")
+
         except Exception as e:
             st.error(f"Processing error: {str(e)}")
 
+
+def run_batch(export_df, tickets, identifier_type, region, initials, include_change_set=False, family_graph=None,
+              proposal_rules=None):
+    """Retire every ticket in `tickets` (from load_batch_tickets) against a single export load"""
+
+    with st.spinner(f"Processing {tickets[TICKET_COLUMN].nunique()} tickets..."):
+        results = build_batch_results(export_df, tickets, identifier_type, region, initials, family_graph,
+                                      proposal_rules)
+
+    # Per-ticket summary
+    st.markdown("---")
+    summary = pd.DataFrame([
+        {
+            "Ticket": ticket,
+            "Ticket SKUs": len(result["ticket_skus"]),
+            "Retired Records": len(result["final_results"]),
+            "Primary Children Retired": int((result["final_results"]['Primary Child'] == 'Yes').sum()),
+            "Reassignment Candidates": len(result["reassign"]),
+            "Proposed Primary Children": int((result["proposals"]["Eligible Candidates"] > 0).sum())
+        }
+        for ticket, result in results.items()
+    ])
+    with st.expander("Preview Batch Summary", expanded=True):
+        st.dataframe(summary, height=300, use_container_width=True)
+        st.caption(f"Tickets: {len(summary)} | Retired Records: {int(summary['Retired Records'].sum())}")
+
+    unmatched = summary.loc[summary["Retired Records"] == 0, "Ticket"].tolist()
+    if unmatched:
+        st.warning(f"No matching records found for tickets: {', '.join(map(str, unmatched))}")
+
+    # A SKU in several tickets would be retired by more than one import
+    warn_output_duplicates(pd.concat([result["final_results"] for result in results.values()]), "Batch Final Results")
+
+    with st.spinner("Writing ticket workbooks..."):
+        archive = write_batch_zip(results, region, export_df if include_change_set else None)
+
+    st.success("Processing complete! Download results:")
+    st.download_button(
+        label="Download Ticket Reports (ZIP)",
+        data=archive,
+        file_name=f"sku_retirement_{region}_batch.zip",
+        mime="application/zip"
+    )
+
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
@@ -0,0 +1,261 @@
+import hashlib
+import time
+import streamlit as st
+import pandas as pd
+import numpy as np
+from modules.loaders import upload_buffer
+from modules.reference_data import unknown_pairs, unknown_values
+from modules.state_permissions import allowed_states_label, check_state_permissions
+
+VIOLATION_COLUMNS = ["Row Id", "Key", "Material Bank SKU", "Check", "Field", "Value", "Expected"]
+
+# Columns that identify one violation when comparing two runs
+VIOLATION_IDENTITY = ["Row Id", "Check", "Field", "Value", "Expected"]
+
+# Example rows rendered per rule until "Load all" is clicked
+VIOLATION_CAP = 100
+
+# Seconds of table rendering per run before the remaining rules show only counts and top values
+RENDER_BUDGET = 5.0
+
+# Distinct values summarized for a capped rule
+TOP_VALUES = 5
+
+
+def file_fingerprint(uploaded_file):
+    """Hash of an upload's raw bytes"""
+    return hashlib.sha1(upload_buffer(uploaded_file)).hexdigest()
+
+
+def row_ids(df, key_column):
+    """Stable identity per row: its key plus its occurrence number among rows sharing that key"""
+    keys = df[key_column].astype(str).fillna('')
+    return (keys + "#" + df.groupby(keys, sort=False).cumcount().astype(str)).to_numpy(dtype=object)
+
+
+def row_hashes(df):
+    """One uint64 content hash per row"""
+    return pd.util.hash_pandas_object(df.astype(object).fillna(''), index=False).to_numpy()
+
+
+def _violations(df, ids, key_column, mask, check, field, values, expected):
+    """Violation rows for one check and field, given a boolean row mask"""
+    positions = np.flatnonzero(mask)
+    return pd.DataFrame({
+        "Row Id": ids[positions],
+        "Key": df[key_column].to_numpy(dtype=object)[positions],
+        "Material Bank SKU": (df["Material Bank SKU"].astype(str).to_numpy(dtype=object)[positions]
+                              if "Material Bank SKU" in df.columns else None),
+        "Check": check,
+        "Field": field,
+        "Value": np.asarray(values, dtype=object)[positions],
+        "Expected": np.asarray(expected, dtype=object)[positions] if np.ndim(expected) else expected
+    }, columns=VIOLATION_COLUMNS)
+
+
+def check_rows(df, ids, key_column, rules, sku_df):
+    """Run every row-level and SKU-list check on the given rows"""
+    found = []
+
+    # Expected values (case-sensitive)
+    for field, expected in rules.get("expected_values", {}).items():
+        if field in df.columns:
+            values = df[field].astype(str)
+            found.append(_violations(df, ids, key_column, (values != expected).to_numpy(),
+                                     "Expected Value", field, df[field], expected))
+
+    # Required fields must not be empty
+    for field in rules.get("non_empty_fields", []):
+        if field in df.columns:
+            empty = (df[field].isna() | (df[field].astype(str).str.strip() == '')).to_numpy()
+            found.append(_violations(df, ids, key_column, empty, "Empty Value", field, df[field], ""))
+
+    # Field formats
+    for field, config in rules.get("field_patterns", {}).items():
+        if field in df.columns:
+            matches = df[field].astype(str).str.strip().str.match(config["pattern"]).to_numpy(dtype=bool)
+            found.append(_violations(df, ids, key_column, ~matches, "Invalid Format", field,
+                                     df[field], config["example"]))
+
+    # Reference data: values, and value pairs, must exist in the loaded tables
+    reference = rules.get("reference_data")
+    if reference:
+        reference_fields = rules.get("reference_fields", [])
+        for field in reference_fields:
+            if field in df.columns and field in reference["values"]:
+                found.append(_violations(df, ids, key_column, unknown_values(df[field], reference["values"][field]),
+                                         "Unknown Reference Value", field, df[field], ""))
+        for (left, right), allowed in reference["pairs"].items():
+            if left in reference_fields and right in reference_fields and left in df.columns and right in df.columns:
+                pair_values = df[left].astype(str) + " / " + df[right].astype(str)
+                found.append(_violations(df, ids, key_column, unknown_pairs(df[left], df[right], allowed),
+                                         "Unknown Reference Pair", f"{left} → {right}", pair_values, ""))
+
+    # Empty Primary Child
+    if "Primary Child" in df.columns and "Material Bank SKU" in df.columns:
+        found.append(_violations(df, ids, key_column, df["Primary Child"].isna().to_numpy(),
+                                 "Primary Child Empty", "Primary Child", df["Primary Child"], "No"))
+
+    # State permissions for brands that require them, checked against each brand's allowed states
+    matrix = rules.get("state_permissions")
+    if matrix and len(matrix["brands"]) and "Manufacturer" in df.columns and "State Permission" in df.columns:
+        permission = df["State Permission"]
+        missing, invalid, offending = check_state_permissions(df["Manufacturer"], permission, matrix)
+        found.append(_violations(df, ids, key_column, missing, "State Permission Missing",
+                                 "State Permission", permission, ""))
+        found.append(_violations(df, ids, key_column, invalid, "State Permission Invalid", "State Permission",
+                                 offending, allowed_states_label(df["Manufacturer"], matrix)))
+
+    # Comparison against the SKU list, matched on the key column
+    necessary_fields = rules.get("necessary_fields", [])
+    if necessary_fields:
+        merged = df.assign(_row_id=ids).merge(sku_df, on=key_column, suffixes=("_ImportFile", "_SkuList"))
+        merged = merged.rename(columns={"Material Bank SKU_ImportFile": "Material Bank SKU"})
+        product_type_col = next((col for col in ["Product Type_ImportFile", "Product Type"] if col in merged.columns), None)
+        is_configurable = np.zeros(len(merged), dtype=bool) if product_type_col is None else \
+            (merged[product_type_col].astype(str).str.lower() == 'configurable').to_numpy()
+        merged_ids = merged["_row_id"].to_numpy(dtype=object)
+
+        for field in necessary_fields:
+            col_main, col_sku = f"{field}_ImportFile", f"{field}_SkuList"
+            if col_main not in merged.columns or col_sku not in merged.columns:
+                continue
+            main_values, sku_values = merged[col_main], merged[col_sku]
+            if field in rules.get("string_compare_fields", []):
+                main_values, sku_values = main_values.astype(str), sku_values.astype(str)
+            mismatch = (main_values != sku_values).to_numpy()
+            if field in rules.get("skip_configurable_fields", []):
+                mismatch = mismatch & ~is_configurable
+            found.append(_violations(merged, merged_ids, key_column, mismatch, "Field Mismatch", field,
+                                     main_values, sku_values.to_numpy(dtype=object)))
+
+    found = [frame for frame in found if not frame.empty]
+    if not found:
+        return pd.DataFrame(columns=VIOLATION_COLUMNS)
+    return pd.concat(found, ignore_index=True)
+
+
+def _diff_violations(left, right):
+    """Violations in `left` that are not in `right`"""
+    if left.empty or right.empty:
+        return left
+    merged = left.merge(right[VIOLATION_IDENTITY].drop_duplicates(), on=VIOLATION_IDENTITY,
+                        how='left', indicator=True)
+    return merged[merged["_merge"] == "left_only"].drop(columns="_merge")
+
+
+def revalidate(main_df, sku_df, key_column, rules, session_key, context):
+    """Validate an import, re-checking only rows that changed since this session's last run
+
+    Previous row hashes and violations are kept in `st.session_state[session_key]`.
+    A different `context` (SKU list, columns, rules) forces a full run. Returns a
+    dict with the full violation table, the resolved and introduced violations,
+    and how many rows were checked.
+    """
+    ids = row_ids(main_df, key_column)
+    hashes = row_hashes(main_df)
+    previous = st.session_state.get(session_key)
+
+    if previous is not None and previous["context"] == context:
+        # Rows whose identity is new or whose content hash differs
+        prev_pos = previous["ids"].get_indexer(ids)
+        prev_hashes = previous["hashes"][np.maximum(prev_pos, 0)]
+        changed = (prev_pos < 0) | (prev_hashes != hashes)
+        unchanged_ids = ids[~changed]
+
+        kept = previous["violations"]
+        kept = kept[kept["Row Id"].isin(unchanged_ids)]
+        changed_pos = np.flatnonzero(changed)
+        fresh = check_rows(main_df.iloc[changed_pos], ids[changed_pos], key_column, rules, sku_df)
+        violations = pd.concat([kept, fresh], ignore_index=True) if not fresh.empty else kept.reset_index(drop=True)
+        checked = len(changed_pos)
+        resolved = _diff_violations(previous["violations"], violations)
+        introduced = _diff_violations(violations, previous["violations"])
+    else:
+        violations = check_rows(main_df, ids, key_column, rules, sku_df)
+        checked = len(main_df)
+        resolved = introduced = None
+
+    # Keep file order so results read the same on every run
+    id_index = pd.Index(ids, dtype=object)
+    violations = violations.iloc[np.argsort(id_index.get_indexer(violations["Row Id"]), kind='stable')]
+
+    st.session_state[session_key] = {
+        "context": context,
+        "ids": id_index,
+        "hashes": hashes,
+        "violations": violations
+    }
+    return {
+        "violations": violations,
+        "resolved": resolved,
+        "introduced": introduced,
+        "checked": checked,
+        "total": len(main_df)
+    }
+
+
+def render_recheck_summary(result):
+    """Show what a re-upload changed compared to the previous run"""
+    if result["resolved"] is None:
+        st.caption(f"Full validation of {result['total']} rows")
+        return
+
+    st.write("#### Re-check Summary")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Rows Re-checked", f"{result['checked']} of {result['total']}")
+    col2.metric("Violations Resolved", len(result["resolved"]))
+    col3.metric("Violations Introduced", len(result["introduced"]))
+
+    display_columns = ["Key", "Check", "Field", "Value", "Expected"]
+    if not result["resolved"].empty:
+        with st.expander("View resolved violations"):
+            st.dataframe(result["resolved"][display_columns], use_container_width=True)
+    if not result["introduced"].empty:
+        with st.expander("View introduced violations", expanded=True):
+            st.dataframe(result["introduced"][display_columns], use_container_width=True)
+
+
+def select_violations(violations, check, field=None):
+    """Violations of one check, optionally limited to one field"""
+    mask = violations["Check"] == check
+    if field is not None:
+        mask &= violations["Field"] == field
+    return violations[mask]
+
+
+class ViolationDisplay:
+    """Capped violation tables for one validator run, sharing a rendering time budget
+
+    Every rule still reports its full count; only the first `cap` rows are sent
+    to the browser, with a summary of the most common values. Once the budget
+    is spent, later rules render no rows at all. "Load all" on a rule lifts its
+    cap for this upload; the choice is kept in `st.session_state[session_key]`
+    and reset when `context` changes.
+    """
+
+    def __init__(self, session_key, context, cap=VIOLATION_CAP, budget=RENDER_BUDGET):
+        state = st.session_state.get(session_key)
+        if state is None or state["context"] != context:
+            state = st.session_state[session_key] = {"context": context, "loaded": set()}
+        self.session_key = session_key
+        self.loaded = state["loaded"]
+        self.cap = cap
+        self.deadline = time.monotonic() + budget
+
+    def show(self, frame, columns, names, rule):
+        """Render up to the cap of `frame[columns]` under `names`, plus top values and a "Load all" action"""
+        loaded = rule in self.loaded
+        limit = len(frame) if loaded else (self.cap if time.monotonic() < self.deadline else 0)
+        if limit:
+            st.dataframe(frame[columns].head(limit).set_axis(names, axis=1))
+        if limit >= len(frame):
+            return
+
+        value_column = "Value" if "Value" in columns else columns[-1]
+        top_values = frame[value_column].astype(object).fillna('').value_counts().head(TOP_VALUES)
+        st.caption(f"Showing {limit} of {len(frame)} rows. Most common {names[columns.index(value_column)]} values:")
+        st.dataframe(top_values.rename_axis("Value").rename("Rows").reset_index(), hide_index=True)
+        if st.button(f"Load all {len(frame)} rows", key=f"{self.session_key}:{rule}"):
+            self.loaded.add(rule)
+            st.rerun()
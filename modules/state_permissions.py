@@ -0,0 +1,135 @@
+import json
+from pathlib import Path
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+STATE_PERMISSION_PATH = Path(__file__).resolve().parent.parent / "constants" / "state_permission_brands.json"
+
+# Separators between the states listed in one State Permission cell
+STATE_SEPARATORS = r'\s*[,;|/]\s*'
+
+US_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "DC": "District of Columbia", "FL": "Florida",
+    "GA": "Georgia", "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois", "IN": "Indiana",
+    "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana", "ME": "Maine",
+    "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota", "MS": "Mississippi",
+    "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada", "NH": "New Hampshire",
+    "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York", "NC": "North Carolina", "ND": "North Dakota",
+    "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon", "PA": "Pennsylvania", "PR": "Puerto Rico",
+    "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota", "TN": "Tennessee", "TX": "Texas",
+    "UT": "Utah", "VT": "Vermont", "VA": "Virginia", "WA": "Washington", "WV": "West Virginia",
+    "WI": "Wisconsin", "WY": "Wyoming"
+}
+
+# Normalized state code or name -> state code
+STATE_LOOKUP = {**{code.lower(): code for code in US_STATES},
+                **{name.lower(): code for code, name in US_STATES.items()}}
+
+# Parsed matrix, reused until the constants file changes on disk
+_LOADED = {}
+
+
+def normalize_names(values):
+    """Case-, spacing- and missing-insensitive form of brand or state names"""
+    return (pd.Series(values, dtype=object).fillna('').astype(str)
+            .str.replace(r'\s+', ' ', regex=True).str.strip().str.lower())
+
+
+def normalize_states(values):
+    """State codes for state names or codes; unknown names become NaN"""
+    return normalize_names(values).map(STATE_LOOKUP)
+
+
+def load_state_permissions(path=STATE_PERMISSION_PATH):
+    """Brand -> allowed states matrix as normalized lookups, loaded once per version of the file
+
+    The file maps each brand to its allowed states; an empty list (or the older
+    flat brand list) means the brand needs a State Permission but any US state
+    is allowed. Returns {"brands": Index, "allowed": MultiIndex of (brand,
+    state), "restricted": Index, "labels": {brand: allowed states text},
+    "version": mtime}.
+    """
+    empty = {"brands": pd.Index([], dtype=object), "allowed": pd.MultiIndex.from_arrays([[], []]),
+             "restricted": pd.Index([], dtype=object), "labels": {}, "version": None}
+    try:
+        version = path.stat().st_mtime
+        if _LOADED.get("path") == path and _LOADED.get("version") == version:
+            return _LOADED["matrix"]
+        with open(path) as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        st.error("State permission brand list not found")
+        return empty
+    except json.JSONDecodeError:
+        st.error("Invalid state permission brand list format")
+        return empty
+
+    if isinstance(raw, list):
+        raw = {brand: [] for brand in raw}
+
+    brands = normalize_names(list(raw))
+    pairs = pd.DataFrame(
+        [(brand, state) for brand, states in zip(brands, raw.values()) for state in states],
+        columns=["brand", "state"], dtype=object
+    )
+    pairs["state"] = normalize_states(pairs["state"]).to_numpy()
+    unknown = pairs["state"].isna()
+    if unknown.any():
+        st.warning(f"Ignoring {int(unknown.sum())} unrecognized states in the state permission matrix")
+    pairs = pairs[~unknown].drop_duplicates()
+
+    matrix = {
+        "brands": pd.Index(brands.unique(), dtype=object),
+        "allowed": pd.MultiIndex.from_frame(pairs),
+        "restricted": pd.Index(pairs["brand"].unique(), dtype=object),
+        "labels": {**{brand: "Any US state" for brand in brands},
+                   **pairs.groupby("brand", sort=False)["state"].agg(", ".join).to_dict()},
+        "version": version
+    }
+    _LOADED.update(path=path, version=version, matrix=matrix)
+    return matrix
+
+
+def requires_state_permission(manufacturers, matrix):
+    """Mask of rows whose brand is in the state permission matrix"""
+    return (matrix["brands"].get_indexer(normalize_names(manufacturers)) >= 0)
+
+
+def check_state_permissions(manufacturers, permissions, matrix):
+    """Missing and invalid State Permission masks for every row, in one vectorized pass
+
+    A row is invalid when one of its states is not a US state, or is not in
+    its brand's allowed set for brands that restrict states. Also returns the
+    offending states per invalid row.
+    """
+    brands = normalize_names(manufacturers).to_numpy(dtype=object)
+    required = matrix["brands"].get_indexer(brands) >= 0
+    text = pd.Series(permissions, dtype=object).fillna('').astype(str).str.strip()
+    missing = required & text.eq('').to_numpy()
+
+    # One row per (row, state token) for the filled rows of brands in the matrix
+    filled = np.flatnonzero(required & ~missing)
+    tokens = pd.Series(text.to_numpy()[filled], index=filled).str.split(STATE_SEPARATORS, regex=True).explode()
+    tokens = tokens[tokens.ne('')]
+    token_rows = tokens.index.to_numpy(dtype=np.intp)
+    codes = normalize_states(tokens.to_numpy(dtype=object)).to_numpy(dtype=object)
+
+    bad = pd.isna(codes)
+    token_brands = brands[token_rows]
+    restricted = (matrix["restricted"].get_indexer(token_brands) >= 0) & ~bad
+    if restricted.any():
+        lookup = pd.MultiIndex.from_arrays([token_brands[restricted], codes[restricted]])
+        bad[np.flatnonzero(restricted)[matrix["allowed"].get_indexer(lookup) < 0]] = True
+
+    invalid = np.zeros(len(brands), dtype=bool)
+    invalid[token_rows[bad]] = True
+    offending = pd.Series(tokens.to_numpy(dtype=object)[bad], index=token_rows[bad])
+    offending = offending.groupby(level=0, sort=False).agg(", ".join)
+    return missing, invalid, offending.reindex(np.arange(len(brands))).to_numpy(dtype=object)
+
+
+def allowed_states_label(manufacturers, matrix):
+    """Allowed states text for every row's brand"""
+    return normalize_names(manufacturers).map(matrix["labels"]).fillna('').to_numpy(dtype=object)
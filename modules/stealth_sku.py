@@ -1,6 +1,8 @@
 import streamlit as st
-import pandas as pd
-from io import BytesIO
+from modules.catalog_index import render_collision_check
+from modules.loaders import UPLOAD_TYPES, read_upload
+from modules.revalidation import ViolationDisplay, file_fingerprint
+from modules.uniqueness import render_uniqueness_check
 
 def run():
     st.header("Stealth SKU Validation")
@@ -27,11 +29,7 @@ def run():
 
     def load_file(uploaded_file):
         try:
-            if uploaded_file.name.endswith('.xlsx'):
-                return pd.read_excel(uploaded_file, engine='openpyxl')
-            elif uploaded_file.name.endswith('.csv'):
-                return pd.read_csv(uploaded_file)
-            return None
+            return read_upload(uploaded_file)
         except Exception as e:
             st.error(f"Error loading file: {e}")
             return None
@@ -68,9 +66,9 @@ def run():
 
     col1, col2 = st.columns(2)
     with col1:
-        main_file = st.file_uploader("Stealth Import File", type=["xlsx", "csv"])
+        main_file = st.file_uploader("Stealth Import File", type=UPLOAD_TYPES)
     with col2:
-        sku_file = st.file_uploader("SKU List File", type=["xlsx", "csv"])
+        sku_file = st.file_uploader("SKU List File", type=UPLOAD_TYPES)
 
     if main_file and sku_file:
         with st.spinner("Validating files..."):
@@ -86,22 +84,32 @@ def run():
                 else:
                     st.success("✅ All required columns present")
 
-                # 2. Expected Values Validation
+                # 2. Expected Values Validation (tables capped per field; "Load all" fetches the rest)
                 st.subheader("Field Value Validation")
+                display = ViolationDisplay("violation_display_stealth", file_fingerprint(main_file))
                 invalid_counts = 0
                 for field, expected in EXPECTED_VALUES.items():
                     if field in df_main.columns:
-                        invalid = df_main[df_main[field].astype(str) != expected]
+                        invalid = df_main.loc[df_main[field].astype(str) != expected, ["Manufacturer Sku", field]]
                         if not invalid.empty:
                             invalid_counts += 1
-                            with st.expander(f"⚠️ Invalid {field} values", expanded=False):
+                            with st.expander(f"⚠️ Invalid {field} values ({len(invalid)})", expanded=False):
                                 st.write(f"Expected: {expected}")
-                                st.dataframe(invalid[["Manufacturer Sku", field]])
+                                display.show(invalid, ["Manufacturer Sku", field], ["Manufacturer Sku", field],
+                                             f"Expected Value: {field}")
                 
                 if invalid_counts == 0:
                     st.success("✅ All field values match expected values")
 
-                # 3. Sample SKU Validation
+                # 3. Catalog collision check
+                st.subheader("Catalog Collision Check")
+                render_collision_check(df_main, main_file)
+
+                # 4. In-file uniqueness check
+                st.subheader("Duplicate Key Check")
+                render_uniqueness_check(df_main)
+
+                # 5. Sample SKU Validation
                 st.subheader("Sample SKU Check")
                 if "Sample SKU" in df_sku.columns and "Manufacturer Sku" in df_main.columns:
                     sample_skus = set(df_sku["Sample SKU"].astype(str).str.strip())
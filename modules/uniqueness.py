@@ -0,0 +1,97 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+# Constraint name -> key columns that must be unique together within one import file
+UNIQUE_KEYS = {
+    "Material Bank SKU": ["Material Bank SKU"],
+    "MBID": ["MBID"],
+    "Url Key": ["Url Key"],
+    "Material Url": ["Material Url"],
+    "Manufacturer + Manufacturer Sku": ["Manufacturer", "Manufacturer Sku"],
+    "Manufacturer + Manufacturer Sku EU": ["Manufacturer", "Manufacturer Sku EU"]
+}
+
+# Maintenance outputs must not repeat a SKU, or the import fans out
+OUTPUT_UNIQUE_KEYS = {"Material Bank SKU": ["Material Bank SKU"]}
+
+DUPLICATE_COLUMNS = ["Constraint", "Value", "Count", "Rows"]
+
+
+def _join_columns(values):
+    """One display value per row, composite keys joined with ' + '"""
+    joined = values.iloc[:, 0].astype(object)
+    for col in values.columns[1:]:
+        joined = joined + " + " + values[col].astype(object)
+    return joined.to_numpy(dtype=object)
+
+
+def find_duplicates(df, keys=UNIQUE_KEYS):
+    """Duplicate key groups per constraint, with their spreadsheet rows
+
+    Every constraint factorizes its (stripped, case-sensitive) key columns into
+    one group code per row and counts the codes, so the check stays linear in
+    the row count. Rows with any empty key part are ignored, as are
+    constraints whose columns are not all in the file.
+    """
+    found = []
+    for constraint, columns in keys.items():
+        if not all(col in df.columns for col in columns):
+            continue
+        values = pd.DataFrame({col: df[col].astype(object).fillna('').astype(str).str.strip().to_numpy(dtype=object)
+                               for col in columns})
+        present = values.ne('').all(axis=1).to_numpy()
+        if not present.any():
+            # Every key is blank (e.g. an empty Url Key column): nothing can repeat
+            continue
+
+        # Composite keys: combine the per-column codes, then re-factorize the combination
+        codes = np.zeros(len(values), dtype=np.int64)
+        for col in columns:
+            col_codes, uniques = pd.factorize(values[col].to_numpy(dtype=object))
+            codes, _ = pd.factorize(codes * len(uniques) + col_codes)
+        codes = np.where(present, codes, -1)
+        counts = np.bincount(codes[present], minlength=codes.max() + 1)
+        duplicated = np.flatnonzero(present & (counts[np.maximum(codes, 0)] > 1))
+        if len(duplicated) == 0:
+            continue
+
+        # Only duplicate rows are sorted, grouped by key and kept in file order
+        order = duplicated[np.argsort(codes[duplicated], kind='stable')]
+        group_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, group_codes[1:] != group_codes[:-1]])
+        rows = np.split(order + 2, starts[1:])  # spreadsheet row, below the header
+        found.append(pd.DataFrame({
+            "Constraint": constraint,
+            "Value": _join_columns(values.iloc[order[starts]]),
+            "Count": counts[group_codes[starts]],
+            "Rows": [", ".join(map(str, group)) for group in rows]
+        }))
+
+    if not found:
+        return pd.DataFrame(columns=DUPLICATE_COLUMNS)
+    return pd.concat(found, ignore_index=True)
+
+
+def render_uniqueness_check(df, keys=UNIQUE_KEYS):
+    """In-file uniqueness section shared by the import validators"""
+    checked = [name for name, columns in keys.items() if all(col in df.columns for col in columns)]
+    duplicates = find_duplicates(df, keys)
+    if duplicates.empty:
+        st.success(f"✅ No duplicate keys in the file ({', '.join(checked)})")
+        return
+
+    st.error(f"🚨 Found {len(duplicates)} duplicated keys; later SKU comparisons will repeat these rows")
+    for constraint, constraint_df in duplicates.groupby("Constraint", sort=False):
+        with st.expander(f"Duplicate {constraint} values ({len(constraint_df)})"):
+            st.dataframe(constraint_df.drop(columns="Constraint"), use_container_width=True, hide_index=True)
+
+
+def warn_output_duplicates(df, label):
+    """Warn before export when a maintenance output repeats a SKU"""
+    duplicates = find_duplicates(df, OUTPUT_UNIQUE_KEYS)
+    if duplicates.empty:
+        return
+    st.warning(f"⚠️ {label} repeats {len(duplicates)} SKUs; check the export for duplicate rows before importing")
+    with st.expander(f"View duplicated SKUs in {label}"):
+        st.dataframe(duplicates.drop(columns="Constraint"), use_container_width=True, hide_index=True)
@@ -1,56 +1,158 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from io import BytesIO
+from modules.catalog_store import export_source_picker, load_ticket_rows, read_store
+from modules.changeset import build_change_set, write_change_set_workbook
+from modules.family_graph import FamilyGraph
+from modules.indexes import identifier_positions
+from modules.loaders import UPLOAD_TYPES, read_upload, select_rows
+from modules.uniqueness import warn_output_duplicates
 import warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
 
-def run():
-    
-    # Region configuration
-    REGION_CONFIG = {
-        "US": {
-            "filter_columns": ["Material Bank SKU", "Enable Product", "Family Id", "Manufacturer Sample Id",
-                             "Product Finish Type", "Associated Finishes", "Manufacturer Sku", "Product Type",
-                             "Stealth SKU", "Visibility", "Hide From Product View", "Approximate Sample Size",
-                             "State Permission", "Product Name", "Channels"]
-        },
-        "EU": {
-            "filter_columns": ["Material Bank SKU", "Enable Product", "Family Id", "Manufacturer Sample Id",
-                             "Product Finish Type", "Associated Finishes", "Manufacturer Sku EU", "Product Type",
-                             "Stealth SKU", "Visibility EU", "Hide From Product View EU", "Approximate Sample Size",
-                             "State Permission", "Product Name", "Channels"]
-        }
+# Region configuration
+REGION_CONFIG = {
+    "US": {
+        "filter_columns": ["Material Bank SKU", "Enable Product", "Family Id", "Manufacturer Sample Id",
+                         "Product Finish Type", "Associated Finishes", "Manufacturer Sku", "Product Type",
+                         "Stealth SKU", "Visibility", "Hide From Product View", "Approximate Sample Size",
+                         "State Permission", "Product Name", "Channels"],
+        "visibility_col": "Visibility",
+        "hide_col": "Hide From Product View"
+    },
+    "EU": {
+        "filter_columns": ["Material Bank SKU", "Enable Product", "Family Id", "Manufacturer Sample Id",
+                         "Product Finish Type", "Associated Finishes", "Manufacturer Sku EU", "Product Type",
+                         "Stealth SKU", "Visibility EU", "Hide From Product View EU", "Approximate Sample Size",
+                         "State Permission", "Product Name", "Channels"],
+        "visibility_col": "Visibility EU",
+        "hide_col": "Hide From Product View EU"
     }
-    
+}
+
+
+def select_visibility_rows(export_df, ticket_identifiers, identifier_type, family_index=None, family_graph=None):
+    """Row positions of ticket matches plus the configurable parents of their families
+
+    With a `family_graph`, parents are taken from every family linked to a match
+    through Import Family Id or Associated Finishes, not just its own Family Id.
+    """
+    # Get original matches; Product Name matches ignore casing and spacing
+    match_pos = identifier_positions(export_df[identifier_type], ticket_identifiers, identifier_type)
+
+    # Find parent SKUs
+    parent_pos = np.array([], dtype=np.intp)
+    if len(match_pos) > 0 and family_graph is not None:
+        linked_pos = family_graph.linked_positions(match_pos)
+        product_type = export_df['Product Type'].iloc[linked_pos].str.strip().str.lower()
+        parent_pos = linked_pos[product_type.eq('configurable').to_numpy()]
+    elif len(match_pos) > 0:
+        family_values = export_df['Family Id']
+        family_ids = family_values.iloc[match_pos].dropna().unique()
+        if len(family_ids) > 0 and family_index is not None:
+            # Prebuilt Family Id index: only the touched families are visited
+            family_pos = family_index.lookup(family_ids)
+            product_type = export_df['Product Type'].iloc[family_pos].str.strip().str.lower()
+            parent_pos = family_pos[product_type.eq('configurable').to_numpy()]
+        elif len(family_ids) > 0:
+            parent_condition = (
+                family_values.isin(family_ids) &
+                export_df['Product Type'].str.strip().str.lower().eq('configurable'))
+            parent_pos = np.flatnonzero(parent_condition.to_numpy())
+
+    # Combine positions; the set union replaces a full-width drop_duplicates
+    return np.union1d(match_pos, parent_pos)
+
+
+def apply_visibility_rules(export_df, positions, regions):
+    """Build Final Results for each region, sharing the Product Type masks"""
+    # Clean Product Type values once for every region
+    product_type_clean = export_df['Product Type'].iloc[positions].str.strip().str.lower().to_numpy()
+    mask_configurable = product_type_clean == 'configurable'
+    mask_simple = product_type_clean == 'simple'
+
+    results = {}
+    for region in regions:
+        # Materialize only this sheet's columns for the selected rows
+        filtered_final = select_rows(export_df, positions, REGION_CONFIG[region]["filter_columns"])
+
+        # Apply business logic to Final Results
+        if not filtered_final.empty:
+            hide_col = REGION_CONFIG[region]["hide_col"]
+            visibility_col = REGION_CONFIG[region]["visibility_col"]
+
+            # 1. Set 'Hide From Product View' to 'No'
+            filtered_final[hide_col] = 'No'
+
+            # 2. Update 'Visibility' based on Product Type
+            filtered_final.loc[mask_configurable, visibility_col] = "Catalog, Search"
+            filtered_final.loc[mask_simple, visibility_col] = "Catalog"
+
+        results[region] = filtered_final
+    return results
+
+
+def write_visibility_workbook(filtered_final, combined_df):
+    """Write the Final Results / Filtered Rows workbook and return its bytes"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        # 1st tab Final Results
+        filtered_final.to_excel(writer, sheet_name='Final Results', index=False)
+
+        # 2nd tab Filtered Rows
+        combined_df.to_excel(writer, sheet_name='Filtered Rows', index=False)
+
+        # Auto-format columns
+        for sheet_name in ['Final Results', 'Filtered Rows']:
+            worksheet = writer.sheets[sheet_name]
+            df = filtered_final if sheet_name == 'Final Results' else combined_df
+
+            for idx, col in enumerate(df.columns):
+                max_len = max(
+                    df[col].astype(str).str.len().max(),
+                    len(str(col))
+                ) + 2
+                worksheet.set_column(idx, idx, min(max_len, 50))
+            worksheet.autofilter(0, 0, len(df), len(df.columns)-1)
+
+    return output.getvalue()
+
+
+def run():
+
     # Region selection radio buttons
     region = st.radio(
         "Select Region:",
-        ["US", "EU"],
+        ["US", "EU", "Both"],
         index=0,  # Default to US
-        horizontal=True
+        horizontal=True,
+        help="'Both' loads the export once and produces the US and EU outputs together"
     )
+    regions = ["US", "EU"] if region == "Both" else [region]
 
     # File Upload Section
     st.write("#### File Uploads")
     with st.expander("📋 **Upload Instructions (Click to Expand)**", expanded=False):
         st.markdown("""
         ### Essential Checks Before Uploading:
-        
+
         ⚠️ **Important:**  Field Name Consistency
-        
-        Ensure the primary identifier field you select below matches **exactly** in both files for correct filtering.
+
+        Ensure the primary identifier field you select below matches **exactly** in both files.
         """)
-    
-    # File uploaders
-    export_file = st.file_uploader(
-        "Upload the PIM Export File (Excel/CSV)", 
-        type=["xlsx", "csv"],
+
+    # File uploaders; the export is optional when the catalog store is used
+    use_store = export_source_picker("visibility")
+    export_file = None if use_store else st.file_uploader(
+        "Upload the PIM Export File (Excel/CSV)",
+        type=UPLOAD_TYPES,
         help="Upload the brand export file from PIM"
     )
-    
+
     ticket_file = st.file_uploader(
-        "Upload the Ticket file (Excel/CSV)", 
-        type=["xlsx", "csv"],
+        "Upload the Ticket file (Excel/CSV)",
+        type=UPLOAD_TYPES,
         help="Upload the ticket file with SKUs to be visible"
     )
 
@@ -62,25 +164,43 @@ def run():
         help="Select the primary identifier for filtering SKUs"
     )
 
+    include_change_set = st.checkbox(
+        "Also export a change set (changed cells only)",
+        help="Adds a PIM-import-ready file with the SKU plus only the cells that change, and a long-format audit sheet"
+    )
+
+    expand_linked = st.checkbox(
+        "Expand linked families",
+        help="Also include configurable parents of families linked through Import Family Id or Associated Finishes"
+    )
+
     # Add visual separation
     st.markdown("---")
-    
+
     # Rest of your processing logic can go here
-    if export_file and ticket_file:
+    if (use_store or export_file) and ticket_file:
         try:
-            # Load data
-            export_df = pd.read_excel(export_file) if export_file.name.endswith('.xlsx') else pd.read_csv(export_file)
-            ticket_df = pd.read_excel(ticket_file) if ticket_file.name.endswith('.xlsx') else pd.read_csv(ticket_file)
+            # Load data; the store returns only ticket rows and their families
+            ticket_df = read_upload(ticket_file)
+            if use_store and expand_linked:
+                # Linked families can reach anywhere in the catalog, so the whole export is needed
+                export_df = read_store()
+            elif use_store:
+                export_df = load_ticket_rows(ticket_df, identifier_type)
+            else:
+                export_df = read_upload(export_file)
 
             # Validation checks
             errors = []
-            
+
             if identifier_type not in export_df.columns:
                 errors.append(f"'{identifier_type}' column missing in Export File")
             if identifier_type not in ticket_df.columns:
                 errors.append(f"'{identifier_type}' column missing in Ticket File")
-            
-            required_columns = REGION_CONFIG[region]["filter_columns"]
+
+            required_columns = list(dict.fromkeys(
+                col for r in regions for col in REGION_CONFIG[r]["filter_columns"]
+            ))
             missing_columns = [col for col in required_columns if col not in export_df.columns]
             if missing_columns:
                 errors.append(f"Missing columns in Export File: {', '.join(missing_columns)}")
@@ -94,91 +214,48 @@ def run():
             # Process data
             ticket_identifiers = ticket_df[identifier_type].astype(str).str.strip().unique()
             export_df[identifier_type] = export_df[identifier_type].astype(str).str.strip()
-            
-            # Get original matches
-            original_matches = export_df[export_df[identifier_type].isin(ticket_identifiers)]
-            
-            # Find parent SKUs
-            parent_rows = pd.DataFrame()
-            if not original_matches.empty:
-                family_ids = original_matches['Family Id'].dropna().astype(str).unique()
-                if len(family_ids) > 0:
-                    parent_condition = (
-                        export_df['Family Id'].astype(str).isin(family_ids) &
-                        export_df['Product Type'].str.strip().str.lower().eq('configurable'))
-                    parent_rows = export_df[parent_condition]
-
-            # Combine results and remove duplicates
-            combined_df = pd.concat([original_matches, parent_rows]).drop_duplicates()
-
-            # Create final filtered dataset
-            filtered_final = combined_df[required_columns].copy()
-            
-            # Apply business logic to Final Results
-            if not filtered_final.empty:
-                # Determine region-specific column names
-                if region == "US":
-                    hide_col = "Hide From Product View"
-                    visibility_col = "Visibility"
-                else:
-                    hide_col = "Hide From Product View EU"
-                    visibility_col = "Visibility EU"
-
-                # 1. Set 'Hide From Product View' to 'No'
-                filtered_final[hide_col] = 'No'
-
-                # 2. Update 'Visibility' based on Product Type
-                # Clean Product Type values
-                product_type_clean = filtered_final['Product Type'].str.strip().str.lower()
-                
-                # Create masks
-                mask_configurable = product_type_clean == 'configurable'
-                mask_simple = product_type_clean == 'simple'
-
-                # Apply visibility rules
-                filtered_final.loc[mask_configurable, visibility_col] = "Catalog, Search"
-                filtered_final.loc[mask_simple, visibility_col] = "Catalog"
-
-
-            # Create Excel file
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                # 1st tab Final Results 
-                filtered_final.to_excel(writer, sheet_name='Final Results', index=False)
-                
-                # 2nd tab Filtered Rows 
-                combined_df.to_excel(writer, sheet_name='Filtered Rows', index=False)
-
-                # Auto-format columns
-                for sheet_name in ['Final Results', 'Filtered Rows']:
-                    worksheet = writer.sheets[sheet_name]
-                    df = filtered_final if sheet_name == 'Final Results' else combined_df
-                    
-                    for idx, col in enumerate(df.columns):
-                        max_len = max(
-                            df[col].astype(str).str.len().max(),
-                            len(str(col))
-                        ) + 2
-                        worksheet.set_column(idx, idx, min(max_len, 50))
-                    worksheet.autofilter(0, 0, len(df), len(df.columns)-1)
-                    
-            # Create preview section        
-            if not filtered_final.empty:
-                with st.expander("Preview Final Results", expanded=False):
-                    st.dataframe(
-                        filtered_final,
-                        use_container_width=True,
-                        height=300
-                    )
-                    st.caption(f"Showing all {len(filtered_final)} records")
 
-            st.success("Processing complete! Download results:")
-            st.download_button(
-                label="Download Excel File",
-                data=output.getvalue(),
-                file_name=f"sku_visibility_{region}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+            # Matching and family expansion are shared by every selected region
+            family_graph = FamilyGraph(export_df) if expand_linked else None
+            positions = select_visibility_rows(export_df, ticket_identifiers, identifier_type,
+                                               family_graph=family_graph)
+            combined_df = select_rows(export_df, positions)
+            region_results = apply_visibility_rules(export_df, positions, regions)
+
+            for current_region, filtered_final in region_results.items():
+                # Create Excel file
+                workbook = write_visibility_workbook(filtered_final, combined_df)
+
+                # Create preview section
+                if not filtered_final.empty:
+                    with st.expander(f"Preview Final Results ({current_region})", expanded=False):
+                        st.dataframe(
+                            filtered_final,
+                            use_container_width=True,
+                            height=300
+                        )
+                        st.caption(f"Showing all {len(filtered_final)} records")
+
+                warn_output_duplicates(filtered_final, f"Final Results ({current_region})")
+                st.success(f"Processing complete! Download {current_region} results:")
+                st.download_button(
+                    label=f"Download Excel File ({current_region})",
+                    data=workbook,
+                    file_name=f"sku_visibility_{current_region}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    key=f"visibility_download_{current_region}"
+                )
+
+                if include_change_set:
+                    delta, audit = build_change_set(export_df, filtered_final)
+                    st.download_button(
+                        label=f"Download Change Set ({current_region})",
+                        data=write_change_set_workbook(delta, audit),
+                        file_name=f"sku_visibility_{current_region}_changeset.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        key=f"visibility_changeset_{current_region}"
+                    )
+                    st.caption(f"Change set: {len(delta)} SKUs, {len(audit)} changed cells")
 
         except Exception as e:
-            st.error(f"Processing error: {str(e)}")
\ No newline at end of file
+            st.error(f"Processing error: {str(e)}")
@@ -4,7 +4,12 @@ from modules.visibility import run as run_visibility
 from modules.retirement import run as run_retirement
 from modules.primarychild import run as run_primarychange
 from modules.filterRecord import run as run_filter
-# from modules.reenable import run as run_reenable
+from modules.export_diff import run as run_export_diff
+from modules.reenable import run as run_reenable
+from modules.pipeline import run as run_pipeline
+from modules.catalog_store import run as run_catalog_store
+from modules.family_health import run as run_family_health
+from modules.region_consistency import run as run_region_consistency
 
 def main():
     # CSS injection for clean UI
@@ -47,7 +52,8 @@ def main():
         """, unsafe_allow_html=True)
         nav_choice = st.radio(
             "Select Section:",
-            options=["Visibility", "SKU Retirement", "Re-enable SKUs", "Change Primary Child", "Filter Records"],
+            options=["Visibility", "SKU Retirement", "Re-enable SKUs", "Change Primary Child", "Filter Records",
+                     "Family Health", "Region Consistency", "Export Diff", "Maintenance Pipeline", "Catalog Store"],
             index=0
         )
         st.markdown("""
@@ -67,13 +73,29 @@ def main():
         st.subheader("SKU Retirement Section")
         run_retirement()
     elif nav_choice == "Re-enable SKUs":
-        st.info('Currently under work', icon="ℹ️")
+        st.subheader("SKU Re-enable Section")
+        run_reenable()
     elif nav_choice == "Change Primary Child":
         st.subheader("Primary Child Updating Template")
         run_primarychange()
     elif nav_choice == "Filter Records":
         st.subheader("Raw Record Filtering")
         run_filter()
+    elif nav_choice == "Family Health":
+        st.subheader("Whole-Catalog Family Health")
+        run_family_health()
+    elif nav_choice == "Region Consistency":
+        st.subheader("US / EU Consistency Check")
+        run_region_consistency()
+    elif nav_choice == "Export Diff":
+        st.subheader("Export-to-Export Diff")
+        run_export_diff()
+    elif nav_choice == "Maintenance Pipeline":
+        st.subheader("Retirement → Primary Child → Visibility Pipeline")
+        run_pipeline()
+    elif nav_choice == "Catalog Store":
+        st.subheader("Local Catalog Store")
+        run_catalog_store()
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
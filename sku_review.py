@@ -2,6 +2,7 @@ import streamlit as st
 from modules.new_sku_us import run as run_us
 from modules.new_sku_eu import run as run_eu
 from modules.stealth_sku import run as run_stealth
+from modules.catalog_index import run as run_catalog_index
 
 def main():
     
@@ -29,7 +30,7 @@ def main():
     # Selection dropdown
     sku_type = st.selectbox(
         "Select SKU Type:",
-        options=["US SKUs", "EU SKUs", "Stealth SKUs"],
+        options=["US SKUs", "EU SKUs", "Stealth SKUs", "Catalog Index"],
         index=0
     )
     
@@ -43,6 +44,8 @@ def main():
         run_eu()
     elif sku_type == "Stealth SKUs":
         run_stealth()
+    elif sku_type == "Catalog Index":
+        run_catalog_index()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file